@@ -8,10 +8,12 @@ from __future__ import absolute_import, print_function
 import math
 import time
 import copy
+import logging
 
 # Import salt libs
 import salt.client
 import salt.output
+import salt.utils.minions
 from salt.utils import print_cli
 
 # Import 3rd-party libs
@@ -20,6 +22,11 @@ import salt.ext.six as six
 from salt.ext.six.moves import range
 # pylint: enable=import-error,no-name-in-module,redefined-builtin
 
+log = logging.getLogger(__name__)
+
+# The target types the master resolves exactly, without asking the minions
+PRESENCE_TARGETS = ('glob', 'pcre', 'list')
+
 
 class Batch(object):
     '''
@@ -32,6 +39,24 @@ class Batch(object):
         self.local = salt.client.get_local_client(opts['conf_file'])
         self.minions, self.ping_gen = self.__gather_minions()
 
+    def __present_minions(self, tgt_type):
+        '''
+        Return the targeted minions the master saw connected during its last
+        maintenance loop, or None if this is not known
+        '''
+        if not self.opts.get('presence_events') \
+                or tgt_type not in PRESENCE_TARGETS \
+                or self.opts.get('transport') == 'raet' \
+                or self.opts.get('order_masters'):
+            return None
+        present = salt.utils.minions.read_presence(
+            self.opts, 2 * self.opts.get('loop_interval', 60))
+        if present is None:
+            return None
+        ckminions = salt.utils.minions.CkMinions(self.opts)
+        return sorted(present.intersection(
+            ckminions.check_minions(self.opts['tgt'], tgt_type)))
+
     def __gather_minions(self):
         '''
         Return a list of minions to use for the batch run
@@ -48,6 +73,12 @@ class Batch(object):
         else:
             args.append(self.opts.get('expr_form', 'glob'))
 
+        present = self.__present_minions(args[-1])
+        if present is not None:
+            log.debug('Using the connected minions for the batch run instead '
+                      'of pinging them')
+            return (present, None)
+
         ping_gen = self.local.cmd_iter_no_block(*args, **self.eauth)
         wait_until = time.time() + self.opts['timeout']
 
@@ -85,6 +116,165 @@ class Batch(object):
         '''
         Execute the batch run
         '''
+        if self.opts.get('transport') == 'raet' or self.opts.get('order_masters'):
+            # Syndics send the lists of their minions on the event bus,
+            # which only the job iterators of the LocalClient handle
+            runner = self.__run_iters()
+        else:
+            runner = self.__run_events()
+        for ret in runner:
+            yield ret
+
+    def __display(self, minion, data):
+        '''
+        Print the return of a minion
+        '''
+        data = dict(data)
+        data[minion] = data.pop('ret')
+        if 'out' in data:
+            out = data.pop('out')
+        else:
+            out = None
+        salt.output.display_output(
+                data,
+                out,
+                self.opts)
+
+    def __run_events(self):
+        '''
+        Execute the batch run, keeping the batch size number of minions
+        running the job at all times. The returns are read from the event
+        bus, and a minion is sent the job as soon as one of the running
+        minions returns.
+        '''
+        bnum = self.get_bnum()
+        timeout = self.opts['timeout']
+        to_run = copy.deepcopy(self.minions)
+        to_run.reverse()
+        # minion -> [jid, time the job times out at, jid of the find_job
+        #            checking if the job is still running]
+        active = {}
+        # jid -> [minions which have not returned, number of minions, time
+        #         the job was published]
+        batches = {}
+        event = self.local.event
+        # Listen before publishing, so that no return is missed, and only to
+        # the job events
+        event.subscribe('salt/job/')
+        start = time.time()
+        count = 0
+
+        while to_run or active:
+            parts = {}
+            if bnum - len(active) > 0 and to_run:
+                next_ = []
+                while to_run and len(active) + len(next_) < bnum:
+                    next_.append(to_run.pop())
+                if not self.quiet:
+                    print_cli('\nExecuting run on {0}\n'.format(next_))
+                pub_data = self.local.run_job(
+                        next_,
+                        self.opts['fun'],
+                        self.opts['arg'],
+                        'list',
+                        ret=self.opts.get('return', ''),
+                        timeout=timeout,
+                        **self.eauth)
+                now = time.time()
+                if not pub_data:
+                    # The job could not be published, the minions return
+                    # nothing as they do when they time out
+                    if not self.quiet:
+                        print_cli('\nUnable to publish the job to '
+                                  '{0}\n'.format(next_))
+                    for minion in next_:
+                        active[minion] = [None, now + timeout, None]
+                        parts[minion] = {'ret': {}}
+                else:
+                    batches[pub_data['jid']] = [set(next_), len(next_), now]
+                    for minion in next_:
+                        active[minion] = [pub_data['jid'], now + timeout, None]
+
+            checks = {}
+            now = time.time()
+            for minion, (jid, timeout_at, check) in six.iteritems(active):
+                if timeout_at > now:
+                    continue
+                if check is None:
+                    # See whether the minion is still running the job
+                    checks.setdefault(jid, []).append(minion)
+                else:
+                    parts[minion] = {'ret': {}}
+            for jid, minions in six.iteritems(checks):
+                pub_data = self.local.gather_job_info(jid, minions, 'list')
+                for minion in minions:
+                    active[minion][1] = now + self.opts['gather_job_timeout']
+                    # Without a jid no check returns, the minion times out
+                    active[minion][2] = pub_data.get('jid', '')
+
+            if not parts:
+                wait = max(0.01, min([entry[1] for entry in active.values()]
+                                     or [timeout]) - time.time())
+                raw = event.get_event(wait=wait, tag='salt/job/', full=True)
+                # Handle all of the returns waiting before refilling the
+                # batch
+                while raw is not None:
+                    tag = raw.get('tag', '').split('/')
+                    data = raw.get('data', {})
+                    minion = data.get('id')
+                    if len(tag) > 4 and tag[0:2] == ['salt', 'job'] \
+                            and tag[3] == 'ret' and minion in active:
+                        jid = tag[2]
+                        if jid == active[minion][2]:
+                            if data.get('return'):
+                                # The job is still running, wait for it
+                                active[minion][1] = time.time() + timeout
+                                active[minion][2] = None
+                        elif jid == active[minion][0] and 'return' in data:
+                            if self.opts.get('raw'):
+                                parts[minion] = raw
+                            else:
+                                parts[minion] = {'ret': data['return']}
+                                if 'out' in data:
+                                    parts[minion]['out'] = data['out']
+                                if 'retcode' in data:
+                                    parts[minion]['retcode'] = data['retcode']
+                    raw = event.get_event_noblock()
+
+            for minion, data in six.iteritems(parts):
+                jid = active.pop(minion)[0]
+                count += 1
+                # Minions the job could not be published to have no batch
+                batch = batches.get(jid)
+                if batch is not None:
+                    batch[0].discard(minion)
+                if batch is not None and not batch[0]:
+                    del batches[jid]
+                    elapsed = time.time() - batch[2]
+                    if not self.quiet:
+                        print_cli('\nJob {0} finished on {1} minions in '
+                                  '{2:.2f}s ({3:.1f} minions/s)\n'.format(
+                                      jid,
+                                      batch[1],
+                                      elapsed,
+                                      batch[1] / max(elapsed, 0.001)))
+                if self.opts.get('raw'):
+                    yield data
+                else:
+                    yield {minion: data['ret']}
+                    if not self.quiet:
+                        self.__display(minion, data)
+
+        if not self.quiet:
+            elapsed = time.time() - start
+            print_cli('\nBatch run finished on {0} minions in {1:.2f}s '
+                      '({2:.1f} minions/s)'.format(
+                          count, elapsed, count / max(elapsed, 0.001)))
+
+    def __run_iters(self):
+        '''
+        Execute the batch run, polling a job iterator for each batch
+        '''
         args = [[],
                 self.opts['fun'],
                 self.opts['arg'],
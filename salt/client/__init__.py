@@ -37,6 +37,7 @@ import salt.config
 import salt.minion
 import salt.payload
 import salt.transport
+import salt.transport.client
 import salt.loader
 import salt.minion
 import salt.utils
@@ -53,6 +54,7 @@ from salt.exceptions import (
 
 # Import third party libs
 import salt.ext.six as six
+import tornado.gen
 # pylint: disable=import-error
 try:
     import zmq
@@ -270,8 +272,10 @@ class LocalClient(object):
         '''
         arg = salt.utils.args.condition_input(arg, kwarg)
 
-        # Subscribe to all events and subscribe as early as possible
-        self.event.subscribe(jid)
+        # Subscribe to all events and subscribe as early as possible, unless
+        # the caller only listens to the tags it has subscribed to
+        if getattr(self.event, 'subscribe_all', True):
+            self.event.subscribe('')
 
         try:
             pub_data = self.pub(
@@ -294,6 +298,68 @@ class LocalClient(object):
 
         return self._check_pub_data(pub_data)
 
+    def run_job_async(
+            self,
+            tgt,
+            fun,
+            arg=(),
+            expr_form='glob',
+            ret='',
+            timeout=None,
+            jid='',
+            kwarg=None,
+            io_loop=None,
+            **kwargs):
+        '''
+        Asynchronously send a command to connected minions, without blocking
+        the IOLoop, see :py:meth:`run_job`
+
+        :return: A future of the dictionary of (validated) ``pub_data``, or an
+            empty dictionary on failure.
+
+        .. code-block:: python
+
+            >>> pub_data = yield local.run_job_async('*', 'test.sleep', [300])
+            >>> pub_data
+            {'jid': '20131219215650131543', 'minions': ['jerry']}
+        '''
+        arg = salt.utils.args.condition_input(arg, kwarg)
+
+        # Subscribe to all events and subscribe as early as possible, unless
+        # the caller only listens to the tags it has subscribed to
+        if getattr(self.event, 'subscribe_all', True):
+            self.event.subscribe('')
+
+        return self._check_pub_future(
+            self.pub_async(
+                tgt,
+                fun,
+                arg,
+                expr_form,
+                ret,
+                jid=jid,
+                timeout=self._get_timeout(timeout),
+                io_loop=io_loop,
+                **kwargs))
+
+    @tornado.gen.coroutine
+    def _check_pub_future(self, pub_future):
+        '''
+        Return a future of the checked pub_data of a pub_async() future
+        '''
+        try:
+            pub_data = yield pub_future
+        except SaltClientError:
+            # Re-raise error with specific message
+            raise SaltClientError(
+                'The salt master could not be contacted. Is master running?'
+            )
+        except Exception as general_exception:
+            # Convert to generic client error and pass along mesasge
+            raise SaltClientError(general_exception)
+
+        raise tornado.gen.Return(self._check_pub_data(pub_data))
+
     def cmd_async(
             self,
             tgt,
@@ -1510,6 +1576,79 @@ class LocalClient(object):
         return {'jid': payload['load']['jid'],
                 'minions': payload['load']['minions']}
 
+    @tornado.gen.coroutine
+    def pub_async(self,
+                  tgt,
+                  fun,
+                  arg=(),
+                  expr_form='glob',
+                  ret='',
+                  jid='',
+                  timeout=5,
+                  io_loop=None,
+                  **kwargs):
+        '''
+        Take the required arguments and publish the given command, without
+        blocking the IOLoop, see :py:meth:`pub`. Return a future of the jid
+        and the minions.
+        '''
+        # Make sure the publisher is running by checking the unix socket
+        if (self.opts.get('ipc_mode', '') != 'tcp' and
+                not os.path.exists(os.path.join(self.opts['sock_dir'],
+                'publish_pull.ipc'))):
+            log.error(
+                'Unable to connect to the salt master publisher at '
+                '{0}'.format(self.opts['sock_dir'])
+            )
+            raise SaltClientError
+
+        payload_kwargs = self._prep_pub(
+                tgt,
+                fun,
+                arg,
+                expr_form,
+                ret,
+                jid,
+                timeout,
+                **kwargs)
+
+        master_uri = 'tcp://' + salt.utils.ip_bracket(self.opts['interface']) + \
+                     ':' + str(self.opts['ret_port'])
+        channel = salt.transport.client.AsyncReqChannel.factory(
+            self.opts,
+            io_loop=io_loop,
+            crypt='clear',
+            master_uri=master_uri)
+
+        try:
+            payload = yield channel.send(payload_kwargs, timeout=timeout)
+        except SaltReqTimeoutError:
+            raise SaltReqTimeoutError(
+                'Salt request timed out. The master is not responding. '
+                'If this error persists after verifying the master is up, '
+                'worker_threads may need to be increased.'
+            )
+
+        if not payload:
+            # The master key could have changed out from under us! Regen
+            # and try again if the key has changed
+            key = self.__read_master_key()
+            if key == self.key:
+                raise tornado.gen.Return(payload)
+            self.key = key
+            payload_kwargs['key'] = self.key
+            payload = yield channel.send(payload_kwargs)
+
+        error = payload.pop('error', None)
+        if error is not None:
+            raise PublishError(error)
+
+        if not payload:
+            raise tornado.gen.Return(payload)
+
+        raise tornado.gen.Return({'jid': payload['load']['jid'],
+                                  'minions': payload['load']['minions']})
+
     def __del__(self):
         # This IS really necessary!
         # When running tests, if self.events is not destroyed, we leak 2
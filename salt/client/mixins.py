@@ -20,6 +20,7 @@ import salt.utils.event
 import salt.utils.jid
 import salt.utils.job
 import salt.transport
+import salt.transport.client
 from salt.utils.error import raise_error
 from salt.utils.event import tagify
 from salt.utils.doc import strip_rst as _strip_rst
@@ -27,6 +28,7 @@ from salt.utils.lazy import verify_fun
 
 # Import 3rd-party libs
 import salt.ext.six as six
+import tornado.gen
 
 log = logging.getLogger(__name__)
 
@@ -130,6 +132,25 @@ class SyncClientMixin(object):
                 raise_error(**ret['error'])
         return ret
 
+    @tornado.gen.coroutine
+    def master_call_async(self, io_loop=None, **kwargs):
+        '''
+        Execute a function through the master network interface, without
+        blocking the IOLoop. Return a future of the result.
+        '''
+        load = kwargs
+        load['cmd'] = self.client
+        channel = salt.transport.client.AsyncReqChannel.factory(
+            self.opts,
+            io_loop=io_loop,
+            crypt='clear',
+            usage='master_call')
+        ret = yield channel.send(load)
+        if isinstance(ret, collections.Mapping):
+            if 'error' in ret:
+                raise_error(**ret['error'])
+        raise tornado.gen.Return(ret)
+
     def cmd_sync(self, low, timeout=None):
         '''
         Execute a runner function synchronously; eauth is respected
@@ -147,6 +168,7 @@ class SyncClientMixin(object):
             })
         '''
         event = salt.utils.event.get_master_event(self.opts, self.opts['sock_dir'])
+        event.subscribe(salt.utils.event.tagify(prefix=self.tag_prefix))
         job = self.master_call(**low)
         ret_tag = salt.utils.event.tagify('ret', base=job['tag'])
 
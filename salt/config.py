@@ -220,6 +220,17 @@ VALID_OPTS = {
     # Whether or not processes should be forked when needed. The altnerative is to use threading.
     'multiprocessing': bool,
 
+    # The number of pre-forked processes the minion runs jobs in, 0 forks a
+    # process for each job
+    'minion_workers': int,
+
+    # The number of jobs a job worker runs before it is replaced
+    'minion_worker_max_jobs': int,
+
+    # The number of jobs which may wait for a free job worker, the others are
+    # run in a process of their own
+    'minion_worker_queue': int,
+
     # Schedule a mine update every n number of seconds
     'mine_interval': int,
 
@@ -232,6 +243,15 @@ VALID_OPTS = {
     # The chunk size to use when streaming files with the file server
     'file_buffer_size': int,
 
+    # The largest chunk size minions can ask the file server for
+    'file_buffer_size_max': int,
+
+    # The number of file chunks a minion keeps requested from the master at once
+    'file_pipeline': int,
+
+    # The chunk size a minion asks the file server for, 0 to use the file_buffer_size of the master
+    'file_chunk_size': int,
+
     # The TCP port on which minion events should be published if ipc_mode is TCP
     'tcp_pub_port': int,
 
@@ -284,6 +304,10 @@ VALID_OPTS = {
     # Tell the loader to attempt to import *.pyx cython files if cython is available
     'cython_enable': bool,
 
+    # Keep an index of the names the module files of each loader loaded as in
+    # the cachedir, so that the file providing a module is imported first
+    'loader_index': bool,
+
     # Tell the client to show minions that have timed out
     'show_timeout': bool,
 
@@ -302,6 +326,15 @@ VALID_OPTS = {
     # Fire events as state chunks are processed by the state compiler
     'state_events': bool,
 
+    # Skip the state chunks which last succeeded without changes and did not change since
+    'state_incremental': bool,
+
+    # The number of processes calling the state chunks which do not depend on each other at once
+    'state_parallel': int,
+
+    # Cache the compiled highstate and reuse it while the files, pillar and grains it came from do not change
+    'state_compile_cache': bool,
+
     # The number of seconds a minion should wait before retry when attempting authentication
     'acceptance_wait_time': float,
 
@@ -359,6 +392,14 @@ VALID_OPTS = {
     # specified by 'event_return'
     'event_return_queue': int,
 
+    # The number of seconds after which queued events are sent to the event
+    # returner even if there are less than event_return_queue of them
+    'event_return_flush_interval': int,
+
+    # The number of events the event returner could not store which are kept
+    # on disk to be retried
+    'event_return_spool_max': int,
+
     # Only forward events to an event returner if it matches one of the tags in this list
     'event_return_whitelist': list,
 
@@ -428,6 +469,10 @@ VALID_OPTS = {
     'gitfs_passphrase': str,
     'gitfs_env_whitelist': list,
     'gitfs_env_blacklist': list,
+
+    # Serve gitfs files straight from the git object database instead of
+    # checking them out in the cachedir
+    'gitfs_serve_objects': bool,
     'hgfs_remotes': list,
     'hgfs_mountpoint': str,
     'hgfs_root': str,
@@ -457,6 +502,16 @@ VALID_OPTS = {
     # Whether or not a copy of the master opts dict should be rendered into minion pillars
     'pillar_opts': bool,
 
+    # Cache the pillar data compiled for each minion on the master
+    'pillar_cache': bool,
+
+    # The number of seconds compiled pillar data is cached for at most
+    'pillar_cache_ttl': int,
+
+    # The number of rendered top and SLS files which render the same in any context to keep in
+    # memory. Set to 0 to disable the render cache.
+    'render_cache_size': int,
+
 
     'pillar_safe_render_error': bool,
     'pillar_source_merging_strategy': str,
@@ -478,6 +533,7 @@ VALID_OPTS = {
     'fileserver_followsymlinks': bool,
     'fileserver_ignoresymlinks': bool,
     'fileserver_limit_traversal': bool,
+    'file_roots_watch': bool,
 
     # The number of open files a daemon is allowed to have open. Frequently needs to be increased
     # higher than the system default in order to account for the way zeromq consumes file handles.
@@ -512,6 +568,10 @@ VALID_OPTS = {
     # reply from executions.
     'minion_data_cache': bool,
 
+    # Maintain an index of the grains and pillar data in the minion data cache, so that grain and
+    # pillar targets can be resolved without reading the cached data of every minion
+    'minion_data_cache_index': bool,
+
     # The number of seconds between AES key rotations on the master
     'publish_session': int,
 
@@ -521,12 +581,29 @@ VALID_OPTS = {
     # The TTL for the cache of the reactor configuration
     'reactor_refresh_interval': int,
 
-    # The number of workers for the runner/wheel in the reactor
+    # The number of workers for the runner/wheel in the reactor, when
+    # reactor_event_threads is 0
     'reactor_worker_threads': int,
 
-    # The queue size for workers in the reactor
+    # The queue size for workers in the reactor, when reactor_event_threads
+    # is 0
     'reactor_worker_hwm': int,
 
+    # The number of threads running reactions to events in the reactor, 0
+    # runs them one at a time in the event loop
+    'reactor_event_threads': int,
+
+    # The number of events which may wait for a reactor thread
+    'reactor_event_hwm': int,
+
+    # The number of reactions to events with the same tag which may run at
+    # once, 0 for no limit
+    'reactor_tag_concurrency': int,
+
+    # The seconds to wait for room in the reactor queue before dropping an
+    # event
+    'reactor_queue_timeout': int,
+
     'serial': str,
     'search': str,
 
@@ -550,6 +627,14 @@ VALID_OPTS = {
     # The number of minutes between the minion refreshing its cache of grains
     'grains_refresh_every': int,
 
+    # The number of grain functions called at the same time, 0 calls them one
+    # after the other
+    'grains_threads': int,
+
+    # The number of seconds after which a grain function still running is
+    # given up on
+    'grains_timeout': int,
+
     # Use lspci to gather system data for grains on a minion
     'enable_lspci': bool,
 
@@ -731,6 +816,7 @@ DEFAULT_MINION_OPTS = {
     'gitfs_passphrase': '',
     'gitfs_env_whitelist': [],
     'gitfs_env_blacklist': [],
+    'gitfs_serve_objects': False,
     'hash_type': 'md5',
     'disable_modules': [],
     'disable_returners': [],
@@ -748,10 +834,15 @@ DEFAULT_MINION_OPTS = {
     'auto_accept': True,
     'autosign_timeout': 120,
     'multiprocessing': True,
+    'minion_workers': 0,
+    'minion_worker_max_jobs': 100,
+    'minion_worker_queue': 0,
     'mine_interval': 60,
     'ipc_mode': _DFLT_IPC_MODE,
     'ipv6': False,
     'file_buffer_size': 262144,
+    'file_pipeline': 1,
+    'file_chunk_size': 0,
     'tcp_pub_port': 4510,
     'tcp_pull_port': 4511,
     'log_file': os.path.join(salt.syspaths.LOGS_DIR, 'minion'),
@@ -766,10 +857,14 @@ DEFAULT_MINION_OPTS = {
     'test': False,
     'ext_job_cache': '',
     'cython_enable': False,
+    'loader_index': True,
     'state_verbose': True,
     'state_output': 'full',
     'state_auto_order': True,
     'state_events': False,
+    'state_incremental': False,
+    'state_parallel': 0,
+    'state_compile_cache': False,
     'state_aggregate': False,
     'acceptance_wait_time': 10,
     'acceptance_wait_time_max': 0,
@@ -795,6 +890,8 @@ DEFAULT_MINION_OPTS = {
     'tcp_keepalive_intvl': -1,
     'modules_max_memory': -1,
     'grains_refresh_every': 0,
+    'grains_threads': 8,
+    'grains_timeout': 30,
     'minion_id_caching': True,
     'keysize': 2048,
     'transport': 'zeromq',
@@ -861,6 +958,7 @@ DEFAULT_MASTER_OPTS = {
     'gitfs_passphrase': '',
     'gitfs_env_whitelist': [],
     'gitfs_env_blacklist': [],
+    'gitfs_serve_objects': False,
     'hgfs_remotes': [],
     'hgfs_mountpoint': '',
     'hgfs_root': '',
@@ -886,6 +984,9 @@ DEFAULT_MASTER_OPTS = {
     'ext_pillar': [],
     'pillar_version': 2,
     'pillar_opts': False,
+    'pillar_cache': False,
+    'pillar_cache_ttl': 3600,
+    'render_cache_size': 1000,
     'pillar_safe_render_error': True,
     'pillar_source_merging_strategy': 'smart',
     'ping_on_rotate': False,
@@ -903,12 +1004,14 @@ DEFAULT_MASTER_OPTS = {
     'file_recv': False,
     'file_recv_max_size': 100,
     'file_buffer_size': 1048576,
+    'file_buffer_size_max': 8388608,
     'file_ignore_regex': None,
     'file_ignore_glob': None,
     'fileserver_backend': ['roots'],
     'fileserver_followsymlinks': True,
     'fileserver_ignoresymlinks': False,
     'fileserver_limit_traversal': False,
+    'file_roots_watch': False,
     'max_open_files': 100000,
     'hash_type': 'md5',
     'conf_file': os.path.join(salt.syspaths.CONFIG_DIR, 'master'),
@@ -923,6 +1026,7 @@ DEFAULT_MASTER_OPTS = {
     'ext_job_cache': '',
     'master_job_cache': 'local_cache',
     'minion_data_cache': True,
+    'minion_data_cache_index': False,
     'enforce_mine_cache': False,
     'ipc_mode': _DFLT_IPC_MODE,
     'ipv6': False,
@@ -945,8 +1049,14 @@ DEFAULT_MASTER_OPTS = {
     'reactor_refresh_interval': 60,
     'reactor_worker_threads': 10,
     'reactor_worker_hwm': 10000,
+    'reactor_event_threads': 10,
+    'reactor_event_hwm': 10000,
+    'reactor_tag_concurrency': 0,
+    'reactor_queue_timeout': 5,
     'event_return': '',
     'event_return_queue': 0,
+    'event_return_flush_interval': 5,
+    'event_return_spool_max': 100000,
     'event_return_whitelist': [],
     'event_return_blacklist': [],
     'serial': 'msgpack',
@@ -960,6 +1070,7 @@ DEFAULT_MASTER_OPTS = {
     'loop_interval': 60,
     'nodegroups': {},
     'cython_enable': False,
+    'loader_index': True,
     'enable_gpu_grains': False,
     # XXX: Remove 'key_logfile' support in 2014.1.0
     'key_logfile': os.path.join(salt.syspaths.LOGS_DIR, 'key'),
@@ -103,12 +103,25 @@ def gen_keys(keydir, keyname, keysize, user=None):
     return priv
 
 
-def sign_message(privkey_path, message):
+def get_sign_key(privkey_path):
+    '''
+    Load a private key for use with sign_message, so that callers signing many
+    messages do not have to read and parse the key for every message.
+    '''
+    log.debug('salt.crypt.get_sign_key: Loading private key')
+    return EVP.load_key(privkey_path)
+
+
+def sign_message(privkey_path, message, evp_rsa=None):
     '''
     Use M2Crypto's EVP ("Envelope") functions to sign a message.  Returns the signature.
+
+    A key returned by get_sign_key can be passed as ``evp_rsa`` to avoid
+    loading the key from ``privkey_path``.
     '''
-    log.debug('salt.crypt.sign_message: Loading private key')
-    evp_rsa = EVP.load_key(privkey_path)
+    if evp_rsa is None:
+        log.debug('salt.crypt.sign_message: Loading private key')
+        evp_rsa = EVP.load_key(privkey_path)
     evp_rsa.sign_init()
     evp_rsa.sign_update(message)
     log.debug('salt.crypt.sign_message: Signing message.')
@@ -32,6 +32,7 @@ import salt.utils.atomicfile
 import salt.utils.event
 import salt.utils.verify
 import salt.utils.minions
+import salt.utils.pillar_cache
 import salt.utils.gzip_util
 import salt.utils.jid
 from salt.pillar import git_pillar
@@ -402,6 +403,10 @@ class RemoteFuncs(object):
                 states=False,
                 rend=False)
         self.__setup_fileserver()
+        if self.opts.get('pillar_cache', False):
+            self.pillar_cache = salt.utils.pillar_cache.PillarCache(opts)
+        else:
+            self.pillar_cache = None
 
     def __setup_fileserver(self):
         '''
@@ -409,7 +414,9 @@ class RemoteFuncs(object):
         '''
         fs_ = salt.fileserver.Fileserver(self.opts)
         self._serve_file = fs_.serve_file
+        self._serve_files = fs_.serve_files
         self._file_hash = fs_.file_hash
+        self._file_manifest = fs_.file_manifest
         self._file_list = fs_.file_list
         self._file_list_emptydirs = fs_.file_list_emptydirs
         self._dir_list = fs_.dir_list
@@ -686,16 +693,31 @@ class RemoteFuncs(object):
         '''
         if any(key not in load for key in ('id', 'grains')):
             return False
-        pillar = salt.pillar.Pillar(
-                self.opts,
-                load['grains'],
-                load['id'],
-                load.get('saltenv', load.get('env')),
-                load.get('ext'),
-                self.mminion.functions,
-                pillar=load.get('pillar_override', {}))
-        pillar_dirs = {}
-        data = pillar.compile_pillar(pillar_dirs=pillar_dirs)
+        saltenv = load.get('saltenv', load.get('env'))
+        # On demand ext_pillar and pillar overrides are not cached
+        use_cache = self.pillar_cache is not None \
+            and not load.get('ext') and not load.get('pillar_override')
+        data = None
+        if use_cache:
+            data = self.pillar_cache.get(load['id'], saltenv, load['grains'])
+        if data is None:
+            pillar = salt.pillar.Pillar(
+                    self.opts,
+                    load['grains'],
+                    load['id'],
+                    saltenv,
+                    load.get('ext'),
+                    self.mminion.functions,
+                    pillar=load.get('pillar_override', {}))
+            pillar_dirs = {}
+            data = pillar.compile_pillar(pillar_dirs=pillar_dirs)
+            if use_cache:
+                self.pillar_cache.store(load['id'],
+                                        saltenv,
+                                        load['grains'],
+                                        data,
+                                        pillar.sources,
+                                        pillar.ext_pillars_run)
         if self.opts.get('minion_data_cache', False):
             cdir = os.path.join(self.opts['cachedir'], 'minions', load['id'])
             if not os.path.isdir(cdir):
@@ -711,6 +733,8 @@ class RemoteFuncs(object):
                             )
             # On Windows, os.rename will fail if the destination file exists.
             salt.utils.atomicfile.atomic_rename(tmpfname, datap)
+            if self.ckminions.index is not None:
+                self.ckminions.index.update(load['id'], load['grains'], data)
         return data
 
     def _minion_event(self, load):
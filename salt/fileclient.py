@@ -6,6 +6,7 @@ from __future__ import absolute_import
 
 # Import python libs
 import contextlib
+import collections
 import logging
 import hashlib
 import os
@@ -20,13 +21,18 @@ import salt.crypt
 import salt.loader
 import salt.payload
 import salt.transport
+import salt.transport.client
 import salt.fileserver
 import salt.utils
 import salt.utils.templates
 import salt.utils.gzip_util
 import salt.utils.http
+from salt.utils.async import SyncWrapper, current_ioloop
 from salt.utils.openstack.swift import SaltSwift
 
+# Import 3rd-party libs
+import tornado.gen
+
 # pylint: disable=no-name-in-module,import-error
 import salt.ext.six.moves.BaseHTTPServer as BaseHTTPServer
 from salt.ext.six.moves.urllib.error import HTTPError, URLError
@@ -187,9 +193,24 @@ class Client(object):
             # Backwards compatibility
             saltenv = env
 
+        return self._cache_prefix('', saltenv)
+
+    def _cache_prefix(self, prefix, saltenv, include_pat=None,
+                      exclude_pat=None):
+        '''
+        Cache the files under a prefix of an environment which match the
+        include and exclude patterns, return the paths of the cached files
+        '''
         ret = []
-        for path in self.file_list(saltenv):
-            ret.append(self.cache_file('salt://{0}'.format(path), saltenv))
+        # go through the list of all files finding ones that are in
+        # the target directory and caching them
+        for fn_ in self.file_list(saltenv):
+            if fn_.strip() and fn_.startswith(prefix):
+                if salt.utils.check_include_exclude(
+                        fn_, include_pat, exclude_pat):
+                    fn_ = self.cache_file('salt://' + fn_, saltenv)
+                    if fn_:
+                        ret.append(fn_)
         return ret
 
     def cache_dir(self, path, saltenv='base', include_empty=False,
@@ -221,15 +242,8 @@ class Client(object):
                 path, saltenv
             )
         )
-        # go through the list of all files finding ones that are in
-        # the target directory and caching them
-        for fn_ in self.file_list(saltenv):
-            if fn_.strip() and fn_.startswith(path):
-                if salt.utils.check_include_exclude(
-                        fn_, include_pat, exclude_pat):
-                    fn_ = self.cache_file('salt://' + fn_, saltenv)
-                    if fn_:
-                        ret.append(fn_)
+        ret.extend(
+            self._cache_prefix(path, saltenv, include_pat, exclude_pat))
 
         if include_empty:
             # Break up the path into a list containing the bottom-level
@@ -925,14 +939,67 @@ class RemoteClient(Client):
             self.auth = self.channel.auth
         else:
             self.auth = ''
+        # The channels file chunks are requested through in pipelined
+        # transfers, see _pipeline_channels()
+        self._pipeline = None
 
     def _refresh_channel(self):
         '''
         Reset the channel, in the event of an interruption
         '''
         self.channel = salt.transport.Channel.factory(self.opts)
+        self._pipeline = None
         return self.channel
 
+    def _pipeline_channels(self):
+        '''
+        Return the channels to request the chunks of a file through, one per
+        chunk kept in flight, or None if the chunks are requested one after
+        the other
+        '''
+        window = self.opts.get('file_pipeline', 1)
+        if window < 2 or not isinstance(self.channel, SyncWrapper):
+            # Only the asynchronous channels can have requests in flight
+            return None
+        if self._pipeline is None:
+            io_loop = self.channel.io_loop
+            with current_ioloop(io_loop):
+                # A ZeroMQ channel is created for each socket, the
+                # multiplexing transports return the same channel
+                self._pipeline = [
+                    salt.transport.client.AsyncReqChannel.factory(
+                        self.opts, io_loop=io_loop, socket=idx)
+                    for idx in range(window)]
+        return self._pipeline
+
+    @tornado.gen.coroutine
+    def _fetch_chunks(self, load, fn_, size, channels):
+        '''
+        Fetch the chunks of a file from the current position of ``fn_`` to
+        the end of the file, with a request in flight on each channel
+        '''
+        pending = collections.deque()
+        loc = fn_.tell()
+        eof = False
+        while pending or not eof:
+            while not eof and len(pending) < len(channels):
+                channel = channels[(loc // size) % len(channels)]
+                pending.append(channel.send(dict(load, loc=loc)))
+                loc += size
+            data = yield pending.popleft()
+            if not isinstance(data, dict) or 'data' not in data:
+                raise MinionError(
+                    'Unexpected reply to a file chunk request: {0}'.format(
+                        data))
+            if data.get('gzip', None):
+                chunk = salt.utils.gzip_util.uncompress(data['data'])
+            else:
+                chunk = data['data']
+            fn_.write(chunk)
+            if len(chunk) < size:
+                # The chunks still in flight are past the end of the file
+                eof = True
+
     def get_file(self,
                  path,
                  dest='',
@@ -1012,6 +1079,9 @@ class RemoteClient(Client):
         if gzip:
             gzip = int(gzip)
             load['gzip'] = gzip
+        if self.opts.get('file_chunk_size'):
+            load['size'] = self.opts['file_chunk_size']
+        pipelined = False
 
         fn_ = None
         if dest:
@@ -1059,11 +1129,33 @@ class RemoteClient(Client):
                     if os.path.isdir(dest):
                         salt.utils.rm_rf(dest)
                     fn_ = salt.utils.fopen(dest, 'wb+')
+            # Masters which serve the chunks in a fixed size tell it
+            size = data.get('size')
             if data.get('gzip', None):
                 data = salt.utils.gzip_util.uncompress(data['data'])
             else:
                 data = data['data']
             fn_.write(data)
+            channels = None if pipelined else self._pipeline_channels()
+            if channels and size and len(data) == size:
+                # Fetch the rest of the file with several chunks in flight
+                pipelined = True
+                io_loop = self.channel.io_loop
+                with current_ioloop(io_loop):
+                    io_loop.run_sync(lambda: self._fetch_chunks(
+                        load, fn_, size, channels))
+                fn_.flush()
+                if not isinstance(hash_server, dict) \
+                        or 'hsum' not in hash_server \
+                        or salt.utils.get_hash(
+                            dest,
+                            hash_server.get('hash_type', 'md5')
+                        ) == hash_server['hsum']:
+                    break
+                log.warn('Bad pipelined download of file {0}, fetching it '
+                         'again one chunk at a time'.format(path))
+                fn_.seek(0)
+                fn_.truncate()
         if fn_:
             fn_.close()
             log.info(
@@ -1100,6 +1192,104 @@ class RemoteClient(Client):
 
         return self.channel.send(load)
 
+    def file_manifest(self, saltenv='base', prefix=''):
+        '''
+        Return the hash, hash type, size and mode of the files under a prefix
+        of an environment on the master, keyed by path, or False if the
+        master does not serve manifests
+        '''
+        load = {'saltenv': saltenv,
+                'prefix': prefix,
+                'cmd': '_file_manifest'}
+        return self.channel.send(load)
+
+    def _cache_prefix(self, prefix, saltenv, include_pat=None,
+                      exclude_pat=None):
+        '''
+        Cache the files under a prefix of an environment which match the
+        include and exclude patterns, return the paths of the cached files.
+
+        The files already cached with the hash the master has are not
+        fetched again, and the small files are fetched several at once.
+        '''
+        manifest = self.file_manifest(saltenv, prefix)
+        if not isinstance(manifest, dict):
+            return super(RemoteClient, self)._cache_prefix(
+                prefix, saltenv, include_pat, exclude_pat)
+        ret = []
+        fetch = []
+        for fn_ in sorted(manifest):
+            if not fn_.strip() or not fn_.startswith(prefix):
+                continue
+            if not salt.utils.check_include_exclude(
+                    fn_, include_pat, exclude_pat):
+                continue
+            hsum, hash_type, size = manifest[fn_][:3]
+            dest = os.path.join(self.opts['cachedir'], 'files', saltenv, fn_)
+            if os.path.isfile(dest) \
+                    and size in (None, os.path.getsize(dest)) \
+                    and salt.utils.get_hash(dest, hash_type or 'md5') == hsum:
+                log.debug('File {0!r} in saltenv {1!r} is up to date in the '
+                          'cache'.format(fn_, saltenv))
+                ret.append(dest)
+            else:
+                fetch.append((fn_, size))
+        ret.extend(self._fetch_files(fetch, saltenv))
+        return ret
+
+    def _fetch_files(self, files, saltenv):
+        '''
+        Cache a list of (path, size) files from the master, return the paths
+        of the cached files. The files smaller than the file chunk size are
+        fetched together in requests of up to that size.
+        '''
+        limit = max(self.opts.get('file_chunk_size', 0),
+                    self.opts['file_buffer_size'])
+        batches = []
+        batch_size = limit
+        single = []
+        for fn_, size in files:
+            if size is None or size >= limit:
+                single.append(fn_)
+                continue
+            if batch_size + size > limit:
+                batches.append([])
+                batch_size = 0
+            batches[-1].append(fn_)
+            batch_size += size
+
+        ret = []
+        for batch in batches:
+            load = {'saltenv': saltenv,
+                    'paths': batch,
+                    'size': limit,
+                    'cmd': '_serve_files'}
+            served = self.channel.send(load)
+            if not isinstance(served, dict):
+                served = {}
+            for fn_ in batch:
+                if fn_ not in served:
+                    # Too large for the master to send with the others
+                    single.append(fn_)
+                    continue
+                if served[fn_].get('gzip', None):
+                    data = salt.utils.gzip_util.uncompress(
+                        served[fn_]['data'])
+                else:
+                    data = served[fn_]['data']
+                with self._cache_loc(fn_, saltenv) as dest:
+                    if os.path.isdir(dest):
+                        salt.utils.rm_rf(dest)
+                    with salt.utils.fopen(dest, 'wb+') as ofile:
+                        ofile.write(data)
+                ret.append(dest)
+
+        for fn_ in single:
+            dest = self.cache_file('salt://' + fn_, saltenv)
+            if dest:
+                ret.append(dest)
+        return ret
+
     def file_list_emptydirs(self, saltenv='base', prefix='', env=None):
         '''
         List the empty dirs on the master
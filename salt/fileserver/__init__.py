@@ -16,6 +16,7 @@ import time
 import salt.loader
 import salt.utils
 import salt.utils.locales
+import salt.utils.gzip_util
 
 # Import 3rd-party libs
 import salt.ext.six as six
@@ -270,6 +271,57 @@ def is_file_ignored(opts, fname):
     return False
 
 
+def _chunk_size(load, opts):
+    '''
+    Return the size of the chunks a ``_serve_file`` load is served in
+    '''
+    size = opts['file_buffer_size']
+    if load.get('size'):
+        size = min(int(load['size']),
+                   max(size, opts.get('file_buffer_size_max', size)))
+        size = max(size, 1)
+    return size
+
+
+def _chunk(data, size, load):
+    '''
+    Return the chunk of data to serve, gzip compressed if the load asks for it
+    '''
+    ret = {'size': size}
+    gzip = load.get('gzip', None)
+    if gzip and data:
+        data = salt.utils.gzip_util.compress(data, gzip)
+        ret['gzip'] = gzip
+    ret['data'] = data
+    return ret
+
+
+def read_chunk(path, load, opts):
+    '''
+    Read the chunk of the file at ``path`` a ``_serve_file`` load asks for,
+    return the ``data`` and the ``size`` of the chunks the file is served
+    in, which minions fetching several chunks at once rely on.
+
+    The chunks are ``file_buffer_size`` bytes, unless the load asks for
+    another ``size``, which can not exceed ``file_buffer_size_max``. The data
+    is gzip compressed at the level given by ``gzip`` in the load, if any.
+    '''
+    size = _chunk_size(load, opts)
+    with salt.utils.fopen(path, 'rb') as fp_:
+        fp_.seek(load['loc'])
+        data = fp_.read(size)
+    return _chunk(data, size, load)
+
+
+def slice_chunk(data, load, opts):
+    '''
+    Like :py:func:`read_chunk`, for a file whose contents are already in
+    memory
+    '''
+    size = _chunk_size(load, opts)
+    return _chunk(data[load['loc']:load['loc'] + size], size, load)
+
+
 class Fileserver(object):
     '''
     Create a fileserver wrapper object that wraps the fileserver functions and
@@ -528,6 +580,89 @@ class Fileserver(object):
             return self.servers[fstr](load, fnd)
         return ''
 
+    def file_manifest(self, load):
+        '''
+        Return the hash, hash type, size and mode of every file under a prefix
+        of an environment, for minions to fetch only the files they do not
+        have in one request. The size and mode are None for the files which
+        are not on the local filesystem of the master.
+        '''
+        if 'env' in load:
+            salt.utils.warn_until(
+                'Boron',
+                'Passing a salt environment should be done using \'saltenv\' '
+                'not \'env\'. This functionality will be removed in Salt '
+                'Boron.'
+            )
+            load['saltenv'] = load.pop('env')
+
+        ret = {}
+        if 'saltenv' not in load:
+            return ret
+        for path in self.file_list(load):
+            fnd = self.find_file(path, load['saltenv'])
+            fstr = '{0}.file_hash'.format(fnd.get('back'))
+            if fstr not in self.servers:
+                continue
+            hsum = self.servers[fstr](
+                {'path': path, 'saltenv': load['saltenv']}, fnd)
+            if not hsum or 'hsum' not in hsum:
+                continue
+            size = mode = None
+            try:
+                stat = os.stat(fnd['path'])
+                size = stat.st_size
+                mode = stat.st_mode & 0o7777
+            except (KeyError, TypeError, OSError):
+                pass
+            ret[path] = [hsum['hsum'], hsum.get('hash_type'), size, mode]
+        return ret
+
+    def serve_files(self, load):
+        '''
+        Serve up several whole files at once. The files which do not fit in
+        the ``size`` the load asks for are left out, as are the files past
+        ``file_buffer_size_max`` bytes in the reply, to be fetched in chunks.
+        '''
+        if 'env' in load:
+            salt.utils.warn_until(
+                'Boron',
+                'Passing a salt environment should be done using \'saltenv\' '
+                'not \'env\'. This functionality will be removed in Salt '
+                'Boron.'
+            )
+            load['saltenv'] = load.pop('env')
+
+        ret = {}
+        if 'paths' not in load or 'saltenv' not in load:
+            return ret
+        limit = max(self.opts['file_buffer_size'],
+                    self.opts.get('file_buffer_size_max', 0))
+        size = min(int(load.get('size') or limit), limit)
+        gzip = load.get('gzip', None)
+        total = 0
+        for path in load['paths']:
+            fnd = self.find_file(path, load['saltenv'])
+            fstr = '{0}.serve_file'.format(fnd.get('back'))
+            if fstr not in self.servers:
+                continue
+            chunk = self.servers[fstr](
+                {'path': path, 'saltenv': load['saltenv'], 'loc': 0,
+                 'size': size},
+                fnd)
+            data = chunk.get('data')
+            if data is None or len(data) >= chunk.get('size', 0):
+                # The file may not be complete
+                continue
+            total += len(data)
+            if total > limit and ret:
+                break
+            ret[path] = {'data': data}
+            if gzip and data:
+                ret[path] = {'data': salt.utils.gzip_util.compress(data, gzip),
+                             'gzip': gzip}
+        return ret
+
     def file_list(self, load):
         '''
         Return a list of files from the dominant environment
@@ -127,15 +127,7 @@ def serve_file(load, fnd):
     if not fnd['path']:
         return ret
     ret['dest'] = fnd['rel']
-    gzip = load.get('gzip', None)
-
-    with salt.utils.fopen(fnd['path'], 'rb') as fp_:
-        fp_.seek(load['loc'])
-        data = fp_.read(__opts__['file_buffer_size'])
-        if gzip and data:
-            data = salt.utils.gzip_util.compress(data, gzip)
-            ret['gzip'] = gzip
-        ret['data'] = data
+    ret.update(salt.fileserver.read_chunk(fnd['path'], load, __opts__))
     return ret
 
 
@@ -48,6 +48,7 @@ Walkthrough <tutorial-gitfs>`.
 
 # Import python libs
 from __future__ import absolute_import
+import binascii
 import copy
 import distutils.version  # pylint: disable=import-error,no-name-in-module
 import errno
@@ -60,6 +61,7 @@ import re
 import shutil
 import stat
 import subprocess
+import tempfile
 from datetime import datetime
 
 VALID_PROVIDERS = ('gitpython', 'pygit2', 'dulwich')
@@ -97,9 +99,12 @@ _INVALID_REPO = (
 
 # Import salt libs
 import salt.utils
+import salt.utils.atomicfile
 import salt.fileserver
+import salt.payload
 from salt.exceptions import FileserverConfigError
 from salt.utils.event import tagify
+from salt.utils.odict import OrderedDict
 
 # Import third party libs
 import salt.ext.six as six
@@ -133,6 +138,23 @@ log = logging.getLogger(__name__)
 # Define the module's virtual name
 __virtualname__ = 'git'
 
+# The index of the trees of the remotes, used to serve files from the git
+# object database when gitfs_serve_objects is enabled. It is refreshed from the
+# tree SHAs update() writes when a ref moves.
+_TREE_INDEX = {'stamp': None, 'envs': {}, 'trees': {}, 'lists': {},
+               'repos': None}
+# The persistent index of the trees of each remote, keyed by tree SHA
+_TREE_STORES = {}
+# The hashes of the blobs, keyed by blob SHA and hash type
+_BLOB_HASHES = {}
+# The blobs read last, keyed by blob SHA. Minions ask for the chunks of a
+# file one after the other, in between the chunks of the files other minions
+# ask for.
+_BLOB_DATA = OrderedDict()
+# The most bytes of blob data kept in _BLOB_DATA. The blob read last is kept
+# whatever its size.
+BLOB_CACHE_SIZE = 32 * 1024 * 1024
+
 
 def _verify_gitpython(quiet=False):
     '''
@@ -1269,6 +1291,9 @@ def update():
         with salt.utils.fopen(env_cache, 'w+') as fp_:
             fp_.write(serial.dumps(new_envs))
             log.trace('Wrote env cache data to {0}'.format(env_cache))
+    trees_cache = os.path.join(__opts__['cachedir'], 'gitfs/trees.p')
+    if data.get('changed', False) is True or not os.path.isfile(trees_cache):
+        _update_tree_index(repos)
 
     # if there is a change, fire an event
     if __opts__.get('fileserver_events', False):
@@ -1279,6 +1304,14 @@ def update():
                 opts=__opts__,
                 listen=False)
         event.fire_event(data, tagify(['gitfs', 'update'], prefix='fileserver'))
+    if __opts__.get('gitfs_serve_objects', False):
+        # Nothing is checked out when serving from the git object database,
+        # remove what was before it was enabled
+        for subdir in ('refs', 'hash'):
+            cache_path = os.path.join(__opts__['cachedir'], 'gitfs', subdir)
+            if os.path.isdir(cache_path):
+                salt.utils.rm_rf(cache_path)
+        return
     try:
         salt.fileserver.reap_fileserver_cache_dir(
             os.path.join(__opts__['cachedir'], 'gitfs/hash'),
@@ -1389,6 +1422,494 @@ def _envs_dulwich(repo):
     return ret
 
 
+def _get_tree_sha(repo, tgt_env):
+    '''
+    Return the SHA of the tree a remote has for an environment, or None if the
+    branch/tag/SHA is not found
+    '''
+    provider = _get_provider()
+    if provider == 'gitpython':
+        tree = _get_tree_gitpython(repo, tgt_env)
+        if tree is not None:
+            return tree.hexsha
+    elif provider == 'pygit2':
+        tree = _get_tree_pygit2(repo, tgt_env)
+        if tree is not None:
+            return tree.hex
+    elif provider == 'dulwich':
+        tree = _get_tree_dulwich(repo, tgt_env)
+        if isinstance(tree, dulwich.objects.Tree):
+            return tree.id
+    return None
+
+
+def _get_env_trees(repos, tgt_env):
+    '''
+    Return the SHA of the tree each remote has for an environment, keyed by
+    the hash of the remote
+    '''
+    ret = {}
+    for repo in repos:
+        tree_sha = _get_tree_sha(repo, tgt_env)
+        if tree_sha is not None:
+            ret[repo['hash']] = tree_sha
+    return ret
+
+
+def _update_tree_index(repos):
+    '''
+    Add the trees the refs moved to to the persistent index of the trees of
+    each remote, by reading only the trees which are not in it yet, and drop
+    the trees no environment uses any more. Then write the SHAs of the trees
+    of every environment, from which the processes serving files from the git
+    object database refresh their index.
+    '''
+    trees_cache = os.path.join(__opts__['cachedir'], 'gitfs/trees.p')
+    env_trees = {}
+    for tgt_env in envs(ignore_cache=True):
+        env_trees[tgt_env] = _get_env_trees(repos, tgt_env)
+    for repo in repos:
+        store = _tree_store(repo)
+        roots = set([trees[repo['hash']]
+                     for trees in six.itervalues(env_trees)
+                     if repo['hash'] in trees])
+        try:
+            for tree_sha in roots:
+                _index_trees(repo, store, tree_sha)
+        except Exception as exc:
+            log.error(
+                'Exception \'{0}\' caught while indexing the trees of gitfs '
+                'remote {1}'.format(exc, repo['url']),
+                exc_info_on_loglevel=logging.DEBUG
+            )
+            continue
+        used = set()
+        links = set()
+        stack = list(roots)
+        while stack:
+            tree_sha = stack.pop()
+            if tree_sha in used:
+                continue
+            used.add(tree_sha)
+            stack.extend([sub_sha for _, sub_sha
+                          in store['trees'][tree_sha]['trees']])
+            links.update([blob_sha for _, mode, blob_sha
+                          in store['trees'][tree_sha]['blobs']
+                          if stat.S_ISLNK(mode)])
+        for tree_sha in list(store['trees']):
+            if tree_sha not in used:
+                del store['trees'][tree_sha]
+        for blob_sha in list(store['links']):
+            if blob_sha not in links:
+                del store['links'][blob_sha]
+        _write_tree_store(repo, store)
+
+    serial = salt.payload.Serial(__opts__)
+    cumask = os.umask(0o77)
+    try:
+        tmpfh, tmpfname = tempfile.mkstemp(dir=os.path.dirname(trees_cache))
+        os.close(tmpfh)
+        with salt.utils.fopen(tmpfname, 'w+b') as fp_:
+            fp_.write(serial.dumps(env_trees))
+        salt.utils.atomicfile.atomic_rename(tmpfname, trees_cache)
+        log.trace('Wrote tree cache data to {0}'.format(trees_cache))
+    except (IOError, OSError) as exc:
+        log.error(
+            'Unable to write gitfs tree cache {0}: {1}'
+            .format(trees_cache, exc)
+        )
+    finally:
+        os.umask(cumask)
+
+
+def _object_repos():
+    '''
+    Return the repos files are served from when gitfs_serve_objects is
+    enabled, they are only initialized again when a ref moves
+    '''
+    if _TREE_INDEX['repos'] is None:
+        _TREE_INDEX['repos'] = init()
+    return _TREE_INDEX['repos']
+
+
+def _env_trees(tgt_env):
+    '''
+    Return the SHA of the tree each remote has for an environment, as seen by
+    the last update(), or None if the environment does not exist. The index
+    of the trees no environment uses any more is dropped.
+    '''
+    trees_cache = os.path.join(__opts__['cachedir'], 'gitfs/trees.p')
+    try:
+        st_ = os.stat(trees_cache)
+    except OSError:
+        # update() has not run yet, look the trees up
+        if tgt_env not in envs():
+            return None
+        return _get_env_trees(_object_repos(), tgt_env)
+    stamp = (st_.st_ino, st_.st_mtime, st_.st_size)
+    if stamp != _TREE_INDEX['stamp']:
+        serial = salt.payload.Serial(__opts__)
+        try:
+            with salt.utils.fopen(trees_cache, 'rb') as fp_:
+                env_trees = serial.load(fp_)
+        except (IOError, OSError):
+            if tgt_env not in envs():
+                return None
+            return _get_env_trees(_object_repos(), tgt_env)
+        live = set()
+        for trees in six.itervalues(env_trees):
+            live.update(six.iteritems(trees))
+        for key in list(_TREE_INDEX['trees']):
+            if key not in live:
+                del _TREE_INDEX['trees'][key]
+        blobs = set()
+        for index in six.itervalues(_TREE_INDEX['trees']):
+            blobs.update(six.itervalues(index['blobs']))
+        for key in list(_BLOB_HASHES):
+            if key[0] not in blobs:
+                del _BLOB_HASHES[key]
+        for key in list(_BLOB_DATA):
+            if key not in blobs:
+                del _BLOB_DATA[key]
+        _TREE_INDEX.update({'stamp': stamp,
+                            'envs': env_trees,
+                            'lists': {},
+                            'repos': None})
+    return _TREE_INDEX['envs'].get(tgt_env)
+
+
+def _read_tree(repo, tree_sha):
+    '''
+    Return the name, mode and SHA of the blobs in a tree, and the name and SHA
+    of its subtrees
+    '''
+    provider = _get_provider()
+    ret = {'blobs': [], 'trees': []}
+    if provider == 'gitpython':
+        tree = repo['repo'].tree(tree_sha)
+        for obj in tree.blobs:
+            ret['blobs'].append([obj.name, obj.mode, obj.hexsha])
+        for obj in tree.trees:
+            ret['trees'].append([obj.name, obj.hexsha])
+    elif provider == 'pygit2':
+        for entry in repo['repo'][tree_sha]:
+            if stat.S_ISDIR(entry.filemode):
+                ret['trees'].append([entry.name, entry.hex])
+            elif stat.S_ISREG(entry.filemode) \
+                    or stat.S_ISLNK(entry.filemode):
+                ret['blobs'].append([entry.name, entry.filemode, entry.hex])
+    elif provider == 'dulwich':
+        for item in six.iteritems(repo['repo'].get_object(tree_sha)):
+            if stat.S_ISDIR(item.mode):
+                ret['trees'].append([item.path, item.sha])
+            elif stat.S_ISREG(item.mode) or stat.S_ISLNK(item.mode):
+                ret['blobs'].append([item.path, item.mode, item.sha])
+    return ret
+
+
+def _read_blob(repo, blob_sha):
+    '''
+    Return the contents of the blob with the given SHA
+    '''
+    provider = _get_provider()
+    if provider == 'gitpython':
+        return repo['repo'].odb.stream(binascii.unhexlify(blob_sha)).read()
+    elif provider == 'pygit2':
+        return repo['repo'][blob_sha].data
+    elif provider == 'dulwich':
+        return repo['repo'].get_object(blob_sha).as_raw_string()
+
+
+def _tree_store(repo):
+    '''
+    Return the persistent index of the trees of a remote: the entries of every
+    tree, keyed by tree SHA, and the targets of the symlinks, keyed by blob
+    SHA. It is loaded again when update() has written a new one.
+    '''
+    store_path = os.path.join(repo['cachedir'], 'tree_index.p')
+    store = _TREE_STORES.get(repo['hash'])
+    try:
+        st_ = os.stat(store_path)
+    except OSError:
+        if store is None:
+            store = {'stamp': None, 'trees': {}, 'links': {}}
+            _TREE_STORES[repo['hash']] = store
+        return store
+    stamp = (st_.st_ino, st_.st_mtime, st_.st_size)
+    if store is None or store['stamp'] != stamp:
+        store = {'stamp': stamp, 'trees': {}, 'links': {}}
+        serial = salt.payload.Serial(__opts__)
+        try:
+            with salt.utils.fopen(store_path, 'rb') as fp_:
+                store.update(serial.load(fp_))
+        except (IOError, OSError) as exc:
+            log.error(
+                'Unable to read gitfs tree index {0}: {1}'
+                .format(store_path, exc)
+            )
+        _TREE_STORES[repo['hash']] = store
+    return store
+
+
+def _write_tree_store(repo, store):
+    '''
+    Write the persistent index of the trees of a remote
+    '''
+    store_path = os.path.join(repo['cachedir'], 'tree_index.p')
+    serial = salt.payload.Serial(__opts__)
+    cumask = os.umask(0o77)
+    try:
+        tmpfh, tmpfname = tempfile.mkstemp(dir=repo['cachedir'])
+        os.close(tmpfh)
+        with salt.utils.fopen(tmpfname, 'w+b') as fp_:
+            fp_.write(serial.dumps({'trees': store['trees'],
+                                    'links': store['links']}))
+        salt.utils.atomicfile.atomic_rename(tmpfname, store_path)
+        log.trace('Wrote gitfs tree index {0}'.format(store_path))
+    except (IOError, OSError) as exc:
+        log.error(
+            'Unable to write gitfs tree index {0}: {1}'
+            .format(store_path, exc)
+        )
+    finally:
+        os.umask(cumask)
+
+
+def _index_trees(repo, store, tree_sha):
+    '''
+    Add a tree and its subtrees to the index of the trees of a remote. A tree
+    is only added once all of its subtrees are, so the trees already in the
+    index are not read again, nor are their subtrees: only the trees which
+    changed since the index was last updated are.
+    '''
+    pending = {}
+    stack = [tree_sha]
+    while stack:
+        sha = stack[-1]
+        if sha in store['trees']:
+            stack.pop()
+        elif sha not in pending:
+            pending[sha] = _read_tree(repo, sha)
+            stack.extend([sub_sha for _, sub_sha in pending[sha]['trees']
+                          if sub_sha not in store['trees']])
+        else:
+            stack.pop()
+            entries = pending.pop(sha)
+            for _, mode, blob_sha in entries['blobs']:
+                if stat.S_ISLNK(mode) and blob_sha not in store['links']:
+                    # The blob data of a symlink is its target
+                    store['links'][blob_sha] = _read_blob(repo, blob_sha)
+            store['trees'][sha] = entries
+
+
+def _lookup_entry(store, tree_sha, path):
+    '''
+    Return the mode and SHA of the blob at a path of a tree from the index,
+    or None if there is no blob at that path
+    '''
+    parts = path.split(os.path.sep)
+    for name in parts[:-1]:
+        tree_sha = dict(store['trees'][tree_sha]['trees']).get(name)
+        if tree_sha is None:
+            return None
+    for name, mode, blob_sha in store['trees'][tree_sha]['blobs']:
+        if name == parts[-1]:
+            return mode, blob_sha
+    return None
+
+
+def _build_index(repo, tree_sha):
+    '''
+    Return the index of a tree of a remote: the blob each path on the
+    fileserver resolves to once symlinks are followed, every file path, the
+    symlink targets and the directories. The entries of the trees come from
+    the persistent index of the trees of the remote.
+    '''
+    index = {'blobs': {}, 'files': [], 'symlinks': {}, 'dirs': []}
+    store = _tree_store(repo)
+    _index_trees(repo, store, tree_sha)
+    root_sha = tree_sha
+    if repo['root']:
+        for name in repo['root'].split(os.path.sep):
+            root_sha = dict(store['trees'][root_sha]['trees']).get(name)
+            if root_sha is None:
+                return index
+        relpath = lambda path: os.path.relpath(path, repo['root'])
+    else:
+        relpath = lambda path: path
+    add_mountpoint = lambda path: os.path.join(repo['mountpoint'], path)
+
+    stack = [(repo['root'], root_sha)]
+    while stack:
+        prefix, sha = stack.pop()
+        entries = store['trees'][sha]
+        for name, sub_sha in entries['trees']:
+            repo_path = os.path.join(prefix, name)
+            index['dirs'].append(add_mountpoint(relpath(repo_path)))
+            stack.append((repo_path, sub_sha))
+        for name, mode, blob_sha in entries['blobs']:
+            repo_path = os.path.join(prefix, name)
+            file_path = add_mountpoint(relpath(repo_path))
+            index['files'].append(file_path)
+            depth = 0
+            while stat.S_ISLNK(mode):
+                # Follow the symlink, its target is relative to the directory
+                # it is in
+                link_tgt = store['links'][blob_sha]
+                if depth == 0:
+                    index['symlinks'][file_path] = link_tgt
+                depth += 1
+                repo_path = os.path.normpath(
+                    os.path.join(os.path.dirname(repo_path), link_tgt)
+                )
+                entry = _lookup_entry(store, tree_sha, repo_path)
+                if depth > SYMLINK_RECURSE_DEPTH or entry is None:
+                    break
+                mode, blob_sha = entry
+            else:
+                index['blobs'][file_path] = blob_sha
+    if repo['mountpoint']:
+        index['dirs'].append(repo['mountpoint'])
+    return index
+
+
+def _index_tree(repo, tree_sha):
+    '''
+    Return the index of a tree of a remote, kept in memory for the
+    environments served from the git object database
+    '''
+    key = (repo['hash'], tree_sha)
+    if key not in _TREE_INDEX['trees']:
+        _TREE_INDEX['trees'][key] = _build_index(repo, tree_sha)
+    return _TREE_INDEX['trees'][key]
+
+
+def _merge_indexes(indexes):
+    '''
+    Return the files, symlinks and directories of the indexes of the trees the
+    remotes have for an environment
+    '''
+    files = set()
+    symlinks = {}
+    dirs = set()
+    for index in indexes:
+        files.update(index['files'])
+        symlinks.update(index['symlinks'])
+        dirs.update(index['dirs'])
+    return {'files': sorted(files),
+            'symlinks': symlinks,
+            'dirs': sorted(dirs)}
+
+
+def _object_lists(tgt_env):
+    '''
+    Return the files, symlinks and directories of an environment from the
+    index of the trees of the remotes
+    '''
+    trees = _env_trees(tgt_env)
+    if trees is None:
+        return {}
+    key = tuple(sorted(six.iteritems(trees)))
+    cached = _TREE_INDEX['lists'].get(tgt_env)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    ret = _merge_indexes([_index_tree(repo, trees[repo['hash']])
+                          for repo in _object_repos()
+                          if repo['hash'] in trees])
+    _TREE_INDEX['lists'][tgt_env] = (key, ret)
+    return ret
+
+
+def _find_object(path, tgt_env):
+    '''
+    Find the first blob to match the path and ref in the index of the trees of
+    the remotes
+    '''
+    fnd = {'path': '',
+           'rel': ''}
+    trees = _env_trees(tgt_env)
+    if trees is None:
+        return fnd
+    for repo in _object_repos():
+        if repo['hash'] not in trees:
+            continue
+        index = _index_tree(repo, trees[repo['hash']])
+        blob_sha = index['blobs'].get(path)
+        if blob_sha is None:
+            continue
+        # Nothing is checked out, the path only names the file in the logs
+        fnd['path'] = os.path.join(
+            __opts__['cachedir'], 'gitfs/refs', tgt_env, path
+        )
+        fnd['rel'] = path
+        fnd['repo'] = repo['hash']
+        fnd['blob'] = blob_sha
+        return fnd
+    return fnd
+
+
+def _blob_repo(fnd):
+    '''
+    Return the repo of the blob a fnd structure from _find_object() points to
+    '''
+    for repo in _object_repos():
+        if repo['hash'] == fnd['repo']:
+            return repo
+    return None
+
+
+def _blob_data(fnd):
+    '''
+    Return the contents of the blob a fnd structure from _find_object() points
+    to
+    '''
+    blob_sha = fnd['blob']
+    if blob_sha in _BLOB_DATA:
+        # Move it to the end, as the most recently used
+        data = _BLOB_DATA.pop(blob_sha)
+        _BLOB_DATA[blob_sha] = data
+        return data
+    repo = _blob_repo(fnd)
+    if repo is None:
+        return ''
+    data = _BLOB_DATA[blob_sha] = _read_blob(repo, blob_sha)
+    size = sum(len(x) for x in six.itervalues(_BLOB_DATA))
+    while size > BLOB_CACHE_SIZE and len(_BLOB_DATA) > 1:
+        size -= len(_BLOB_DATA.popitem(last=False)[1])
+    return data
+
+
+def _hash_blob(fnd, hash_type):
+    '''
+    Return the hash of the blob a fnd structure from _find_object() points
+    to, without holding the whole blob in memory where the provider can
+    stream it
+    '''
+    hasher = getattr(hashlib, hash_type)()
+    blob_sha = fnd['blob']
+    if blob_sha in _BLOB_DATA:
+        hasher.update(_BLOB_DATA[blob_sha])
+        return hasher.hexdigest()
+    repo = _blob_repo(fnd)
+    if repo is None:
+        return ''
+    provider = _get_provider()
+    if provider == 'gitpython':
+        stream = repo['repo'].odb.stream(binascii.unhexlify(blob_sha))
+        while True:
+            chunk = stream.read(__opts__['file_buffer_size'])
+            if not chunk:
+                break
+            hasher.update(chunk)
+    elif provider == 'pygit2':
+        # pygit2 has no stream of the contents of a blob
+        hasher.update(repo['repo'][blob_sha].data)
+    elif provider == 'dulwich':
+        for chunk in repo['repo'].get_object(blob_sha).as_raw_chunks():
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
 def find_file(path, tgt_env='base', **kwargs):  # pylint: disable=W0613
     '''
     Find the first file to match the path and ref, read the file out of git
@@ -1396,7 +1917,11 @@ def find_file(path, tgt_env='base', **kwargs):  # pylint: disable=W0613
     '''
     fnd = {'path': '',
            'rel': ''}
-    if os.path.isabs(path) or tgt_env not in envs():
+    if os.path.isabs(path):
+        return fnd
+    if __opts__.get('gitfs_serve_objects', False):
+        return _find_object(path, tgt_env)
+    if tgt_env not in envs():
         return fnd
 
     provider = _get_provider()
@@ -1593,14 +2118,12 @@ def serve_file(load, fnd):
     if not fnd['path']:
         return ret
     ret['dest'] = fnd['rel']
-    gzip = load.get('gzip', None)
-    with salt.utils.fopen(fnd['path'], 'rb') as fp_:
-        fp_.seek(load['loc'])
-        data = fp_.read(__opts__['file_buffer_size'])
-        if gzip and data:
-            data = salt.utils.gzip_util.compress(data, gzip)
-            ret['gzip'] = gzip
-        ret['data'] = data
+    if 'blob' in fnd:
+        ret.update(
+            salt.fileserver.slice_chunk(_blob_data(fnd), load, __opts__)
+        )
+        return ret
+    ret.update(salt.fileserver.read_chunk(fnd['path'], load, __opts__))
     return ret
 
 
@@ -1619,6 +2142,13 @@ def file_hash(load, fnd):
     if not all(x in load for x in ('path', 'saltenv')):
         return ''
     ret = {'hash_type': __opts__['hash_type']}
+    if 'blob' in fnd:
+        # Blobs are hashed once, whichever path or ref they are found at
+        key = (fnd['blob'], __opts__['hash_type'])
+        if key not in _BLOB_HASHES:
+            _BLOB_HASHES[key] = _hash_blob(fnd, __opts__['hash_type'])
+        ret['hsum'] = _BLOB_HASHES[key]
+        return ret
     relpath = fnd['rel']
     path = fnd['path']
     hashdest = os.path.join(__opts__['cachedir'],
@@ -1651,6 +2181,8 @@ def _file_lists(load, form):
         )
         load['saltenv'] = load.pop('env')
 
+    if __opts__.get('gitfs_serve_objects', False):
+        return _object_lists(load['saltenv']).get(form, [])
     list_cachedir = os.path.join(__opts__['cachedir'], 'file_lists/gitfs')
     if not os.path.isdir(list_cachedir):
         try:
@@ -1673,9 +2205,7 @@ def _file_lists(load, form):
     if cache_match is not None:
         return cache_match
     if refresh_cache:
-        ret = {}
-        ret['files'], ret['symlinks'] = _get_file_list(load)
-        ret['dirs'] = _get_dir_list(load)
+        ret = _get_lists(load)
         if save_cache:
             salt.fileserver.write_file_list_cache(
                 __opts__, ret, list_cache, w_lock
@@ -1696,10 +2226,10 @@ def file_list(load):
     return _file_lists(load, 'files')
 
 
-def _get_file_list(load):
+def _get_lists(load):
     '''
-    Return a list of all files on the file server in a specified
-    environment
+    Return the files, symlinks and directories of an environment from the
+    index of the trees of the remotes
     '''
     if 'env' in load:
         salt.utils.warn_until(
@@ -1709,163 +2239,14 @@ def _get_file_list(load):
         )
         load['saltenv'] = load.pop('env')
 
-    provider = _get_provider()
     if 'saltenv' not in load or load['saltenv'] not in envs():
-        return [], {}
-    files = set()
-    symlinks = {}
+        return {'files': [], 'symlinks': {}, 'dirs': []}
+    indexes = []
     for repo in init():
-        fl_func = None
-        if provider == 'gitpython':
-            fl_func = _file_list_gitpython
-        elif provider == 'pygit2':
-            fl_func = _file_list_pygit2
-        elif provider == 'dulwich':
-            fl_func = _file_list_dulwich
-        try:
-            repo_files, repo_symlinks = fl_func(repo, load['saltenv'])
-        except TypeError:
-            # We should never get here unless the gitfs_provider is not
-            # accounted for in tbe above if/elif block.
-            continue
-        else:
-            files.update(repo_files)
-            symlinks.update(repo_symlinks)
-    return sorted(files), symlinks
-
-
-def _file_list_gitpython(repo, tgt_env):
-    '''
-    Get file list using GitPython
-    '''
-    files = set()
-    symlinks = {}
-    if tgt_env == 'base':
-        tgt_env = repo['base']
-    tree = _get_tree_gitpython(repo, tgt_env)
-    if not tree:
-        return files, symlinks
-    if repo['root']:
-        try:
-            tree = tree / repo['root']
-        except KeyError:
-            return files, symlinks
-        relpath = lambda path: os.path.relpath(path, repo['root'])
-    else:
-        relpath = lambda path: path
-    add_mountpoint = lambda path: os.path.join(repo['mountpoint'], path)
-    for file_blob in tree.traverse():
-        if not isinstance(file_blob, git.Blob):
-            continue
-        file_path = add_mountpoint(relpath(file_blob.path))
-        files.add(file_path)
-        if stat.S_ISLNK(file_blob.mode):
-            stream = six.StringIO()
-            file_blob.stream_data(stream)
-            stream.seek(0)
-            link_tgt = stream.read()
-            stream.close()
-            symlinks[file_path] = link_tgt
-    return files, symlinks
-
-
-def _file_list_pygit2(repo, tgt_env):
-    '''
-    Get file list using pygit2
-    '''
-    def _traverse(tree, repo_obj, blobs, prefix):
-        '''
-        Traverse through a pygit2 Tree object recursively, accumulating all the
-        file paths and symlink info in the "blobs" dict
-        '''
-        for entry in iter(tree):
-            obj = repo_obj[entry.oid]
-            if isinstance(obj, pygit2.Blob):
-                repo_path = os.path.join(prefix, entry.name)
-                blobs.setdefault('files', []).append(repo_path)
-                if stat.S_ISLNK(tree[entry.name].filemode):
-                    link_tgt = repo_obj[tree[entry.name].oid].data
-                    blobs.setdefault('symlinks', {})[repo_path] = link_tgt
-            elif isinstance(obj, pygit2.Tree):
-                _traverse(obj,
-                          repo_obj,
-                          blobs,
-                          os.path.join(prefix, entry.name))
-    files = set()
-    symlinks = {}
-    if tgt_env == 'base':
-        tgt_env = repo['base']
-    tree = _get_tree_pygit2(repo, tgt_env)
-    if not tree:
-        return files, symlinks
-    if repo['root']:
-        try:
-            # This might need to be changed to account for a root that
-            # spans more than one directory
-            oid = tree[repo['root']].oid
-            tree = repo['repo'][oid]
-        except KeyError:
-            return files, symlinks
-        if not isinstance(tree, pygit2.Tree):
-            return files, symlinks
-        relpath = lambda path: os.path.relpath(path, repo['root'])
-    else:
-        relpath = lambda path: path
-    blobs = {}
-    if len(tree):
-        _traverse(tree, repo['repo'], blobs, repo['root'])
-    add_mountpoint = lambda path: os.path.join(repo['mountpoint'], path)
-    for repo_path in blobs.get('files', []):
-        files.add(add_mountpoint(relpath(repo_path)))
-    for repo_path, link_tgt in six.iteritems(blobs.get('symlinks', {})):
-        symlinks[add_mountpoint(relpath(repo_path))] = link_tgt
-    return files, symlinks
-
-
-def _file_list_dulwich(repo, tgt_env):
-    '''
-    Get file list using dulwich
-    '''
-    def _traverse(tree, repo_obj, blobs, prefix):
-        '''
-        Traverse through a dulwich Tree object recursively, accumulating all the
-        file paths and symlink info in the "blobs" dict
-        '''
-        for item in six.iteritems(tree):
-            obj = repo_obj.get_object(item.sha)
-            if isinstance(obj, dulwich.objects.Blob):
-                repo_path = os.path.join(prefix, item.path)
-                blobs.setdefault('files', []).append(repo_path)
-                mode, oid = tree[item.path]
-                if stat.S_ISLNK(mode):
-                    link_tgt = repo_obj.get_object(oid).as_raw_string()
-                    blobs.setdefault('symlinks', {})[repo_path] = link_tgt
-            elif isinstance(obj, dulwich.objects.Tree):
-                _traverse(obj,
-                          repo_obj,
-                          blobs,
-                          os.path.join(prefix, item.path))
-    files = set()
-    symlinks = {}
-    if tgt_env == 'base':
-        tgt_env = repo['base']
-    tree = _get_tree_dulwich(repo, tgt_env)
-    tree = _dulwich_walk_tree(repo['repo'], tree, repo['root'])
-    if not isinstance(tree, dulwich.objects.Tree):
-        return files, symlinks
-    blobs = {}
-    if len(tree):
-        _traverse(tree, repo['repo'], blobs, repo['root'])
-    if repo['root']:
-        relpath = lambda path: os.path.relpath(path, repo['root'])
-    else:
-        relpath = lambda path: path
-    add_mountpoint = lambda path: os.path.join(repo['mountpoint'], path)
-    for repo_path in blobs.get('files', []):
-        files.add(add_mountpoint(relpath(repo_path)))
-    for repo_path, link_tgt in six.iteritems(blobs.get('symlinks', {})):
-        symlinks[add_mountpoint(relpath(repo_path))] = link_tgt
-    return files, symlinks
+        tree_sha = _get_tree_sha(repo, load['saltenv'])
+        if tree_sha is not None:
+            indexes.append(_build_index(repo, tree_sha))
+    return _merge_indexes(indexes)
 
 
 def file_list_emptydirs(load):  # pylint: disable=W0613
@@ -1883,153 +2264,6 @@ def dir_list(load):
     return _file_lists(load, 'dirs')
 
 
-def _get_dir_list(load):
-    '''
-    Get a list of all directories on the master
-    '''
-    if 'env' in load:
-        salt.utils.warn_until(
-            'Boron',
-            'Passing a salt environment should be done using \'saltenv\' '
-            'not \'env\'. This functionality will be removed in Salt Boron.'
-        )
-        load['saltenv'] = load.pop('env')
-
-    provider = _get_provider()
-    if 'saltenv' not in load or load['saltenv'] not in envs():
-        return []
-    ret = set()
-    for repo in init():
-        if provider == 'gitpython':
-            ret.update(
-                _dir_list_gitpython(repo, load['saltenv'])
-            )
-        elif provider == 'pygit2':
-            ret.update(
-                _dir_list_pygit2(repo, load['saltenv'])
-            )
-        elif provider == 'dulwich':
-            ret.update(
-                _dir_list_dulwich(repo, load['saltenv'])
-            )
-    return sorted(ret)
-
-
-def _dir_list_gitpython(repo, tgt_env):
-    '''
-    Get list of directories using GitPython
-    '''
-    ret = set()
-    if tgt_env == 'base':
-        tgt_env = repo['base']
-    tree = _get_tree_gitpython(repo, tgt_env)
-    if not tree:
-        return ret
-    if repo['root']:
-        try:
-            tree = tree / repo['root']
-        except KeyError:
-            return ret
-        relpath = lambda path: os.path.relpath(path, repo['root'])
-    else:
-        relpath = lambda path: path
-    add_mountpoint = lambda path: os.path.join(repo['mountpoint'], path)
-    for blob in tree.traverse():
-        if isinstance(blob, git.Tree):
-            ret.add(add_mountpoint(relpath(blob.path)))
-    if repo['mountpoint']:
-        ret.add(repo['mountpoint'])
-    return ret
-
-
-def _dir_list_pygit2(repo, tgt_env):
-    '''
-    Get a list of directories using pygit2
-    '''
-    def _traverse(tree, repo_obj, blobs, prefix):
-        '''
-        Traverse through a pygit2 Tree object recursively, accumulating all the
-        empty directories within it in the "blobs" list
-        '''
-        for entry in iter(tree):
-            blob = repo_obj[entry.oid]
-            if not isinstance(blob, pygit2.Tree):
-                continue
-            blobs.append(os.path.join(prefix, entry.name))
-            if len(blob):
-                _traverse(blob,
-                          repo_obj,
-                          blobs,
-                          os.path.join(prefix, entry.name))
-    ret = set()
-    if tgt_env == 'base':
-        tgt_env = repo['base']
-    tree = _get_tree_pygit2(repo, tgt_env)
-    if not tree:
-        return ret
-    if repo['root']:
-        try:
-            oid = tree[repo['root']].oid
-            tree = repo['repo'][oid]
-        except KeyError:
-            return ret
-        if not isinstance(tree, pygit2.Tree):
-            return ret
-        relpath = lambda path: os.path.relpath(path, repo['root'])
-    else:
-        relpath = lambda path: path
-    blobs = []
-    if len(tree):
-        _traverse(tree, repo['repo'], blobs, repo['root'])
-    add_mountpoint = lambda path: os.path.join(repo['mountpoint'], path)
-    for blob in blobs:
-        ret.add(add_mountpoint(relpath(blob)))
-    if repo['mountpoint']:
-        ret.add(repo['mountpoint'])
-    return ret
-
-
-def _dir_list_dulwich(repo, tgt_env):
-    '''
-    Get a list of directories using pygit2
-    '''
-    def _traverse(tree, repo_obj, blobs, prefix):
-        '''
-        Traverse through a dulwich Tree object recursively, accumulating all
-        the empty directories within it in the "blobs" list
-        '''
-        for item in six.iteritems(tree):
-            obj = repo_obj.get_object(item.sha)
-            if not isinstance(obj, dulwich.objects.Tree):
-                continue
-            blobs.append(os.path.join(prefix, item.path))
-            if len(repo_obj.get_object(item.sha)):
-                _traverse(obj,
-                          repo_obj,
-                          blobs,
-                          os.path.join(prefix, item.path))
-    ret = set()
-    if tgt_env == 'base':
-        tgt_env = repo['base']
-    tree = _get_tree_dulwich(repo, tgt_env)
-    tree = _dulwich_walk_tree(repo['repo'], tree, repo['root'])
-    if not isinstance(tree, dulwich.objects.Tree):
-        return ret
-    blobs = []
-    if len(tree):
-        _traverse(tree, repo['repo'], blobs, repo['root'])
-    if repo['root']:
-        relpath = lambda path: os.path.relpath(path, repo['root'])
-    else:
-        relpath = lambda path: path
-    add_mountpoint = lambda path: os.path.join(repo['mountpoint'], path)
-    for blob in blobs:
-        ret.add(add_mountpoint(relpath(blob)))
-    if repo['mountpoint']:
-        ret.add(repo['mountpoint'])
-    return ret
-
-
 def symlink_list(load):
     '''
     Return a dict of all symlinks based on a given path in the repo
@@ -14,21 +14,65 @@ be in the :conf_master:`fileserver_backend` list to enable this backend.
 
 Fileserver environments are defined using the :conf_master:`file_roots`
 configuration option.
+
+File hashes are kept in an index keyed by saltenv and relative path, which is
+rebuilt by :py:func:`update` on every maintenance interval and written to
+``cachedir/roots/hash_index.<hash_type>.p``. An entry is only used while the
+mtime, size and inode of the file still match, so :py:func:`file_hash` only
+has to stat the file to serve a hash.
+
+When :conf_master:`file_roots_watch` is enabled, :py:func:`update` also keeps
+the file lists of every environment up to date by only rescanning the
+directories which changed, found with inotify if pyinotify is installed and by
+comparing directory mtimes otherwise. The lists are written to the file list
+caches, which the master workers then serve from memory instead of walking the
+file_roots themselves. When inotify is used, the hash index is also only
+refreshed for the files in the directories which changed.
 '''
 from __future__ import absolute_import
 
 # Import python libs
 import os
+import bisect
+import shutil
 import logging
+import tempfile
 
 # Import salt libs
 import salt.fileserver
+import salt.payload
 import salt.utils
+import salt.utils.atomicfile
 from salt.utils.event import tagify
 import salt.ext.six as six
 
+# Import third party libs
+try:
+    import pyinotify
+    HAS_PYINOTIFY = True
+    # Files written to or touched mark their directory as changed too, for
+    # the hash index
+    WATCH_MASK = (pyinotify.IN_CREATE | pyinotify.IN_DELETE |
+                  pyinotify.IN_MOVED_FROM | pyinotify.IN_MOVED_TO |
+                  pyinotify.IN_DELETE_SELF | pyinotify.IN_CLOSE_WRITE |
+                  pyinotify.IN_ATTRIB)
+except ImportError:
+    HAS_PYINOTIFY = False
+
 log = logging.getLogger(__name__)
 
+# In-memory copy of the hash index. ``stamp`` identifies the version of the
+# index file that ``data`` was loaded from.
+_HASH_INDEX = {'stamp': None, 'data': {}}
+
+# File lists loaded from the file list caches when file_roots_watch is
+# enabled, keyed by saltenv
+_FILE_LISTS = {}
+
+# State kept between calls to update() when file_roots_watch is enabled
+_WATCH = {'trees': {}, 'manager': None, 'notifier': None, 'watched': set(),
+          'failed': False, 'dirty': set(), 'overflow': False}
+
 
 def find_file(path, saltenv='base', env=None, **kwargs):
     '''
@@ -99,29 +143,389 @@ def serve_file(load, fnd):
     if not fnd['path']:
         return ret
     ret['dest'] = fnd['rel']
-    gzip = load.get('gzip', None)
-    with salt.utils.fopen(os.path.normpath(fnd['path']), 'rb') as fp_:
-        fp_.seek(load['loc'])
-        data = fp_.read(__opts__['file_buffer_size'])
-        if gzip and data:
-            data = salt.utils.gzip_util.compress(data, gzip)
-            ret['gzip'] = gzip
-        ret['data'] = data
+    ret.update(salt.fileserver.read_chunk(os.path.normpath(fnd['path']), load, __opts__))
+    return ret
+
+
+def _load_cache(path, cache):
+    '''
+    Load the serialized file at ``path`` into ``cache['data']``, unless it was
+    already loaded from the same version of the file. Returns False if the
+    file could not be read.
+    '''
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+    # Caches are replaced by a rename, so the inode changes even if a cache
+    # is rewritten within the mtime resolution
+    stamp = [path, stat.st_mtime, stat.st_size, stat.st_ino]
+    if stamp != cache.get('stamp'):
+        try:
+            with salt.utils.fopen(path, 'rb') as fp_:
+                data = salt.payload.Serial(__opts__).load(fp_)
+        except Exception as exc:
+            log.debug('Unable to load roots cache {0}: {1}'.format(path, exc))
+            return False
+        cache['data'] = data
+        cache['stamp'] = stamp
+    return True
+
+
+def _write_cache(path, data):
+    '''
+    Atomically replace the serialized file at ``path`` with ``data``
+    '''
+    cache_dir = os.path.dirname(path)
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+    tmpfh, tmpfname = tempfile.mkstemp(dir=cache_dir)
+    os.close(tmpfh)
+    with salt.utils.fopen(tmpfname, 'w+b') as fp_:
+        fp_.write(salt.payload.Serial(__opts__).dumps(data))
+    salt.utils.atomicfile.atomic_rename(tmpfname, path)
+
+
+def _hash_index_path():
+    '''
+    Return the path to the hash index for the configured hash_type
+    '''
+    return os.path.join(__opts__['cachedir'],
+                        'roots',
+                        'hash_index.{0}.p'.format(__opts__['hash_type']))
+
+
+def _stat_key(path):
+    '''
+    Return the values used to tell whether a hash index entry for a file is
+    still valid
+    '''
+    stat = os.stat(path)
+    return [stat.st_mtime, stat.st_size, stat.st_ino]
+
+
+def _hash_index():
+    '''
+    Return the in-memory hash index, reloading it first if update() has
+    written a new index file since it was last loaded
+    '''
+    _load_cache(_hash_index_path(), _HASH_INDEX)
+    return _HASH_INDEX['data']
+
+
+def _update_hash_index(trees=None):
+    '''
+    Hash every file in the file_roots and write out the hash index. Files
+    which have not changed since the last run keep their hash.
+
+    ``trees`` are the directory trees of the file_roots kept up to date with
+    inotify, keyed by root. The files are then listed from the trees, and
+    only the files in the directories rescanned by their last refresh, and
+    the files reached through a symlink, are checked for changes.
+    '''
+    old_index = _hash_index()
+    new_index = {}
+    for saltenv, roots in six.iteritems(__opts__['file_roots']):
+        old_env = old_index.get(saltenv, {})
+        env_index = new_index.setdefault(saltenv, {})
+        for root in roots:
+            tree = None
+            if trees is not None:
+                tree = trees.get(os.path.normpath(root))
+            if tree is None:
+                walk = os.walk(
+                    root,
+                    followlinks=__opts__['fileserver_followsymlinks'])
+            else:
+                walk = tree.walk()
+            for item in walk:
+                dirpath, filenames = item[0], item[2]
+                # The files of a directory which was not rescanned have not
+                # changed, unless they are reached through a symlink, which
+                # inotify does not follow
+                unchanged = set()
+                if tree is not None and dirpath not in tree.scanned \
+                        and not tree.nodes[dirpath]['linked']:
+                    unchanged.update(filenames)
+                    unchanged.difference_update(item[3])
+                for fname in filenames:
+                    path = os.path.join(dirpath, fname)
+                    rel_fn = os.path.relpath(path, root)
+                    # find_file serves the file from the first root it is in
+                    if rel_fn in env_index:
+                        continue
+                    entry = old_env.get(rel_fn)
+                    if fname in unchanged \
+                            and entry is not None \
+                            and entry[0] == path:
+                        env_index[rel_fn] = entry
+                        continue
+                    if salt.fileserver.is_file_ignored(__opts__, rel_fn):
+                        continue
+                    try:
+                        stat = _stat_key(path)
+                    except OSError:
+                        # Dangling symlink
+                        continue
+                    if entry is None or entry[:4] != [path] + stat:
+                        try:
+                            hsum = salt.utils.get_hash(path,
+                                                       __opts__['hash_type'])
+                        except (IOError, OSError):
+                            continue
+                        entry = [path] + stat + [hsum]
+                    env_index[rel_fn] = entry
+
+    _write_cache(_hash_index_path(), new_index)
+    _HASH_INDEX['data'] = new_index
+    _HASH_INDEX['stamp'] = None
+    return new_index
+
+
+class _RootTree(object):
+    '''
+    The directory listing of a file_roots directory, which is refreshed by
+    rescanning only the directories which changed
+    '''
+    def __init__(self, root, followlinks):
+        self.root = root
+        self.followlinks = followlinks
+        # Maps the path of each directory to its listing
+        self.nodes = {}
+        self.changed = False
+        # The directories listed again by the last refresh
+        self.scanned = set()
+        self._scan(root, False)
+
+    def _drop(self, path):
+        '''
+        Forget a directory and everything below it
+        '''
+        if self.nodes.pop(path, None) is None:
+            return
+        self.changed = True
+        prefix = os.path.join(path, '')
+        for dir_ in [x for x in self.nodes if x.startswith(prefix)]:
+            del self.nodes[dir_]
+
+    def _scan(self, path, linked):
+        '''
+        List a directory, then scan the subdirectories which have not been
+        seen before. ``linked`` is True for directories reached through a
+        symlink.
+        '''
+        try:
+            mtime = os.stat(path).st_mtime
+            names = os.listdir(path)
+        except OSError:
+            self._drop(path)
+            return
+        self.scanned.add(path)
+        node = {'mtime': mtime,
+                'dirs': [],
+                'files': [],
+                'links': [],
+                'linked': linked}
+        for name in names:
+            full = os.path.join(path, name)
+            # Split entries the same way os.walk does
+            if os.path.isdir(full):
+                node['dirs'].append(name)
+            else:
+                node['files'].append(name)
+                if os.path.islink(full):
+                    node['links'].append(name)
+        old = self.nodes.get(path)
+        self.nodes[path] = node
+        if old is None or any(old[x] != node[x]
+                              for x in ('dirs', 'files', 'links')):
+            self.changed = True
+        if old is not None:
+            for name in set(old['dirs']).difference(node['dirs']):
+                self._drop(os.path.join(path, name))
+        for name in node['dirs']:
+            full = os.path.join(path, name)
+            is_link = os.path.islink(full)
+            if is_link and not self.followlinks:
+                # os.walk lists the link but does not descend into it
+                self._drop(full)
+            elif full not in self.nodes:
+                self._scan(full, linked or is_link)
+
+    def refresh(self, dirty=None):
+        '''
+        Rescan the directories which changed and return True if the listing
+        is different. If ``dirty`` is None, every directory is checked for a
+        new mtime. Otherwise the directories in ``dirty`` are rescanned, and
+        only the directories reached through a symlink, which inotify does
+        not follow, are checked.
+        '''
+        self.changed = False
+        self.scanned = set()
+        if self.root not in self.nodes:
+            self._scan(self.root, False)
+            return self.changed
+        if dirty is None:
+            paths = sorted(self.nodes)
+        else:
+            paths = sorted(
+                [x for x in dirty if x in self.nodes] +
+                [x for x, node in six.iteritems(self.nodes) if node['linked']]
+            )
+        for path in paths:
+            node = self.nodes.get(path)
+            if node is None:
+                # Dropped while rescanning its parent
+                continue
+            if dirty is not None and path in dirty:
+                self._scan(path, node['linked'])
+                continue
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                self._drop(path)
+                continue
+            if mtime != node['mtime']:
+                self._scan(path, node['linked'])
+        return self.changed
+
+    def walk(self):
+        '''
+        Yield (dirpath, dirnames, filenames, links) for every directory, where
+        links are the filenames which are symlinks
+        '''
+        for path, node in six.iteritems(self.nodes):
+            yield path, node['dirs'], node['files'], node['links']
+
+
+def _queue_event(event):
+    '''
+    Record the directory an inotify event happened in
+    '''
+    if event.mask & pyinotify.IN_Q_OVERFLOW:
+        _WATCH['overflow'] = True
+    else:
+        _WATCH['dirty'].add(event.path)
+
+
+def _watch_dirty(roots):
+    '''
+    Watch the given file_roots directories with inotify and return the set of
+    directories which changed since the last call, or None if every
+    directory has to be checked
+    '''
+    if not HAS_PYINOTIFY:
+        return None
+    if _WATCH['failed']:
+        return None
+    if _WATCH['notifier'] is None:
+        _WATCH['manager'] = pyinotify.WatchManager()
+        _WATCH['notifier'] = pyinotify.Notifier(_WATCH['manager'],
+                                                default_proc_fun=_queue_event)
+    for root in roots:
+        if root in _WATCH['watched']:
+            continue
+        wdds = _WATCH['manager'].add_watch(root,
+                                           WATCH_MASK,
+                                           rec=True,
+                                           auto_add=True)
+        _WATCH['watched'].add(root)
+        if any(wd < 0 for wd in six.itervalues(wdds)):
+            log.warning(
+                'Unable to watch all of {0} with inotify, directory mtimes '
+                'will be checked instead. The fs.inotify.max_user_watches '
+                'sysctl may need to be raised.'.format(root)
+            )
+            _WATCH['failed'] = True
+            _WATCH['notifier'].stop()
+            return None
+    notifier = _WATCH['notifier']
+    while notifier.check_events(timeout=0):
+        notifier.read_events()
+    notifier.process_events()
+    ret = _WATCH['dirty']
+    if _WATCH['overflow']:
+        log.debug('The inotify event queue overflowed, checking all '
+                  'directories of the file_roots')
+        ret = None
+    _WATCH['dirty'] = set()
+    _WATCH['overflow'] = False
     return ret
 
 
+def _list_cache_path(saltenv):
+    '''
+    Return the path to the file list cache for a saltenv
+    '''
+    return os.path.join(__opts__['cachedir'],
+                        'file_lists/roots',
+                        '{0}.p'.format(saltenv))
+
+
+def _update_watched_file_lists():
+    '''
+    Bring the directory trees of the file_roots up to date and rewrite the
+    file list caches of the environments which changed. Return the trees if
+    inotify told which directories changed, None if they were all checked.
+    '''
+    roots = set()
+    for paths in six.itervalues(__opts__['file_roots']):
+        roots.update(os.path.normpath(x) for x in paths)
+    for root in set(_WATCH['trees']).difference(roots):
+        del _WATCH['trees'][root]
+    dirty = _watch_dirty(roots)
+    changed = set()
+    for root in roots:
+        tree = _WATCH['trees'].get(root)
+        if tree is None:
+            _WATCH['trees'][root] = _RootTree(
+                root, __opts__['fileserver_followsymlinks'])
+            changed.add(root)
+        elif tree.refresh(dirty):
+            changed.add(root)
+
+    for saltenv, paths in six.iteritems(__opts__['file_roots']):
+        list_cache = _list_cache_path(saltenv)
+        if not changed.intersection(os.path.normpath(x) for x in paths) \
+                and os.path.isfile(list_cache):
+            continue
+        ret = {
+            'files': [],
+            'dirs': [],
+            'empty_dirs': [],
+            'links': []
+        }
+        for path in paths:
+            _add_file_lists(ret, path,
+                            _WATCH['trees'][os.path.normpath(path)].walk())
+        for form in ret:
+            ret[form].sort()
+        _write_cache(list_cache, ret)
+    if dirty is None:
+        # Directory mtimes do not change when a file is written to
+        return None
+    return _WATCH['trees']
+
+
 def update():
     '''
-    When we are asked to update (regular interval) lets reap the cache
+    When we are asked to update (regular interval) lets refresh the hash index
     '''
+    # Hashes used to be cached in a file per served file
+    shutil.rmtree(os.path.join(__opts__['cachedir'], 'roots/hash'),
+                  ignore_errors=True)
+    trees = None
+    if __opts__.get('file_roots_watch', False):
+        try:
+            trees = _update_watched_file_lists()
+        except (IOError, OSError) as exc:
+            log.error('Unable to update the roots file lists: {0}'.format(exc))
+
+    hash_index = None
     try:
-        salt.fileserver.reap_fileserver_cache_dir(
-            os.path.join(__opts__['cachedir'], 'roots/hash'),
-            find_file
-        )
-    except (IOError, OSError):
-        # Hash file won't exist if no files have yet been served up
-        pass
+        hash_index = _update_hash_index(trees)
+    except (IOError, OSError) as exc:
+        log.error('Unable to update the roots hash index: {0}'.format(exc))
 
     mtime_map_path = os.path.join(__opts__['cachedir'], 'roots/mtime_map')
     # data to send on event
@@ -142,7 +546,15 @@ def update():
                                 .format(mtime_map_path, line))
 
     # generate the new map
-    new_mtime_map = salt.fileserver.generate_mtime_map(__opts__['file_roots'])
+    if trees is not None and hash_index is not None:
+        # The index has the mtimes of the files without walking the roots
+        new_mtime_map = {}
+        for env_index in six.itervalues(hash_index):
+            for entry in six.itervalues(env_index):
+                new_mtime_map[entry[0]] = entry[1]
+    else:
+        new_mtime_map = salt.fileserver.generate_mtime_map(
+            __opts__['file_roots'])
 
     # compare the maps, set changed to the return value
     data['changed'] = salt.fileserver.diff_mtime_map(old_mtime_map, new_mtime_map)
@@ -191,50 +603,81 @@ def file_hash(load, fnd):
     # set the hash_type as it is determined by config-- so mechanism won't change that
     ret['hash_type'] = __opts__['hash_type']
 
-    # check if the hash is cached
-    # cache file's contents should be "hash:mtime"
-    cache_path = os.path.join(__opts__['cachedir'],
-                              'roots/hash',
-                              load['saltenv'],
-                              u'{0}.hash.{1}'.format(fnd['rel'],
-                              __opts__['hash_type']))
-    # if we have a cache, serve that if the mtime hasn't changed
-    if os.path.exists(cache_path):
-        try:
-            with salt.utils.fopen(cache_path, 'rb') as fp_:
-                try:
-                    hsum, mtime = fp_.read().split(':')
-                except ValueError:
-                    log.debug('Fileserver attempted to read incomplete cache file. Retrying.')
-                    # Delete the file since its incomplete (either corrupted or incomplete)
-                    try:
-                        os.unlink(cache_path)
-                    except OSError:
-                        pass
-                    return file_hash(load, fnd)
-                if os.path.getmtime(path) == mtime:
-                    # check if mtime changed
-                    ret['hsum'] = hsum
-                    return ret
-        except (os.error, IOError):  # Can't use Python select() because we need Windows support
-            log.debug("Fileserver encountered lock when reading cache file. Retrying.")
-            # Delete the file since its incomplete (either corrupted or incomplete)
-            try:
-                os.unlink(cache_path)
-            except OSError:
-                pass
-            return file_hash(load, fnd)
+    try:
+        stat = _stat_key(path)
+    except OSError:
+        return {}
+
+    # serve the hash from the index if the file hasn't changed
+    env_index = _hash_index().setdefault(load['saltenv'], {})
+    entry = env_index.get(fnd['rel'])
+    if entry is not None and entry[:4] == [path] + stat:
+        ret['hsum'] = entry[4]
+        return ret
 
-    # if we don't have a cache entry-- lets make one
+    # if we don't have a valid index entry-- lets make one
     ret['hsum'] = salt.utils.get_hash(path, __opts__['hash_type'])
-    cache_dir = os.path.dirname(cache_path)
-    # make cache directory if it doesn't exist
-    if not os.path.exists(cache_dir):
-        os.makedirs(cache_dir)
-    # save the cache object "hash:mtime"
-    cache_object = '{0}:{1}'.format(ret['hsum'], os.path.getmtime(path))
-    with salt.utils.flopen(cache_path, 'w') as fp_:
-        fp_.write(cache_object)
+    env_index[fnd['rel']] = [path] + stat + [ret['hsum']]
+    return ret
+
+
+def _add_file_lists(ret, path, walk):
+    '''
+    Add the directories and files found below the file_roots directory
+    ``path`` to the file lists in ``ret``. ``walk`` yields tuples of
+    (dirpath, dirnames, filenames, links) where links are the filenames which
+    are symlinks.
+    '''
+    for root, dirs, files, links in walk:
+        dir_rel_fn = os.path.relpath(root, path)
+        if __opts__.get('file_client', 'remote') == 'local' and os.path.sep == "\\":
+            dir_rel_fn = dir_rel_fn.replace('\\', '/')
+        ret['dirs'].append(dir_rel_fn)
+        if len(dirs) == 0 and len(files) == 0:
+            if not salt.fileserver.is_file_ignored(__opts__, dir_rel_fn):
+                ret['empty_dirs'].append(dir_rel_fn)
+        ret['links'].extend(links)
+        for fname in files:
+            if __opts__['fileserver_ignoresymlinks'] and fname in links:
+                continue
+            rel_fn = os.path.relpath(
+                        os.path.join(root, fname),
+                        path
+                    )
+            if not salt.fileserver.is_file_ignored(__opts__, rel_fn):
+                if __opts__.get('file_client', 'remote') == 'local' and os.path.sep == "\\":
+                    rel_fn = rel_fn.replace('\\', '/')
+                ret['files'].append(rel_fn)
+
+
+def _walk(path):
+    '''
+    Walk a file_roots directory for _add_file_lists
+    '''
+    for root, dirs, files in os.walk(
+            path,
+            followlinks=__opts__['fileserver_followsymlinks']):
+        links = [x for x in files if os.path.islink(os.path.join(root, x))]
+        yield root, dirs, files, links
+
+
+def _watched_file_lists(load, form):
+    '''
+    Return a file list from the file list cache written by update(), or None
+    if there is no cache yet. Lists are kept sorted in memory, so a prefix is
+    matched without scanning the whole list.
+    '''
+    cache = _FILE_LISTS.setdefault(load['saltenv'], {})
+    if not _load_cache(_list_cache_path(load['saltenv']), cache):
+        return None
+    ret = cache['data'].get(form, [])
+    prefix = load.get('prefix', '').strip('/')
+    if prefix:
+        start = bisect.bisect_left(ret, prefix)
+        end = start
+        while end < len(ret) and ret[end].startswith(prefix):
+            end += 1
+        ret = ret[start:end]
     return ret
 
 
@@ -252,6 +695,11 @@ def _file_lists(load, form):
     if load['saltenv'] not in __opts__['file_roots']:
         return []
 
+    if __opts__.get('file_roots_watch', False):
+        ret = _watched_file_lists(load, form)
+        if ret is not None:
+            return ret
+
     list_cachedir = os.path.join(__opts__['cachedir'], 'file_lists/roots')
     if not os.path.isdir(list_cachedir):
         try:
@@ -275,30 +723,7 @@ def _file_lists(load, form):
             'links': []
         }
         for path in __opts__['file_roots'][load['saltenv']]:
-            for root, dirs, files in os.walk(
-                    path,
-                    followlinks=__opts__['fileserver_followsymlinks']):
-                dir_rel_fn = os.path.relpath(root, path)
-                if __opts__.get('file_client', 'remote') == 'local' and os.path.sep == "\\":
-                    dir_rel_fn = dir_rel_fn.replace('\\', '/')
-                ret['dirs'].append(dir_rel_fn)
-                if len(dirs) == 0 and len(files) == 0:
-                    if not salt.fileserver.is_file_ignored(__opts__, dir_rel_fn):
-                        ret['empty_dirs'].append(dir_rel_fn)
-                for fname in files:
-                    is_link = os.path.islink(os.path.join(root, fname))
-                    if is_link:
-                        ret['links'].append(fname)
-                    if __opts__['fileserver_ignoresymlinks'] and is_link:
-                        continue
-                    rel_fn = os.path.relpath(
-                                os.path.join(root, fname),
-                                path
-                            )
-                    if not salt.fileserver.is_file_ignored(__opts__, rel_fn):
-                        if __opts__.get('file_client', 'remote') == 'local' and os.path.sep == "\\":
-                            rel_fn = rel_fn.replace('\\', '/')
-                        ret['files'].append(rel_fn)
+            _add_file_lists(ret, path, _walk(path))
         if save_cache:
             try:
                 salt.fileserver.write_file_list_cache(
@@ -10,9 +10,11 @@ import imp
 import sys
 import salt
 import time
+import hashlib
 import logging
 import inspect
 import tempfile
+import threading
 from collections import MutableMapping
 
 # Import salt libs
@@ -23,6 +25,8 @@ import salt.utils.lazy
 import salt.utils.odict
 import salt.utils.event
 import salt.utils.odict
+import salt.utils.atomicfile
+import salt.version
 
 # Solve the Chicken and egg problem where grains need to run before any
 # of the modules are loaded and are generally available for any usage.
@@ -30,6 +34,7 @@ import salt.modules.cmdmod
 
 # Import 3rd-party libs
 import salt.ext.six as six
+from salt.ext.six.moves import queue  # pylint: disable=import-error
 
 __salt__ = {
     'cmd.run': salt.modules.cmdmod._run_quiet
@@ -39,6 +44,15 @@ log = logging.getLogger(__name__)
 SALT_BASE_PATH = os.path.abspath(os.path.dirname(salt.__file__))
 LOADED_BASE_NAME = 'salt.loaded'
 
+# The grains which can change what the __virtual__ function of a module
+# returns, the loader index is rebuilt when they change
+LOADER_INDEX_GRAINS = ('os', 'os_family', 'osrelease', 'osarch', 'kernel',
+                       'kernelrelease', 'virtual')
+
+# The file in the cachedir holding the grains cached by grain functions with a
+# TTL, and the time each grain function took the last time it was called
+GRAINS_TTL_CACHE = 'grains.ttl.p'
+
 # Because on the cloud drivers we do `from salt.cloud.libcloudfuncs import *`
 # which simplifies code readability, it adds some unsupported functions into
 # the driver's module scope.
@@ -453,12 +467,12 @@ def grains(opts, force_refresh=False):
         print __grains__['id']
     '''
     # if we hae no grains, lets try loading from disk (TODO: move to decorator?)
+    cfn = os.path.join(
+        opts.get('cachedir', ''),
+        'grains.cache.p'
+    )
     if not force_refresh:
         if opts.get('grains_cache', False):
-            cfn = os.path.join(
-                opts['cachedir'],
-                'grains.cache.p'
-            )
             if os.path.isfile(cfn):
                 grains_cache_age = int(time.time() - os.path.getmtime(cfn))
                 if opts.get('grains_cache_expiration', 300) >= grains_cache_age and not \
@@ -516,31 +530,44 @@ def grains(opts, force_refresh=False):
                      )
     if force_refresh:  # if we refresh, lets reload grain modules
         funcs.clear()
-    # Run core grains
-    for key, fun in six.iteritems(funcs):
-        if not key.startswith('core.'):
-            continue
-        log.trace('Loading {0} grain'.format(key))
-        ret = fun()
-        if not isinstance(ret, dict):
-            continue
-        grains_data.update(ret)
-
-    # Run the rest of the grains
-    for key, fun in six.iteritems(funcs):
-        if key.startswith('core.') or key == '_errors':
-            continue
-        try:
-            ret = fun()
-        except Exception:
-            log.critical(
-                'Failed to load grains defined in grain file {0} in '
-                'function {1}, error:\n'.format(
-                    key, fun
-                ),
-                exc_info=True
-            )
-            continue
+    # Run core grains, then the rest of the grains
+    keys = [key for key in funcs if key.startswith('core.')]
+    keys.extend(key for key in funcs
+                if not key.startswith('core.') and key != '_errors')
+
+    cache = _read_grains_ttl(opts)
+    now = time.time()
+    rets = {}
+    run = []
+    for key in keys:
+        ttl = _grains_ttl(key, funcs[key])
+        if ttl and key in cache['grains'] \
+                and now - cache['grains'][key][0] < ttl:
+            rets[key] = cache['grains'][key][1]
+        else:
+            run.append(key)
+    called, timing = _call_grains(opts, funcs, run)
+    for key in run:
+        if key in timing:
+            log.debug('Grain function {0} took {1:.3f} seconds'.format(
+                key, timing[key]))
+    cache['timing'].update(timing)
+    # Forget the functions which are gone
+    for name in ('grains', 'timing'):
+        cache[name] = dict((key, val) for key, val in six.iteritems(cache[name])
+                           if key in keys)
+    for key in run:
+        if key in called:
+            rets[key] = called[key]
+            if isinstance(called[key], dict) and _grains_ttl(key, funcs[key]):
+                cache['grains'][key] = [now, called[key]]
+        elif key in cache['grains']:
+            log.warning('Using the expired cached grains of {0}'.format(key))
+            rets[key] = cache['grains'][key][1]
+    _write_grains_ttl(opts, cache)
+
+    for key in keys:
+        ret = rets.get(key)
         if not isinstance(ret, dict):
             continue
         grains_data.update(ret)
@@ -568,6 +595,162 @@ def grains(opts, force_refresh=False):
     return grains_data
 
 
+def grains_timing(opts):
+    '''
+    Return the number of seconds each grain function took the last time it
+    was called
+    '''
+    return _read_grains_ttl(opts)['timing']
+
+
+def _grains_ttl(key, fun):
+    '''
+    Return the number of seconds the grains returned by a grain function are
+    cached for. Grain modules set ``__grains_ttl__`` to a number of seconds,
+    or to a dict mapping the names of their functions to a number of seconds.
+    The grains of other functions are not cached.
+    '''
+    ttl = getattr(sys.modules.get(fun.__module__), '__grains_ttl__', 0)
+    if isinstance(ttl, dict):
+        ttl = ttl.get(key.split('.', 1)[1], 0)
+    return ttl or 0
+
+
+def _read_grains_ttl(opts):
+    '''
+    Return the grains cached by grain functions with a TTL, as a dict mapping
+    the keys of the functions to the time they were called and their return,
+    along with the time each grain function took. The cached grains are
+    dropped when Salt is upgraded.
+    '''
+    ret = {'version': salt.version.__version__, 'grains': {}, 'timing': {}}
+    if not opts.get('cachedir'):
+        return ret
+    path = os.path.join(opts['cachedir'], GRAINS_TTL_CACHE)
+    try:
+        with salt.utils.fopen(path, 'rb') as fp_:
+            cache = salt.payload.Serial(opts).load(fp_)
+    except (IOError, OSError):
+        return ret
+    except Exception as exc:
+        log.warning('Unable to read grains TTL cache {0}: {1}'.format(path, exc))
+        return ret
+    ret['timing'] = cache.get('timing', {})
+    if cache.get('version') == ret['version']:
+        ret['grains'] = cache.get('grains', {})
+    return ret
+
+
+def _write_grains_ttl(opts, cache):
+    '''
+    Write the grains TTL cache
+    '''
+    if not os.path.isdir(opts.get('cachedir', '')):
+        return
+    path = os.path.join(opts['cachedir'], GRAINS_TTL_CACHE)
+    cumask = os.umask(0o77)
+    try:
+        tmpfh, tmpfname = tempfile.mkstemp(dir=opts['cachedir'])
+        os.close(tmpfh)
+        with salt.utils.fopen(tmpfname, 'w+b') as fp_:
+            salt.payload.Serial(opts).dump(cache, fp_)
+        salt.utils.atomicfile.atomic_rename(tmpfname, path)
+    except (IOError, OSError, TypeError) as exc:
+        log.debug('Unable to write grains TTL cache {0}: {1}'.format(path, exc))
+    finally:
+        os.umask(cumask)
+
+
+def _call_grain(key, fun):
+    '''
+    Call a grain function, returns None if it fails
+    '''
+    log.trace('Loading {0} grain'.format(key))
+    try:
+        return fun()
+    except Exception:
+        log.critical(
+            'Failed to load grains defined in grain file {0} in '
+            'function {1}, error:\n'.format(
+                key, fun
+            ),
+            exc_info=True
+        )
+
+
+def _call_grains(opts, funcs, keys):
+    '''
+    Call the grain functions of the passed keys, ``grains_threads`` of them at
+    a time. A function which has not returned after ``grains_timeout``
+    seconds is given up on. Returns a dict mapping the keys of the functions
+    which returned to their return, and a dict of the seconds each took.
+    '''
+    threads = opts.get('grains_threads', 8)
+    timeout = opts.get('grains_timeout', 30)
+    ret = {}
+    timing = {}
+    if not threads or len(keys) < 2:
+        for key in keys:
+            start = time.time()
+            ret[key] = _call_grain(key, funcs[key])
+            timing[key] = time.time() - start
+        return ret, timing
+
+    todo = queue.Queue()
+    for key in keys:
+        todo.put(key)
+    done = queue.Queue()
+    started = {}
+
+    def worker():
+        while True:
+            try:
+                key = todo.get_nowait()
+            except queue.Empty:
+                return
+            started[key] = time.time()
+            data = _call_grain(key, funcs[key])
+            done.put((key, data, time.time() - started[key]))
+
+    def spawn():
+        thread = threading.Thread(target=worker)
+        # Do not wait for grain functions which timed out on exit
+        thread.daemon = True
+        thread.start()
+
+    for _ in range(min(threads, len(keys))):
+        spawn()
+    left = set(keys)
+    while left:
+        wait = None
+        if timeout:
+            now = time.time()
+            for key in sorted(left):
+                if key in started and now - started[key] >= timeout:
+                    log.warning(
+                        'Grain function {0} did not return within {1} '
+                        'seconds'.format(key, timeout))
+                    left.remove(key)
+                    timing[key] = now - started[key]
+                    # The worker is stuck in the function, start another one
+                    # for the functions left
+                    spawn()
+            if not left:
+                break
+            wait = min([started[key] + timeout for key in left
+                        if key in started] or [now + timeout]) - now
+        try:
+            key, data, secs = done.get(timeout=wait)
+        except queue.Empty:
+            continue
+        if key not in left:
+            continue
+        left.remove(key)
+        ret[key] = data
+        timing[key] = secs
+    return ret, timing
+
+
 # TODO: get rid of? Does anyone use this? You should use raw() instead
 def call(fun, **kwargs):
     '''
@@ -672,6 +855,106 @@ def _mod_type(module_path):
     return 'ext'
 
 
+class LoaderIndex(object):
+    '''
+    An index of the module files of a loader kept in the cachedir, mapping
+    each file to the name it was loaded as last time, or to None if it did not
+    load. The loader imports the file known to provide a module first, instead
+    of importing the files which could provide it one after the other, and
+    tries the files known to provide other modules last.
+
+    Entries are ignored once the size or modification time of their file
+    changes, and the whole index is dropped when the Salt version, the proxy
+    type or any of the LOADER_INDEX_GRAINS change. The index only changes the
+    order files are imported in, a module which starts loading, for instance
+    once the package it depends on is installed, is still found.
+    '''
+    def __init__(self, opts, tag, grains):
+        self.path = os.path.join(opts['cachedir'],
+                                 'loader',
+                                 '{0}.p'.format(tag))
+        self.serial = salt.payload.Serial(opts)
+        self.context = hashlib.md5(repr([
+            salt.version.__version__,
+            (opts.get('proxy') or {}).get('proxytype'),
+            [(grain, grains.get(grain)) for grain in LOADER_INDEX_GRAINS],
+        ])).hexdigest()
+        self.files = {}
+        self.stats = {}
+        self.dirty = False
+        try:
+            with salt.utils.fopen(self.path, 'rb') as fp_:
+                index = self.serial.load(fp_)
+            if index.get('context') == self.context:
+                self.files = index['files']
+        except (IOError, OSError):
+            pass
+        except Exception as exc:
+            log.debug('Unable to read the loader index {0}: {1}'.format(
+                self.path, exc))
+
+    def _stat(self, fpath):
+        '''
+        Return the modification time and size of a file, which are cached
+        until the loader refreshes its file mapping
+        '''
+        if fpath not in self.stats:
+            try:
+                stat = os.stat(fpath)
+                self.stats[fpath] = [stat.st_mtime, stat.st_size]
+            except OSError:
+                self.stats[fpath] = None
+        return self.stats[fpath]
+
+    def refresh(self):
+        '''
+        Forget the cached file stats
+        '''
+        self.stats = {}
+
+    def get(self, fpath):
+        '''
+        Return whether the file is in the index and the name it loads as
+        '''
+        entry = self.files.get(fpath)
+        if entry is None or entry[:2] != self._stat(fpath):
+            return False, None
+        return True, entry[2]
+
+    def set(self, fpath, mod_name):
+        '''
+        Record the name a file loaded as, None if it did not load
+        '''
+        stat = self._stat(fpath)
+        if stat is None:
+            return
+        entry = stat + [mod_name]
+        if self.files.get(fpath) != entry:
+            self.files[fpath] = entry
+            self.dirty = True
+
+    def write(self):
+        '''
+        Write the index if it changed
+        '''
+        if not self.dirty:
+            return
+        self.dirty = False
+        index_dir = os.path.dirname(self.path)
+        try:
+            if not os.path.isdir(index_dir):
+                os.makedirs(index_dir)
+            tmpfh, tmpfname = tempfile.mkstemp(dir=index_dir)
+            os.close(tmpfh)
+            with salt.utils.fopen(tmpfname, 'w+b') as fp_:
+                self.serial.dump({'context': self.context,
+                                  'files': self.files}, fp_)
+            salt.utils.atomicfile.atomic_rename(tmpfname, self.path)
+        except (IOError, OSError) as exc:
+            log.debug('Unable to write the loader index {0}: {1}'.format(
+                self.path, exc))
+
+
 # TODO: move somewhere else?
 class FilterDictWrapper(MutableMapping):
     '''
@@ -745,6 +1028,11 @@ class LazyLoader(salt.utils.lazy.LazyDict):
 
         self.disabled = set(self.opts.get('disable_{0}s'.format(self.tag), []))
 
+        if self.opts.get('loader_index', True) and self.opts.get('cachedir'):
+            self.index = LoaderIndex(self.opts, self.tag, self._grains)
+        else:
+            self.index = None
+
         self.refresh_file_mapping()
 
         super(LazyLoader, self).__init__()  # late init the lazy loader
@@ -773,6 +1061,7 @@ class LazyLoader(salt.utils.lazy.LazyDict):
                 # if we got what we wanted, we are done
                 if self._load_module(name) and mod_name in self.loaded_modules:
                     break
+            self._write_index()
         if mod_name in self.loaded_modules:
             return self.loaded_modules[mod_name]
         else:
@@ -823,6 +1112,8 @@ class LazyLoader(salt.utils.lazy.LazyDict):
 
         # create mapping of filename (without suffix) to (path, suffix)
         self.file_mapping = {}
+        if self.index is not None:
+            self.index.refresh()
 
         for mod_dir in self.module_dirs:
             files = []
@@ -910,20 +1201,51 @@ class LazyLoader(salt.utils.lazy.LazyDict):
         '''
         Iterate over all file_mapping files in order of closeness to mod_name
         '''
+        others = []
+        if self.index is not None:
+            # do we know which file it is?
+            for k in self.file_mapping:
+                known, name = self.index.get(self.file_mapping[k][0])
+                if not known:
+                    continue
+                if name == mod_name:
+                    yield k
+                else:
+                    others.append(k)
+        skip = set(others)
+
         # do we have an exact match?
-        if mod_name in self.file_mapping:
+        if mod_name in self.file_mapping and mod_name not in skip:
             yield mod_name
 
         # do we have a partial match?
         for k in self.file_mapping:
-            if mod_name in k:
+            if mod_name in k and k not in skip:
                 yield k
 
         # anyone else? Bueller?
         for k in self.file_mapping:
-            if mod_name not in k:
+            if mod_name not in k and k not in skip:
                 yield k
 
+        # the files known to load as something else
+        for k in others:
+            yield k
+
+    def _index_module(self, name, mod_name):
+        '''
+        Record the name a file loaded as in the index
+        '''
+        if self.index is not None:
+            self.index.set(self.file_mapping[name][0], mod_name)
+
+    def _write_index(self):
+        '''
+        Write the index if files were loaded
+        '''
+        if self.index is not None:
+            self.index.write()
+
     def _reload_submodules(self, mod):
         submodules = (
             getattr(mod, sname) for sname in dir(mod) if
@@ -978,6 +1300,7 @@ class LazyLoader(salt.utils.lazy.LazyDict):
                 ),
                 exc_info=True
             )
+            self._index_module(name, None)
             return mod
         except Exception as error:
             log.error(
@@ -987,6 +1310,7 @@ class LazyLoader(salt.utils.lazy.LazyDict):
                 ),
                 exc_info=True
             )
+            self._index_module(name, None)
             return mod
         except SystemExit:
             log.error(
@@ -995,6 +1319,7 @@ class LazyLoader(salt.utils.lazy.LazyDict):
                 ),
                 exc_info=True
             )
+            self._index_module(name, None)
             return mod
         finally:
             sys.path.pop()
@@ -1039,6 +1364,7 @@ class LazyLoader(salt.utils.lazy.LazyDict):
                 # If a module has information about why it could not be loaded, record it
                 self.missing_modules[module_name] = virtual_err
                 self.missing_modules[name] = virtual_err
+                self._index_module(name, None)
                 return False
 
         # If this is a proxy minion then MOST modules cannot work. Therefore, require that
@@ -1051,6 +1377,7 @@ class LazyLoader(salt.utils.lazy.LazyDict):
                 err_string = 'not a proxy_minion enabled module'
                 self.missing_modules[module_name] = err_string
                 self.missing_modules[name] = err_string
+                self._index_module(name, None)
                 return False
 
         if getattr(mod, '__load__', False) is not False:
@@ -1086,6 +1413,7 @@ class LazyLoader(salt.utils.lazy.LazyDict):
         # enforce depends
         Depends.enforce_dependencies(self._dict, self.tag)
         self.loaded_modules[module_name] = mod_dict
+        self._index_module(name, module_name)
         return True
 
     def _load(self, key):
@@ -1130,6 +1458,7 @@ class LazyLoader(salt.utils.lazy.LazyDict):
                     reloaded = True
                 continue
 
+        self._write_index()
         return ret
 
     def _load_all(self):
@@ -1141,6 +1470,7 @@ class LazyLoader(salt.utils.lazy.LazyDict):
                 continue
             self._load_module(name)
 
+        self._write_index()
         self.loaded = True
 
     def _apply_outputter(self, func, mod):
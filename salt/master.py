@@ -54,6 +54,7 @@ import salt.utils.job
 import salt.utils.reactor
 import salt.utils.verify
 import salt.utils.minions
+import salt.utils.pillar_cache
 import salt.utils.gzip_util
 import salt.utils.process
 import salt.utils.zeromq
@@ -293,7 +294,10 @@ class Maintenance(multiprocessing.Process):
                 self.event.fire_event(data, tagify('change', 'presence'))
             data = {'present': list(present)}
             self.event.fire_event(data, tagify('present', 'presence'))
-            old_present = present
+            # Let batch runs use the connected minions instead of pinging
+            salt.utils.minions.write_presence(self.opts, present)
+            old_present.clear()
+            old_present.update(present)
 
 
 class Master(SMaster):
@@ -783,6 +787,10 @@ class AESFuncs(object):
             rend=False)
         self.__setup_fileserver()
         self.masterapi = salt.daemons.masterapi.RemoteFuncs(opts)
+        if self.opts.get('pillar_cache', False):
+            self.pillar_cache = salt.utils.pillar_cache.PillarCache(opts)
+        else:
+            self.pillar_cache = None
 
     def __setup_fileserver(self):
         '''
@@ -790,7 +798,9 @@ class AESFuncs(object):
         '''
         self.fs_ = salt.fileserver.Fileserver(self.opts)
         self._serve_file = self.fs_.serve_file
+        self._serve_files = self.fs_.serve_files
         self._file_hash = self.fs_.file_hash
+        self._file_manifest = self.fs_.file_manifest
         self._file_list = self.fs_.file_list
         self._file_list_emptydirs = self.fs_.file_list_emptydirs
         self._dir_list = self.fs_.dir_list
@@ -1110,16 +1120,31 @@ class AESFuncs(object):
             return False
         load['grains']['id'] = load['id']
 
-        pillar_dirs = {}
-        pillar = salt.pillar.Pillar(
-            self.opts,
-            load['grains'],
-            load['id'],
-            load.get('saltenv', load.get('env')),
-            ext=load.get('ext'),
-            pillar=load.get('pillar_override', {}))
-        data = pillar.compile_pillar(pillar_dirs=pillar_dirs)
-        self.fs_.update_opts()
+        saltenv = load.get('saltenv', load.get('env'))
+        # On demand ext_pillar and pillar overrides are not cached
+        use_cache = self.pillar_cache is not None \
+            and not load.get('ext') and not load.get('pillar_override')
+        data = None
+        if use_cache:
+            data = self.pillar_cache.get(load['id'], saltenv, load['grains'])
+        if data is None:
+            pillar_dirs = {}
+            pillar = salt.pillar.Pillar(
+                self.opts,
+                load['grains'],
+                load['id'],
+                saltenv,
+                ext=load.get('ext'),
+                pillar=load.get('pillar_override', {}))
+            data = pillar.compile_pillar(pillar_dirs=pillar_dirs)
+            self.fs_.update_opts()
+            if use_cache:
+                self.pillar_cache.store(load['id'],
+                                        saltenv,
+                                        load['grains'],
+                                        data,
+                                        pillar.sources,
+                                        pillar.ext_pillars_run)
         if self.opts.get('minion_data_cache', False):
             cdir = os.path.join(self.opts['cachedir'], 'minions', load['id'])
             if not os.path.isdir(cdir):
@@ -1135,6 +1160,8 @@ class AESFuncs(object):
                     )
             # On Windows, os.rename will fail if the destination file exists.
             salt.utils.atomicfile.atomic_rename(tmpfname, datap)
+            if self.ckminions.index is not None:
+                self.ckminions.index.update(load['id'], load['grains'], data)
         return data
 
     def _minion_event(self, load):
@@ -1419,6 +1446,9 @@ class ClearFuncs(object):
         self.wheel_ = salt.wheel.Wheel(opts)
         # Make a masterapi object
         self.masterapi = salt.daemons.masterapi.LocalFuncs(opts, key)
+        # Publish channels are kept for the life of the worker, so that
+        # every publish does not have to set up its own connection
+        self.pub_channels = None
 
     def process_token(self, tok, fun, auth_type):
         '''
@@ -2005,8 +2035,12 @@ class ClearFuncs(object):
         '''
         Take a load and send it across the network to connected minions
         '''
-        for transport, opts in iter_transport_opts(self.opts):
-            chan = salt.transport.server.PubServerChannel.factory(opts)
+        if self.pub_channels is None:
+            self.pub_channels = [
+                salt.transport.server.PubServerChannel.factory(opts)
+                for transport, opts in iter_transport_opts(self.opts)
+            ]
+        for chan in self.pub_channels:
             chan.publish(load)
 
     def _prep_pub(self, minions, jid, clear_load, extra):
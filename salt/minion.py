@@ -75,6 +75,7 @@ import salt.pillar
 import salt.utils.args
 import salt.utils.event
 import salt.utils.minions
+import salt.utils.process
 import salt.utils.schedule
 import salt.utils.error
 import salt.utils.zeromq
@@ -539,6 +540,7 @@ class Minion(MinionBase):
 
         self._running = None
         self.win_proc = []
+        self.worker_pool = None
         self.loaded_base_name = loaded_base_name
 
         self.io_loop = io_loop or zmq.eventloop.ioloop.ZMQIOLoop()
@@ -912,6 +914,7 @@ class Minion(MinionBase):
                 self.functions, self.returners, self.function_errors = self._load_modules()
                 self.schedule.functions = self.functions
                 self.schedule.returners = self.returners
+                self._recycle_workers()
         if isinstance(data['fun'], tuple) or isinstance(data['fun'], list):
             target = Minion._thread_multi_return
         else:
@@ -926,6 +929,8 @@ class Minion(MinionBase):
                 # let python reconstruct the minion on the other side if we're
                 # running on windows
                 instance = None
+            elif self._fire_job_worker(data):
+                return
             process = multiprocessing.Process(
                 target=target, args=(instance, self.opts, data)
             )
@@ -941,6 +946,75 @@ class Minion(MinionBase):
         else:
             self.win_proc.append(process)
 
+    def _isolate_job(self, fun):
+        '''
+        Return whether a job has to run in a process of its own. Modules
+        request it for all of their functions by setting ``__isolate__`` to
+        True, or for some of them by setting it to a list of function names.
+        '''
+        if not isinstance(fun, (list, tuple)):
+            fun = [fun]
+        for name in fun:
+            if name not in self.functions:
+                continue
+            mod = sys.modules.get(self.functions[name].__module__)
+            isolate = getattr(mod, '__isolate__', False)
+            if isolate is True or (isinstance(isolate, (list, tuple))
+                                   and name.split('.', 1)[-1] in isolate):
+                return True
+        return False
+
+    def _fire_job_worker(self, data):
+        '''
+        Hand a job to the pool of job workers, returns False if it has to run
+        in a process of its own
+        '''
+        if not self.opts.get('minion_workers') or self._isolate_job(data['fun']):
+            return False
+        if self.worker_pool is None:
+            self.worker_pool = salt.utils.process.ProcessPool(
+                self._worker_job,
+                self.opts['minion_workers'],
+                max_jobs=self.opts.get('minion_worker_max_jobs', 0),
+                queue_size=self.opts.get('minion_worker_queue', 0),
+                name='MinionJob')
+        return self.worker_pool.fire_async(data)
+
+    def _recycle_workers(self):
+        '''
+        Replace the job workers, so that they run jobs with the reloaded
+        modules, grains and pillar
+        '''
+        if self.worker_pool is not None:
+            self.worker_pool.recycle()
+
+    def _worker_job(self, data):
+        '''
+        Run a job in a job worker
+        '''
+        # Every job starts from the context the worker was forked with, as
+        # it would in a process of its own
+        context = self.functions.pack['__context__']
+        if not hasattr(self, '_worker_context'):
+            self._worker_context = dict(context)
+        context.clear()
+        context.update(self._worker_context)
+        # The worker is not daemonized for each job
+        opts = dict(self.opts)
+        opts['multiprocessing'] = False
+        try:
+            if isinstance(data['fun'], (list, tuple)):
+                Minion._thread_multi_return(self, opts, data)
+            else:
+                Minion._thread_return(self, opts, data)
+        finally:
+            # The worker outlives the job, so the job is not seen as running
+            # once it returned
+            try:
+                os.remove(os.path.join(self.proc_dir, data['jid']))
+            except OSError:
+                pass
+
     @classmethod
     def _thread_return(cls, minion_instance, opts, data):
         '''
@@ -970,7 +1044,7 @@ class Minion(MinionBase):
         if opts['multiprocessing']:
             salt.utils.daemonize_if(opts)
 
-        salt.utils.appendproctitle(data['jid'])
+            salt.utils.appendproctitle(data['jid'])
 
         sdata = {'pid': os.getpid()}
         sdata.update(data)
@@ -1103,7 +1177,8 @@ class Minion(MinionBase):
         This method should be used as a threading target, start the actual
         minion side execution.
         '''
-        salt.utils.appendproctitle(data['jid'])
+        if opts['multiprocessing']:
+            salt.utils.appendproctitle(data['jid'])
         # this seems awkward at first, but it's a workaround for Windows
         # multiprocessing communication.
         if not minion_instance:
@@ -1290,6 +1365,7 @@ class Minion(MinionBase):
         self.functions, self.returners, _ = self._load_modules(force_refresh, notify=notify)
         self.schedule.functions = self.functions
         self.schedule.returners = self.returners
+        self._recycle_workers()
 
     # TODO: only allow one future in flight at a time?
     @tornado.gen.coroutine
@@ -20,6 +20,7 @@ import salt.ext.six as six
 from salt.ext.six.moves import range  # pylint: disable=import-error,no-name-in-module,redefined-builtin
 
 # Import salt libs
+import salt.loader
 import salt.utils
 import salt.utils.dictupdate
 from salt.defaults import DEFAULT_TARGET_DELIM
@@ -354,6 +355,20 @@ def ls():  # pylint: disable=C0103
     return sorted(__grains__)
 
 
+def timing():
+    '''
+    Return the number of seconds each grain function took the last time it
+    was called
+
+    CLI Example:
+
+    .. code-block:: bash
+
+        salt '*' grains.timing
+    '''
+    return salt.loader.grains_timing(__opts__)
+
+
 def filter_by(lookup_dict, grain='os_family', merge=None, default='default', base=None):
     '''
     .. versionadded:: 0.17.0
@@ -56,6 +56,9 @@ from salt.exceptions import (
 
 __proxyenabled__ = ['*']
 
+# Run the jobs of this module in their own process instead of a worker
+__isolate__ = True
+
 log = logging.getLogger(__name__)
 
 
@@ -27,6 +27,9 @@ import salt.ext.six as six
 
 __proxyenabled__ = ['*']
 
+# Run the jobs of this module in their own process instead of a worker
+__isolate__ = True
+
 __outputter__ = {
     'sls': 'highstate',
     'sls_id': 'highstate',
@@ -447,6 +450,11 @@ def highstate(test=None,
 
         This option starts a new thread for each queued state run so use this
         option sparingly.
+    force_full : ``False``
+        When :conf_minion:`state_incremental` is set, run all of the states,
+        including the ones which are unchanged since they last succeeded.
+        When :conf_minion:`state_compile_cache` is set, render the highstate
+        again instead of using the cached one.
     localconfig:
         Instead of using running minion opts, load ``localconfig`` and merge that
         with the running minion opts. This functionality is intended for using
@@ -488,6 +496,9 @@ def highstate(test=None,
     else:
         opts['test'] = test
 
+    if kwargs.get('force_full'):
+        opts['state_incremental_force'] = True
+
     if 'env' in kwargs:
         salt.utils.warn_until(
             'Boron',
@@ -564,6 +575,9 @@ def sls(mods,
             Defaults to None. If no saltenv is specified, the minion config will
             be checked for a saltenv and if found, it will be used. If none is found,
             base will be used.
+    force_full : ``False``
+        When :conf_minion:`state_incremental` is set, run all of the states,
+        including the ones which are unchanged since they last succeeded.
     concurrent:
         WARNING: This flag is potentially dangerous. It is designed
         for use when multiple state runs can safely be run at the same
@@ -630,6 +644,9 @@ def sls(mods,
     else:
         opts['test'] = __opts__.get('test', None)
 
+    if kwargs.get('force_full'):
+        opts['state_incremental_force'] = True
+
     pillar = kwargs.get('pillar')
     if pillar is not None and not isinstance(pillar, dict):
         raise SaltInvocationError(
@@ -181,6 +181,7 @@ import salt.utils.event
 from salt.utils.event import tagify
 import salt.client
 import salt.runner
+import salt.wheel
 import salt.auth
 from salt.exceptions import EauthAuthenticationError
 
@@ -196,7 +197,7 @@ logger = logging.getLogger()
 
 # # master side
 #  - "runner" (done)
-#  - "wheel" (need async api...)
+#  - "wheel" (done)
 
 
 class SaltClientsMixIn(object):
@@ -212,11 +213,12 @@ class SaltClientsMixIn(object):
             local_client = salt.client.get_local_client(mopts=self.application.opts)
             # TODO: refreshing clients using cachedict
             SaltClientsMixIn.__saltclients = {
-                'local': local_client.run_job,
+                'local': local_client.run_job_async,
                 # not the actual client we'll use.. but its what we'll use to get args
                 'local_batch': local_client.cmd_batch,
-                'local_async': local_client.run_job,
-                'runner': salt.runner.RunnerClient(opts=self.application.opts).async,
+                'local_async': local_client.run_job_async,
+                'runner': salt.runner.RunnerClient(opts=self.application.opts).pub_async,
+                'wheel': salt.wheel.WheelClient(opts=self.application.opts).pub_async,
                 }
         return SaltClientsMixIn.__saltclients
 
@@ -244,6 +246,80 @@ class Any(Future):
             self.set_result(future)
 
 
+class PrefixTrie(object):
+    '''
+    A trie of the tag prefixes futures are waiting on. The futures an event is
+    for are found by walking down the characters of its tag, instead of
+    checking the tag against every prefix waited on.
+    '''
+    def __init__(self):
+        # Each node maps the next character to a child node, and None to the
+        # futures waiting on the prefix the node stands for
+        self.root = {}
+
+    def add(self, prefix, future):
+        '''
+        Make a future wait on a tag prefix
+        '''
+        node = self.root
+        for char in prefix:
+            node = node.setdefault(char, {})
+        node.setdefault(None, set()).add(future)
+
+    def remove(self, prefix, future):
+        '''
+        Stop a future waiting on a tag prefix
+        '''
+        path = [self.root]
+        for char in prefix:
+            if char not in path[-1]:
+                return
+            path.append(path[-1][char])
+        futures = path[-1].get(None, set())
+        futures.discard(future)
+        if not futures:
+            path[-1].pop(None, None)
+        self._prune(prefix, path)
+
+    def pop(self, tag):
+        '''
+        Remove and return the futures waiting on the prefixes of a tag
+        '''
+        ret = list(self.root.pop(None, ()))
+        path = [self.root]
+        for char in tag:
+            if char not in path[-1]:
+                break
+            path.append(path[-1][char])
+            ret.extend(path[-1].pop(None, ()))
+        self._prune(tag[:len(path) - 1], path)
+        return ret
+
+    def _prune(self, prefix, path):
+        '''
+        Drop the nodes of the path of a prefix no future waits under any more
+        '''
+        for idx in range(len(prefix), 0, -1):
+            if path[idx]:
+                break
+            del path[idx - 1][prefix[idx - 1]]
+
+    def __len__(self):
+        '''
+        Return the number of futures waiting
+        '''
+        ret = 0
+        nodes = [self.root]
+        while nodes:
+            node = nodes.pop()
+            for key, val in six.iteritems(node):
+                if key is None:
+                    ret += len(val)
+                else:
+                    nodes.append(val)
+        return ret
+
+
 class EventListener(object):
     '''
     Class responsible for listening to the salt master event bus and updating
@@ -262,8 +338,8 @@ class EventListener(object):
 
         self.event.subscribe()  # start listening for events immediately
 
-        # tag -> list of futures
-        self.tag_map = defaultdict(list)
+        # tag prefix -> futures
+        self.tag_map = PrefixTrie()
 
         # request_obj -> list of (tag, future)
         self.request_map = defaultdict(list)
@@ -278,9 +354,7 @@ class EventListener(object):
         '''
         Remove all futures that were waiting for request `request` since it is done waiting
         '''
-        if request not in self.request_map:
-            return
-        for tag, future in self.request_map[request]:
+        for tag, future in self.request_map.pop(request, ()):
             self._timeout_future(tag, future)
 
     def get_event(self,
@@ -298,7 +372,7 @@ class EventListener(object):
                 tornado.ioloop.IOLoop.current().add_callback(callback, future)
             future.add_done_callback(handle_future)
         # add this tag and future to the callbacks
-        self.tag_map[tag].append(future)
+        self.tag_map.add(tag, future)
         self.request_map[request].append((tag, future))
 
         if timeout:
@@ -311,13 +385,12 @@ class EventListener(object):
         '''
         Timeout a specific future
         '''
-        if tag not in self.tag_map:
-            return
         if not future.done():
             future.set_exception(TimeoutException())
-            self.tag_map[tag].remove(future)
-        if len(self.tag_map[tag]) == 0:
-            del self.tag_map[tag]
+            self.tag_map.remove(tag, future)
+        if future in self.timeout_map:
+            tornado.ioloop.IOLoop.current().remove_timeout(self.timeout_map[future])
+            del self.timeout_map[future]
 
     def _handle_event_socket_recv(self, raw):
         '''
@@ -325,16 +398,13 @@ class EventListener(object):
         '''
         mtag, data = self.event.unpack(raw[0], self.event.serial)
         # see if we have any futures that need this info:
-        for tag_prefix, futures in six.iteritems(self.tag_map):
-            if mtag.startswith(tag_prefix):
-                for future in futures:
-                    if future.done():
-                        continue
-                    future.set_result({'data': data, 'tag': mtag})
-                    self.tag_map[tag_prefix].remove(future)
-                    if future in self.timeout_map:
-                        tornado.ioloop.IOLoop.current().remove_timeout(self.timeout_map[future])
-                        del self.timeout_map[future]
+        for future in self.tag_map.pop(mtag):
+            if future.done():
+                continue
+            future.set_result({'data': data, 'tag': mtag})
+            if future in self.timeout_map:
+                tornado.ioloop.IOLoop.current().remove_timeout(self.timeout_map[future])
+                del self.timeout_map[future]
 
 
 # TODO: move to a utils function within salt-- the batching stuff is a bit tied together
@@ -687,9 +757,9 @@ class SaltAPIHandler(BaseSaltAPIHandler, SaltClientsMixIn):  # pylint: disable=W
 
             HTTP/1.1 200 OK
             Content-Type: application/json
-            Content-Legnth: 83
+            Content-Legnth: 92
 
-            {"clients": ["local", "local_batch", "local_async","runner"], "return": "Welcome"}
+            {"clients": ["local", "local_batch", "local_async", "runner", "wheel"], "return": "Welcome"}
         '''
         ret = {"clients": list(self.saltclients.keys()),
                "return": "Welcome"}
@@ -863,7 +933,7 @@ class SaltAPIHandler(BaseSaltAPIHandler, SaltClientsMixIn):  # pylint: disable=W
         f_call = salt.utils.format_call(self.saltclients['local'], chunk)
         # fire a job off
         try:
-            pub_data = self.saltclients['local'](*f_call.get('args', ()), **f_call.get('kwargs', {}))
+            pub_data = yield self.saltclients['local'](*f_call.get('args', ()), **f_call.get('kwargs', {}))
         except EauthAuthenticationError:
             raise tornado.gen.Return('Not authorized to run this job')
 
@@ -944,10 +1014,10 @@ class SaltAPIHandler(BaseSaltAPIHandler, SaltClientsMixIn):  # pylint: disable=W
         if minions_remaining is None:
             minions_remaining = []
 
-        ping_pub_data = self.saltclients['local'](tgt,
-                                                  'saltutil.find_job',
-                                                  [jid],
-                                                  expr_form=tgt_type)
+        ping_pub_data = yield self.saltclients['local'](tgt,
+                                                        'saltutil.find_job',
+                                                        [jid],
+                                                        expr_form=tgt_type)
         ping_tag = tagify([ping_pub_data['jid'], 'ret'], 'job')
 
         minion_running = False
@@ -961,10 +1031,10 @@ class SaltAPIHandler(BaseSaltAPIHandler, SaltClientsMixIn):  # pylint: disable=W
                 if not minion_running:
                     raise tornado.gen.Return(True)
                 else:
-                    ping_pub_data = self.saltclients['local'](tgt,
-                                                              'saltutil.find_job',
-                                                              [jid],
-                                                              expr_form=tgt_type)
+                    ping_pub_data = yield self.saltclients['local'](tgt,
+                                                                    'saltutil.find_job',
+                                                                    [jid],
+                                                                    expr_form=tgt_type)
                     ping_tag = tagify([ping_pub_data['jid'], 'ret'], 'job')
                     minion_running = False
                     continue
@@ -983,7 +1053,7 @@ class SaltAPIHandler(BaseSaltAPIHandler, SaltClientsMixIn):  # pylint: disable=W
         '''
         f_call = salt.utils.format_call(self.saltclients['local_async'], chunk)
         # fire a job off
-        pub_data = self.saltclients['local_async'](*f_call.get('args', ()), **f_call.get('kwargs', {}))
+        pub_data = yield self.saltclients['local_async'](*f_call.get('args', ()), **f_call.get('kwargs', {}))
 
         raise tornado.gen.Return(pub_data)
 
@@ -992,8 +1062,7 @@ class SaltAPIHandler(BaseSaltAPIHandler, SaltClientsMixIn):  # pylint: disable=W
         '''
         Disbatch runner client commands
         '''
-        f_call = {'args': [chunk['fun'], chunk]}
-        pub_data = self.saltclients['runner'](chunk['fun'], chunk)
+        pub_data = yield self.saltclients['runner'](dict(chunk))
         tag = pub_data['tag'] + '/ret'
         try:
             event = yield self.application.event_listener.get_event(self, tag=tag)
@@ -1003,6 +1072,16 @@ class SaltAPIHandler(BaseSaltAPIHandler, SaltClientsMixIn):  # pylint: disable=W
         except TimeoutException:
             raise tornado.gen.Return('Timeout waiting for runner to execute')
 
+    @tornado.gen.coroutine
+    def _disbatch_wheel(self, chunk):
+        '''
+        Disbatch wheel client commands
+        '''
+        pub_data = yield self.saltclients['wheel'](dict(chunk))
+
+        # the master runs wheel functions before it replies
+        raise tornado.gen.Return(pub_data['data'])
+
 
 class MinionSaltAPIHandler(SaltAPIHandler):  # pylint: disable=W0223
     '''
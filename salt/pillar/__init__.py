@@ -17,7 +17,7 @@ import salt.minion
 import salt.crypt
 import salt.transport
 from salt.exceptions import SaltClientError
-from salt.template import compile_template
+from salt.template import compile_template, get_render_cache
 from salt.utils.dictupdate import merge
 from salt.utils.odict import OrderedDict
 from salt.version import __version__
@@ -190,6 +190,9 @@ class Pillar(object):
 
         self.matcher = salt.minion.Matcher(self.opts, self.functions)
         self.rend = salt.loader.render(self.opts, self.functions)
+        # Top and SLS files which render the same for every minion are only
+        # rendered once per process
+        self.render_cache = get_render_cache(self.opts)
         # Fix self.opts['file_roots'] so that ext_pillars know the real
         # location of file_roots. Issue 5951
         ext_pillar_opts = dict(self.opts)
@@ -200,6 +203,10 @@ class Pillar(object):
 
         self.ext_pillars = salt.loader.pillars(ext_pillar_opts, self.functions)
         self.ignored_pillars = {}
+        # The top and SLS files read and the external pillars run while
+        # compiling, used by the master pillar cache to invalidate entries
+        self.sources = set()
+        self.ext_pillars_run = set()
         self.pillar_override = {}
         if pillar is not None:
             if isinstance(pillar, dict):
@@ -274,15 +281,19 @@ class Pillar(object):
         # Gather initial top files
         try:
             if self.opts['environment']:
+                top = self.client.cache_file(
+                        self.opts['state_top'],
+                        self.opts['environment']
+                        )
+                if top:
+                    self.sources.add(top)
                 tops[self.opts['environment']] = [
                         compile_template(
-                            self.client.cache_file(
-                                self.opts['state_top'],
-                                self.opts['environment']
-                                ),
+                            top,
                             self.rend,
                             self.opts['renderer'],
-                            self.opts['environment']
+                            self.opts['environment'],
+                            render_cache=self.render_cache
                             )
                         ]
             else:
@@ -292,12 +303,14 @@ class Pillar(object):
                             saltenv
                             )
                     if top:
+                        self.sources.add(top)
                         tops[saltenv].append(
                                 compile_template(
                                     top,
                                     self.rend,
                                     self.opts['renderer'],
-                                    saltenv=saltenv
+                                    saltenv=saltenv,
+                                    render_cache=self.render_cache
                                     )
                                 )
         except Exception as exc:
@@ -326,15 +339,19 @@ class Pillar(object):
                     if sls in done[saltenv]:
                         continue
                     try:
+                        top = self.client.get_state(
+                                sls,
+                                saltenv
+                                ).get('dest', False)
+                        if top:
+                            self.sources.add(top)
                         tops[saltenv].append(
                                 compile_template(
-                                    self.client.get_state(
-                                        sls,
-                                        saltenv
-                                        ).get('dest', False),
+                                    top,
                                     self.rend,
                                     self.opts['renderer'],
-                                    saltenv=saltenv
+                                    saltenv=saltenv,
+                                    render_cache=self.render_cache
                                     )
                                 )
                     except Exception as exc:
@@ -464,10 +481,13 @@ class Pillar(object):
                           .format(sls, saltenv))
                 # return state, mods, errors
                 return None, mods, errors
+        else:
+            self.sources.add(fn_)
         state = None
         try:
             state = compile_template(
-                fn_, self.rend, self.opts['renderer'], saltenv, sls, _pillar_rend=True, **defaults)
+                fn_, self.rend, self.opts['renderer'], saltenv, sls,
+                render_cache=self.render_cache, _pillar_rend=True, **defaults)
         except Exception as exc:
             msg = 'Rendering SLS {0!r} failed, render error:\n{1}'.format(
                 sls, exc
@@ -609,6 +629,7 @@ class Pillar(object):
                            'unavailable').format(key)
                     log.critical(err)
                     continue
+                self.ext_pillars_run.add(key)
                 try:
                     try:
                         ext = self._external_pillar_data(pillar,
@@ -6,6 +6,7 @@ Return data to local job cache
 from __future__ import absolute_import
 
 # Import python libs
+import datetime
 import errno
 import logging
 import os
@@ -17,6 +18,7 @@ import hashlib
 import salt.payload
 import salt.utils
 import salt.utils.jid
+import salt.utils.job_index
 
 log = logging.getLogger(__name__)
 
@@ -28,6 +30,8 @@ MINIONS_P = '.minions.p'
 RETURN_P = 'return.p'
 # out is the "out" from the minion data
 OUT_P = 'out.p'
+# marks that the jobs saved before the job index was used have been indexed
+INDEXED = '.indexed'
 
 
 def _job_dir():
@@ -69,35 +73,6 @@ def _walk_through(job_dir):
             yield jid, job, t_path, final
 
 
-def _format_job_instance(job):
-    '''
-    Format the job instance correctly
-    '''
-    ret = {'Function': job.get('fun', 'unknown-function'),
-           'Arguments': list(job.get('arg', [])),
-           # unlikely but safeguard from invalid returns
-           'Target': job.get('tgt', 'unknown-target'),
-           'Target-type': job.get('tgt_type', []),
-           'User': job.get('user', 'root')}
-
-    if 'metadata' in job:
-        ret['Metadata'] = job.get('metadata', {})
-    else:
-        if 'kwargs' in job:
-            if 'metadata' in job['kwargs']:
-                ret['Metadata'] = job['kwargs'].get('metadata', {})
-    return ret
-
-
-def _format_jid_instance(jid, job):
-    '''
-    Format the jid correctly
-    '''
-    ret = _format_job_instance(job)
-    ret.update({'StartTime': salt.utils.jid.jid_to_time(jid)})
-    return ret
-
-
 #TODO: add to returner docs-- this is a new one
 def prep_jid(nocache=False, passed_jid=None):
     '''
@@ -194,6 +169,7 @@ def save_load(jid, clear_load):
 
     serial = salt.payload.Serial(__opts__)
 
+    minions = None
     # if you have a tgt, save that for the UI etc
     if 'tgt' in clear_load:
         ckminions = salt.utils.minions.CkMinions(__opts__)
@@ -222,6 +198,13 @@ def save_load(jid, clear_load):
     except IOError as exc:
         log.warning('Could not write job invocation cache file: {0}'.format(exc))
 
+    try:
+        salt.utils.job_index.add(
+            __opts__,
+            salt.utils.job_index.summarize(jid, clear_load, minions))
+    except (IOError, OSError) as exc:
+        log.warning('Could not add job {0} to the job index: {1}'.format(jid, exc))
+
 
 def get_load(jid):
     '''
@@ -279,9 +262,84 @@ def get_jids():
     '''
     Return a list of all job ids
     '''
+    return search_jids()
+
+
+def get_returned(jid):
+    '''
+    Return the ids of the minions which returned the specified job id, without
+    reading their returns
+    '''
+    jid_dir = _jid_dir(jid)
+    if not os.path.isdir(jid_dir):
+        return []
+    return [fn_ for fn_ in os.listdir(jid_dir)
+            if not fn_.startswith('.')
+            and os.path.isfile(os.path.join(jid_dir, fn_, RETURN_P))]
+
+
+def _index_old_jobs():
+    '''
+    Add the jobs saved before the job index was used to the index
+    '''
+    index_dir = salt.utils.job_index.index_dir(__opts__)
+    marker = os.path.join(index_dir, INDEXED)
+    if os.path.isfile(marker):
+        return
+    indexed = salt.utils.job_index.jobs(__opts__)
+    job_dir = _job_dir()
+    if os.path.isdir(job_dir):
+        serial = salt.payload.Serial(__opts__)
+        for jid, job, t_path, final in _walk_through(job_dir):
+            if str(jid) in indexed:
+                continue
+            minions = None
+            minions_path = os.path.join(t_path, final, MINIONS_P)
+            if os.path.isfile(minions_path):
+                try:
+                    minions = serial.load(salt.utils.fopen(minions_path, 'rb'))
+                except Exception:
+                    pass
+            salt.utils.job_index.add(
+                __opts__, salt.utils.job_index.summarize(jid, job, minions))
+    if not os.path.isdir(index_dir):
+        os.makedirs(index_dir)
+    with salt.utils.fopen(marker, 'w+') as fp_:
+        fp_.write('')
+
+
+def search_jids(fun=None,
+                tgt=None,
+                user=None,
+                start=None,
+                end=None,
+                metadata=None,
+                limit=None,
+                offset=0):
+    '''
+    Return the jobs matching the given filters from the job index, see
+    :py:func:`salt.utils.job_index.search`
+    '''
+    _index_old_jobs()
+    if __opts__['keep_jobs'] != 0:
+        # Leave out the jobs which have been cleaned from the cache but are
+        # still in the index
+        oldest = '{0:%Y%m%d%H%M%S%f}'.format(
+            datetime.datetime.now()
+            - datetime.timedelta(hours=__opts__['keep_jobs']))
+        if not start or start < oldest:
+            start = oldest
     ret = {}
-    for jid, job, _, _ in _walk_through(_job_dir()):
-        ret[jid] = _format_jid_instance(jid, job)
+    for summary in salt.utils.job_index.search(__opts__,
+                                               fun=fun,
+                                               tgt=tgt,
+                                               user=user,
+                                               start=start,
+                                               end=end,
+                                               metadata=metadata,
+                                               limit=limit,
+                                               offset=offset):
+        ret[summary['jid']] = salt.utils.job_index.format_job(summary)
     return ret
 
 
@@ -309,3 +367,5 @@ def clean_old_jobs():
                     hours_difference = (cur - jid_ctime) / 3600.0
                     if hours_difference > __opts__['keep_jobs']:
                         shutil.rmtree(f_path)
+
+        salt.utils.job_index.clean(__opts__, __opts__['keep_jobs'])
@@ -0,0 +1,424 @@
+# -*- coding: utf-8 -*-
+'''
+Return data to a local job cache made of append-only segment files.
+
+The :py:mod:`local_cache <salt.returners.local_cache>` returner creates a
+directory for every job and for every minion returning it, so a single
+``test.ping`` to 10000 minions creates 10000 directories and files, and
+cleaning the cache walks them all again. This returner appends the loads and
+returns of jobs to segment files instead. Each master process writes to its
+own segment, and starts a new one every hour (or every ``keep_jobs`` / 24
+hours when that is shorter). Old jobs are expired by deleting the segments
+which have not been written to for ``keep_jobs`` hours.
+
+Each process keeps an index of the segments in memory, mapping job ids to the
+offsets of their loads and returns. Only the new records at the end of each
+segment are scanned to bring the index up to date, and only the small record
+headers are read to do so, so looking up a job does not need any directory
+walks.
+
+As in the local_cache, a second return of a job from the same minion is
+dropped. The master processes take turns checking the index and appending a
+return, under a lock file in the segment directory, so two of them can not
+both append it. There is no such lock on platforms without ``fcntl``.
+
+To use it for the master job cache, set in the master config:
+
+.. code-block:: yaml
+
+    master_job_cache: local_segment_cache
+
+Jobs already in the :py:mod:`local_cache <salt.returners.local_cache>` are
+not moved over.
+'''
+from __future__ import absolute_import
+
+# Import python libs
+import os
+import time
+import errno
+import struct
+import logging
+import threading
+import contextlib
+
+# Import salt libs
+import salt.payload
+import salt.utils
+import salt.utils.jid
+import salt.utils.minions
+
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
+
+log = logging.getLogger(__name__)
+
+# Each record is made of the lengths of its header and body, followed by the
+# header and the body. The header is a list of the record kind, the jid and a
+# kind specific value, the body is only read when it is needed.
+RECORD_HEAD = struct.Struct('>II')
+
+# The kinds of records
+PREP = 'prep'
+LOAD = 'load'
+MINIONS = 'minions'
+RETURN = 'ret'
+
+SEGMENT_SUFFIX = '.seg'
+
+# The segment this process appends to
+_SEGMENT = {'pid': None, 'fd': None, 'start': 0}
+_SEGMENT_LOCK = threading.Lock()
+
+# The index of the segments, maps the path of each segment to the offset it
+# has been scanned to, and each jid to the locations of its records
+_INDEX = {'files': {}, 'jobs': {}}
+
+
+def _segment_dir():
+    '''
+    Return the directory holding the segments
+    '''
+    return os.path.join(__opts__['cachedir'], 'job_segments')
+
+
+def _segment_interval():
+    '''
+    Return the seconds after which a process starts a new segment, expiring
+    whole segments removes jobs at most this long after keep_jobs
+    '''
+    if not __opts__['keep_jobs']:
+        return 3600
+    return max(60, min(3600, __opts__['keep_jobs'] * 150))
+
+
+def _segment_key(name):
+    '''
+    Sort segments by the time they were started
+    '''
+    try:
+        start, pid = name[:-len(SEGMENT_SUFFIX)].split('.')
+        return int(start), int(pid)
+    except ValueError:
+        return 0, 0
+
+
+def _append(*records):
+    '''
+    Append (header, body) records to the segment of this process
+    '''
+    serial = salt.payload.Serial(__opts__)
+    data = []
+    for header, body in records:
+        header = serial.dumps(header)
+        body = serial.dumps(body)
+        data.append(RECORD_HEAD.pack(len(header), len(body)))
+        data.append(header)
+        data.append(body)
+    data = b''.join(data)
+
+    with _SEGMENT_LOCK:
+        now = time.time()
+        if _SEGMENT['pid'] != os.getpid() \
+                or _SEGMENT['fd'] is None \
+                or now - _SEGMENT['start'] >= _segment_interval():
+            if _SEGMENT['pid'] == os.getpid() and _SEGMENT['fd'] is not None:
+                os.close(_SEGMENT['fd'])
+            segment_dir = _segment_dir()
+            if not os.path.isdir(segment_dir):
+                try:
+                    os.makedirs(segment_dir)
+                except OSError as exc:
+                    if exc.errno != errno.EEXIST:
+                        raise
+            path = os.path.join(
+                segment_dir,
+                '{0}.{1}{2}'.format(int(now), os.getpid(), SEGMENT_SUFFIX))
+            _SEGMENT['fd'] = os.open(
+                path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            _SEGMENT['pid'] = os.getpid()
+            _SEGMENT['start'] = now
+        # Only this process writes to its segment, readers ignore a record
+        # until all of it has been written
+        while data:
+            written = os.write(_SEGMENT['fd'], data)
+            data = data[written:]
+
+
+def _scan(path, offset, serial):
+    '''
+    Add the records of a segment after the given offset to the index, and
+    return the offset of the first record not read
+    '''
+    jobs = _INDEX['jobs']
+    try:
+        size = os.path.getsize(path)
+        if size <= offset:
+            return offset
+        fp_ = salt.utils.fopen(path, 'rb')
+    except (IOError, OSError):
+        return offset
+    with fp_:
+        fp_.seek(offset)
+        while offset + RECORD_HEAD.size <= size:
+            hlen, blen = RECORD_HEAD.unpack(fp_.read(RECORD_HEAD.size))
+            body = offset + RECORD_HEAD.size + hlen
+            if body + blen > size:
+                # The record is still being written
+                break
+            try:
+                kind, jid, extra = serial.loads(fp_.read(hlen))
+            except Exception as exc:
+                log.error('Corrupt record in job cache segment {0} at offset '
+                          '{1}: {2}'.format(path, offset, exc))
+                return size
+            fp_.seek(blen, os.SEEK_CUR)
+            offset = body + blen
+            job = jobs.setdefault(jid, {'nocache': False, 'returns': {}})
+            ref = (path, body, blen)
+            if kind == RETURN:
+                job['returns'].setdefault(extra, ref)
+            elif kind == PREP:
+                job['nocache'] = bool(extra)
+            else:
+                job[kind] = ref
+    return offset
+
+
+@contextlib.contextmanager
+def _return_lock():
+    '''
+    Hold the lock the master processes take turns checking for and appending
+    the returns of jobs under
+    '''
+    segment_dir = _segment_dir()
+    if not os.path.isdir(segment_dir):
+        try:
+            os.makedirs(segment_dir)
+        except OSError as exc:
+            if exc.errno != errno.EEXIST:
+                raise
+    with salt.utils.fopen(os.path.join(segment_dir, '.lock'), 'a') as fp_:
+        if HAS_FCNTL:
+            fcntl.flock(fp_.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if HAS_FCNTL:
+                fcntl.flock(fp_.fileno(), fcntl.LOCK_UN)
+
+
+def _refresh():
+    '''
+    Bring the index up to date with the segments, and return the jobs in it
+    '''
+    segment_dir = _segment_dir()
+    try:
+        names = [name for name in os.listdir(segment_dir)
+                 if name.endswith(SEGMENT_SUFFIX)]
+    except OSError:
+        names = []
+    paths = [os.path.join(segment_dir, name)
+             for name in sorted(names, key=_segment_key)]
+    files = _INDEX['files']
+    if set(files).difference(paths):
+        # Segments have been expired, start again
+        files.clear()
+        _INDEX['jobs'].clear()
+    serial = salt.payload.Serial(__opts__)
+    for path in paths:
+        files[path] = _scan(path, files.get(path, 0), serial)
+    return _INDEX['jobs']
+
+
+def _read(refs):
+    '''
+    Read the bodies of a dict of records, returns a dict of the same keys
+    '''
+    serial = salt.payload.Serial(__opts__)
+    ret = {}
+    fps = {}
+    try:
+        for key, (path, offset, length) in sorted(refs.items(),
+                                                  key=lambda item: item[1]):
+            try:
+                if path not in fps:
+                    fps[path] = salt.utils.fopen(path, 'rb')
+                fps[path].seek(offset)
+                ret[key] = serial.loads(fps[path].read(length))
+            except (IOError, OSError):
+                # The segment has been expired
+                continue
+    finally:
+        for fp_ in fps.values():
+            fp_.close()
+    return ret
+
+
+def _format_job_instance(job):
+    '''
+    Format the job instance correctly
+    '''
+    ret = {'Function': job.get('fun', 'unknown-function'),
+           'Arguments': list(job.get('arg', [])),
+           # unlikely but safeguard from invalid returns
+           'Target': job.get('tgt', 'unknown-target'),
+           'Target-type': job.get('tgt_type', []),
+           'User': job.get('user', 'root')}
+
+    if 'metadata' in job:
+        ret['Metadata'] = job.get('metadata', {})
+    else:
+        if 'kwargs' in job:
+            if 'metadata' in job['kwargs']:
+                ret['Metadata'] = job['kwargs'].get('metadata', {})
+    return ret
+
+
+def _format_jid_instance(jid, job):
+    '''
+    Format the jid correctly
+    '''
+    ret = _format_job_instance(job)
+    ret.update({'StartTime': salt.utils.jid.jid_to_time(jid)})
+    return ret
+
+
+def prep_jid(nocache=False, passed_jid=None):
+    '''
+    Return a job id and record it in the job cache
+    '''
+    jobs = _refresh()
+    if passed_jid is None:  # this can be a None of an empty string
+        jid = salt.utils.jid.gen_jid()
+        while jid in jobs:
+            jid = salt.utils.jid.gen_jid()
+    else:
+        jid = passed_jid
+    _append(([PREP, jid, bool(nocache)], None))
+    jobs.setdefault(jid, {'nocache': False, 'returns': {}})['nocache'] = \
+        bool(nocache)
+    return jid
+
+
+def returner(load):
+    '''
+    Return data to the local job cache
+    '''
+    # if a minion is returning a standalone job, get a jobid
+    if load['jid'] == 'req':
+        load['jid'] = prep_jid(nocache=load.get('nocache', False))
+
+    body = {'return': load['return']}
+    if 'out' in load:
+        body['out'] = load['out']
+    with _return_lock():
+        job = _refresh().get(load['jid'], {})
+        if job.get('nocache'):
+            return
+        if load['id'] in job.get('returns', {}):
+            # Minion has already returned this jid and it should be dropped
+            log.error(
+                'An extra return was detected from minion {0}, please verify '
+                'the minion, this could be a replay attack'.format(
+                    load['id']
+                )
+            )
+            return False
+        _append(([RETURN, load['jid'], load['id']], body))
+
+
+def save_load(jid, clear_load):
+    '''
+    Save the load to the specified jid
+    '''
+    records = [([LOAD, jid, None], clear_load)]
+    # if you have a tgt, save that for the UI etc
+    if 'tgt' in clear_load:
+        ckminions = salt.utils.minions.CkMinions(__opts__)
+        # Retrieve the minions list
+        minions = ckminions.check_minions(
+                clear_load['tgt'],
+                clear_load.get('tgt_type', 'glob')
+                )
+        records.append(([MINIONS, jid, None], minions))
+    try:
+        _append(*records)
+    except (IOError, OSError) as exc:
+        log.warning('Could not write job invocation cache file: {0}'.format(exc))
+
+
+def get_load(jid):
+    '''
+    Return the load data that marks a specified jid
+    '''
+    job = _refresh().get(jid, {})
+    if LOAD not in job:
+        return {}
+    refs = {LOAD: job[LOAD]}
+    if MINIONS in job:
+        refs[MINIONS] = job[MINIONS]
+    data = _read(refs)
+    ret = data.get(LOAD, {})
+    if MINIONS in data:
+        ret['Minions'] = data[MINIONS]
+    return ret
+
+
+def get_jid(jid):
+    '''
+    Return the information returned when the specified job id was executed
+    '''
+    job = _refresh().get(jid, {})
+    return _read(job.get('returns', {}))
+
+
+def get_returned(jid):
+    '''
+    Return the ids of the minions which returned the specified job id, without
+    reading their returns
+    '''
+    return list(_refresh().get(jid, {}).get('returns', {}))
+
+
+def get_jids():
+    '''
+    Return a list of all job ids
+    '''
+    jobs = _refresh()
+    loads = _read(dict((jid, job[LOAD]) for jid, job in jobs.items()
+                       if LOAD in job))
+    ret = {}
+    for jid, load in loads.items():
+        ret[jid] = _format_jid_instance(jid, load)
+    return ret
+
+
+def clean_old_jobs():
+    '''
+    Remove the segments which have not been written to for keep_jobs hours
+    '''
+    if __opts__['keep_jobs'] != 0:
+        cur = time.time()
+        segment_dir = _segment_dir()
+
+        if not os.path.exists(segment_dir):
+            return
+
+        for name in os.listdir(segment_dir):
+            if not name.endswith(SEGMENT_SUFFIX):
+                # The lock file
+                continue
+            path = os.path.join(segment_dir, name)
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                continue
+            if (cur - mtime) / 3600.0 > __opts__['keep_jobs']:
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
@@ -84,6 +84,18 @@ class RunnerClient(mixins.SyncClientMixin, mixins.AsyncClientMixin, object):
 
         return mixins.AsyncClientMixin.cmd_async(self, reformatted_low)
 
+    def pub_async(self, low, io_loop=None):
+        '''
+        Execute a runner function asynchronously through the master, without
+        blocking the IOLoop; eauth is respected
+
+        Return a future of the jid and the tag to watch for the return, see
+        :py:meth:`cmd_async`.
+        '''
+        reformatted_low = self._reformat_low(low)
+
+        return self.master_call_async(io_loop=io_loop, **reformatted_low)
+
     def cmd_sync(self, low, timeout=None):
         '''
         Execute a runner function synchronously; eauth is respected
@@ -10,6 +10,8 @@ import logging
 import salt.log
 import salt.utils
 import salt.utils.master
+import salt.utils.minions
+import salt.utils.pillar_cache
 import salt.payload
 from salt.ext.six import string_types
 
@@ -230,3 +232,61 @@ def clear_all(tgt=None, expr_form='glob'):
                         clear_pillar_flag=True,
                         clear_grains_flag=True,
                         clear_mine_flag=True)
+
+
+def clear_pillar_cache(tgt=None, expr_form='glob', ext_pillar=None):
+    '''
+    Remove the compiled pillar data kept by the master pillar cache (see
+    :conf_master:`pillar_cache`) and return the minions it was removed for.
+    If no target is given, the cached pillar of every minion is removed.
+
+    ext_pillar
+        Only remove cached pillar data which was compiled using the named
+        external pillar, so that changes to its data are picked up without
+        waiting for :conf_master:`pillar_cache_ttl`.
+
+    CLI Example:
+
+    .. code-block:: bash
+
+        salt-run cache.clear_pillar_cache
+        salt-run cache.clear_pillar_cache tgt='web*'
+        salt-run cache.clear_pillar_cache ext_pillar=mongo
+    '''
+    minions = None
+    if tgt is not None:
+        ckminions = salt.utils.minions.CkMinions(__opts__)
+        minions = ckminions.check_minions(tgt, expr_form)
+    cache = salt.utils.pillar_cache.PillarCache(__opts__)
+    return cache.clear(minions, ext_pillar=ext_pillar)
+
+
+def pillar_cache_stats():
+    '''
+    Return the hit and miss counts of the master pillar cache (see
+    :conf_master:`pillar_cache`), summed over the master worker processes.
+
+    hits
+        Pillar requests served from the cache
+
+    misses
+        Pillar requests with no cached pillar for the minion, or one compiled
+        for a different saltenv or different grains
+
+    stale
+        Pillar requests where a file the cached pillar was built from changed
+
+    expired
+        Pillar requests where the cached pillar was older than
+        :conf_master:`pillar_cache_ttl`
+
+    stored
+        Compiled pillars added to the cache
+
+    CLI Example:
+
+    .. code-block:: bash
+
+        salt-run cache.pillar_cache_stats
+    '''
+    return salt.utils.pillar_cache.PillarCache(__opts__).get_stats()
@@ -65,9 +65,14 @@ def active(outputter=None, display_progress=False):
                 ret[job['jid']]['Running'].append({minion: job['pid']})
 
     mminion = salt.minion.MasterMinion(__opts__)
+    returner = _get_returner((__opts__['ext_job_cache'], __opts__['master_job_cache']))
+    # Only the ids of the minions which returned are needed, avoid reading
+    # their returns if the returner can
+    fstr = '{0}.get_returned'.format(returner)
+    if fstr not in mminion.returners:
+        fstr = '{0}.get_jid'.format(returner)
     for jid in ret:
-        returner = _get_returner((__opts__['ext_job_cache'], __opts__['master_job_cache']))
-        data = mminion.returners['{0}.get_jid'.format(returner)](jid)
+        data = mminion.returners[fstr](jid)
         for minion in data:
             if minion not in ret[jid]['Returned']:
                 ret[jid]['Returned'].append(minion)
@@ -200,7 +205,10 @@ def list_jobs(ext_source=None,
               search_target=None,
               start_time=None,
               end_time=None,
-              display_progress=False):
+              display_progress=False,
+              search_user=None,
+              limit=None,
+              offset=0):
     '''
     List all detectable jobs and associated functions
 
@@ -231,6 +239,22 @@ def list_jobs(ext_source=None,
         by the Dateutil (required) module can be used.
         Default: 'None'.
 
+    search_user
+        Search the user of a job for the provided string.
+        Default: 'None'.
+
+    limit
+        Only return the newest ``limit`` matching jobs.
+        Default: 'None'.
+
+    offset
+        Skip the ``offset`` newest matching jobs, to page through the jobs
+        along with ``limit``.
+        Default: '0'.
+
+    If the job cache keeps an index of the jobs, as the ``local_cache``
+    returner does, the index is searched instead of reading every job.
+
     CLI Example:
 
     .. code-block:: bash
@@ -238,6 +262,7 @@ def list_jobs(ext_source=None,
         salt-run jobs.list_jobs
         salt-run jobs.list_jobs search_function='test.*' search_target='localhost' search_metadata='{"bar": "foo"}'
         salt-run jobs.list_jobs start_time='2015, Mar 16 19:00' end_time='2015, Mar 18 22:00'
+        salt-run jobs.list_jobs search_function='state.*' limit=50 offset=50
 
     '''
     returner = _get_returner((__opts__['ext_job_cache'], ext_source, __opts__['master_job_cache']))
@@ -245,6 +270,38 @@ def list_jobs(ext_source=None,
         __jid_event__.fire_event({'message': 'Querying returner {0} for jobs.'.format(returner)}, 'progress')
     mminion = salt.minion.MasterMinion(__opts__)
 
+    fstr = '{0}.search_jids'.format(returner)
+    if fstr in mminion.returners:
+        if search_metadata and not isinstance(search_metadata, dict):
+            log.info('The search_metadata parameter must be specified'
+                     ' as a dictionary.  Ignoring.')
+            return {}
+        start = end = None
+        if start_time or end_time:
+            if DATEUTIL_SUPPORT:
+                # Jids sort in the order the jobs were started
+                if start_time:
+                    start = '{0:%Y%m%d%H%M%S%f}'.format(
+                        dateutil_parser.parse(start_time))
+                if end_time:
+                    end = '{0:%Y%m%d%H%M%S%f}'.format(
+                        dateutil_parser.parse(end_time))
+            else:
+                log.error('"dateutil" library not available, skipping start_time comparision.')
+                return {}
+        mret = mminion.returners[fstr](fun=search_function,
+                                       tgt=search_target,
+                                       user=search_user,
+                                       start=start,
+                                       end=end,
+                                       metadata=search_metadata,
+                                       limit=limit,
+                                       offset=offset)
+        if outputter:
+            return {'outputter': outputter, 'data': mret}
+        else:
+            return mret
+
     ret = mminion.returners['{0}.get_jids'.format(returner)]()
 
     mret = {}
@@ -272,6 +329,17 @@ def list_jobs(ext_source=None,
                     if fnmatch.fnmatch(ret[item]['Target'], search_target):
                         _match = True
 
+        if search_user and _match:
+            _match = False
+            if 'User' in ret[item]:
+                if isinstance(search_user, list):
+                    for key in search_user:
+                        if fnmatch.fnmatch(ret[item]['User'], key):
+                            _match = True
+                elif isinstance(search_user, six.string_types):
+                    if fnmatch.fnmatch(ret[item]['User'], search_user):
+                        _match = True
+
         if search_function and _match:
             _match = False
             if 'Function' in ret[item]:
@@ -306,6 +374,12 @@ def list_jobs(ext_source=None,
         if _match:
             mret[item] = ret[item]
 
+    if limit or offset:
+        jids = sorted(mret, reverse=True)[offset:]
+        if limit:
+            jids = jids[:limit]
+        mret = dict((jid, mret[jid]) for jid in jids)
+
     if outputter:
         return {'outputter': outputter, 'data': mret}
     else:
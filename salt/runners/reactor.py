@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+'''
+Inspect the master reactor
+'''
+from __future__ import absolute_import
+# Import python libs
+import logging
+
+# Import salt libs
+import salt.payload
+import salt.utils
+import salt.utils.reactor
+
+log = logging.getLogger(__name__)
+
+
+def stats():
+    '''
+    Return the statistics of the reactor's reaction pool, as last written by
+    the reactor (every 10 seconds).
+
+    depth
+        Events waiting to be run
+
+    max_depth
+        The largest number of events which have waited at once
+
+    running
+        Reactions being run
+
+    queued
+        Events queued since the reactor started
+
+    dropped
+        Events dropped because the queue stayed full for longer than
+        ``reactor_queue_timeout`` seconds
+
+    done, failed
+        Reactions which finished, and which raised an exception
+
+    latency
+        For each list of reaction files, the number of reactions run, their
+        average and maximum run time and the average time they waited in the
+        queue, in seconds
+
+    CLI Example:
+
+    .. code-block:: bash
+
+        salt-run reactor.stats
+    '''
+    serial = salt.payload.Serial(__opts__)
+    try:
+        with salt.utils.fopen(salt.utils.reactor.stats_path(__opts__),
+                              'rb') as fp_:
+            return serial.load(fp_)
+    except (IOError, OSError):
+        return {}
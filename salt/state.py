@@ -17,22 +17,34 @@ from __future__ import absolute_import
 import os
 import sys
 import copy
+import json
 import site
+import hashlib
+import select
 import fnmatch
 import logging
+import tempfile
 import datetime
 import traceback
+import multiprocessing
 
 # Import salt libs
 import salt.utils
 import salt.loader
 import salt.minion
 import salt.pillar
+import salt.payload
+import salt.version
 import salt.fileclient
 import salt.utils.event
+import salt.utils.atomicfile
 import salt.syspaths as syspaths
 from salt.utils import context, immutabletypes
-from salt.template import compile_template, compile_template_str
+from salt.template import (
+    compile_template,
+    compile_template_str,
+    get_render_cache
+)
 from salt.exceptions import SaltRenderError, SaltReqTimeoutError, SaltException
 from salt.utils.odict import OrderedDict, DefaultOrderedDict
 
@@ -40,6 +52,7 @@ from salt.utils.odict import OrderedDict, DefaultOrderedDict
 # pylint: disable=import-error,no-name-in-module,redefined-builtin
 import salt.ext.six as six
 from salt.ext.six.moves import range
+import tornado.ioloop
 # pylint: enable=import-error,no-name-in-module,redefined-builtin
 
 log = logging.getLogger(__name__)
@@ -69,9 +82,12 @@ STATE_RUNTIME_KEYWORDS = frozenset([
     'state',
     'check_cmd',
     'fail_hard',
+    'incremental',
     'onlyif',
     'unless',
     'order',
+    '__auto_order__',
+    'parallel',
     'prereq',
     'prereq_in',
     'prerequired',
@@ -97,6 +113,19 @@ STATE_RUNTIME_KEYWORDS = frozenset([
 
 STATE_INTERNAL_KEYWORDS = STATE_REQUISITE_KEYWORDS.union(STATE_REQUISITE_IN_KEYWORDS).union(STATE_RUNTIME_KEYWORDS)
 
+# The name of the file in the cachedir holding the fingerprints of the state
+# chunks for incremental state runs
+STATE_FINGERPRINTS_CACHE = 'state_fingerprints.p'
+
+# The keys of the low data which change from one state run to the next
+# without changing what the state does, left out of the chunk fingerprints
+FINGERPRINT_IGNORE_KEYS = frozenset([
+    'order',
+    '__auto_order__',
+    '__prereq__',
+    '__prerequired__',
+    ])
+
 
 def _odict_hashable(self):
     return id(self)
@@ -124,6 +153,23 @@ def _gen_tag(low):
     return '{0[state]}_|-{0[__id__]}_|-{0[name]}_|-{0[fun]}'.format(low)
 
 
+def _chunk_sources(low):
+    '''
+    Return the salt:// URLs of the files from the master a chunk uses
+    '''
+    ret = set()
+    vals = [low]
+    while vals:
+        val = vals.pop()
+        if isinstance(val, dict):
+            vals.extend(val.values())
+        elif isinstance(val, (list, tuple)):
+            vals.extend(val)
+        elif isinstance(val, six.string_types) and val.startswith('salt://'):
+            ret.add(val)
+    return ret
+
+
 def _l_tag(name, id_):
     low = {'name': 'listen_{0}'.format(name),
            '__id__': 'listen_{0}'.format(id_),
@@ -160,30 +206,52 @@ def state_args(id_, state, high):
     return args
 
 
-def find_name(name, state, high):
+def find_name(name, state, high, index=None):
     '''
-    Scan high data for the id referencing the given name
+    Scan high data for the id referencing the given name, or look it up in a
+    HighIndex of the high data
     '''
     ext_id = ''
     if name in high:
         ext_id = name
+    elif index is not None:
+        ext_id = index.find_name(name, state)
     else:
         # We need to scan for the name
         for nid in high:
-            if state in high[nid]:
-                if isinstance(
-                        high[nid][state],
-                        list):
-                    for arg in high[nid][state]:
-                        if not isinstance(arg, dict):
-                            continue
-                        if len(arg) != 1:
-                            continue
-                        if arg[next(iter(arg))] == name:
-                            ext_id = nid
+            if _references_name(high, nid, state, name):
+                ext_id = nid
     return ext_id
 
 
+def _references_name(high, nid, state, name):
+    '''
+    Return whether the state of an id in the high data has an argument with
+    the given name as value
+    '''
+    if state in high[nid]:
+        if isinstance(
+                high[nid][state],
+                list):
+            for arg in high[nid][state]:
+                if not isinstance(arg, dict):
+                    continue
+                if len(arg) != 1:
+                    continue
+                if arg[next(iter(arg))] == name:
+                    return True
+    return False
+
+
+def _normcase(ref):
+    '''
+    Normalize a name the way fnmatch does before matching it
+    '''
+    if isinstance(ref, six.string_types):
+        return os.path.normcase(ref)
+    return ref
+
+
 def format_log(ret):
     '''
     Format the state into a log message
@@ -250,6 +318,180 @@ class StateError(Exception):
     pass
 
 
+class StateFingerprints(object):
+    '''
+    The fingerprints of the state chunks which last succeeded without
+    changes, kept in the cachedir for incremental state runs. A chunk called
+    again with the same fingerprint is known to be in its desired state.
+
+    The fingerprints are dropped when the Salt version changes, and the
+    fingerprint of a chunk is dropped when it is run and does not succeed
+    without changes.
+    '''
+    def __init__(self, opts):
+        self.path = os.path.join(opts['cachedir'], STATE_FINGERPRINTS_CACHE)
+        self.serial = salt.payload.Serial(opts)
+        self.context = salt.version.__version__
+        self.chunks = {}
+        # The fingerprints of the chunks which were clean in this run
+        self.clean = {}
+        try:
+            with salt.utils.fopen(self.path, 'rb') as fp_:
+                cache = self.serial.load(fp_)
+            if cache.get('context') == self.context:
+                self.chunks = cache['chunks']
+        except (IOError, OSError):
+            pass
+        except Exception as exc:
+            log.debug('Unable to read the state fingerprints {0}: {1}'.format(
+                self.path, exc))
+
+    def get(self, tag):
+        '''
+        Return the fingerprint the chunk was last clean with
+        '''
+        return self.chunks.get(tag)
+
+    def set(self, tag, fingerprint):
+        '''
+        Record that a chunk was clean with a fingerprint in this run
+        '''
+        self.clean[tag] = fingerprint
+
+    def write(self, running):
+        '''
+        Update the fingerprints of the chunks which ran and write them
+        '''
+        for tag in running:
+            if tag in self.clean:
+                self.chunks[tag] = self.clean[tag]
+            else:
+                self.chunks.pop(tag, None)
+        cumask = os.umask(0o77)
+        try:
+            tmpfh, tmpfname = tempfile.mkstemp(
+                dir=os.path.dirname(self.path))
+            os.close(tmpfh)
+            with salt.utils.fopen(tmpfname, 'w+b') as fp_:
+                self.serial.dump({'context': self.context,
+                                  'chunks': self.chunks}, fp_)
+            salt.utils.atomicfile.atomic_rename(tmpfname, self.path)
+        except (IOError, OSError) as exc:
+            log.error('Unable to write the state fingerprints {0}: {1}'.format(
+                self.path, exc))
+        finally:
+            os.umask(cumask)
+
+
+class HighIndex(object):
+    '''
+    An index of the ids of the high data by the values of the arguments of
+    their states, to find the id referencing a name without scanning all of
+    the high data for each requisite. See find_name.
+
+    Arguments added to the high data, for instance when it is extended, have
+    to be added to the index as well. The ids found in the index are checked
+    against the high data, so entries left over by arguments which changed
+    or ids which were removed do no harm.
+    '''
+    def __init__(self, high):
+        self.high = high
+        # (state, argument value) -> ids
+        self.names = {}
+        for id_, body in six.iteritems(high):
+            if not isinstance(body, dict):
+                continue
+            for state, run in six.iteritems(body):
+                self.add(id_, state, run)
+
+    def add(self, id_, state, args):
+        '''
+        Add the arguments of the state of an id to the index
+        '''
+        if not isinstance(args, list):
+            return
+        for arg in args:
+            if not isinstance(arg, dict) or len(arg) != 1:
+                continue
+            try:
+                self.names.setdefault(
+                    (state, arg[next(iter(arg))]), set()).add(id_)
+            except TypeError:
+                # Unhashable values are never looked up
+                continue
+
+    def find_name(self, name, state):
+        '''
+        Return the id referencing the given name, see find_name
+        '''
+        try:
+            nids = self.names.get((state, name), ())
+        except TypeError:
+            return find_name(name, state, self.high)
+        found = [nid for nid in nids
+                 if nid in self.high
+                 and _references_name(self.high, nid, state, name)]
+        if len(found) > 1:
+            # Several ids reference the name, scan the high data for the one
+            # find_name always returned
+            return find_name(name, state, self.high)
+        return found[0] if found else ''
+
+
+class ChunkIndex(object):
+    '''
+    An index of the chunks of a state run by state and name or id, and by
+    sls, to find the chunks a requisite refers to without going over all of
+    the chunks for each requisite
+    '''
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.size = len(chunks)
+        # state -> {name or id -> positions of the chunks}
+        self.refs = {}
+        # sls -> positions of the chunks
+        self.sls = {}
+        for pos, chunk in enumerate(chunks):
+            refs = self.refs.setdefault(chunk['state'], {})
+            for ref in (chunk['name'], chunk['__id__']):
+                try:
+                    positions = refs.setdefault(_normcase(ref), [])
+                except TypeError:
+                    continue
+                if not positions or positions[-1] != pos:
+                    positions.append(pos)
+            try:
+                self.sls.setdefault(_normcase(chunk.get('__sls__')),
+                                    []).append(pos)
+            except TypeError:
+                continue
+
+    def find(self, req_key, req_val):
+        '''
+        Return the chunks a requisite refers to, in the order of the chunks
+        '''
+        if req_val is None:
+            return []
+        if req_key == 'sls':
+            index = self.sls
+        else:
+            index = self.refs.get(req_key, {})
+        if isinstance(req_val, six.string_types) \
+                and any(char in req_val for char in '*?['):
+            positions = set()
+            for ref, ref_positions in six.iteritems(index):
+                if isinstance(ref, six.string_types) \
+                        and fnmatch.fnmatch(ref, req_val):
+                    positions.update(ref_positions)
+            positions = sorted(positions)
+        else:
+            try:
+                positions = index.get(_normcase(req_val), [])
+            except TypeError:
+                return []
+        return [self.chunks[pos] for pos in positions]
+
+
 class Compiler(object):
     '''
     Class used to compile and manage the High Data structure
@@ -604,6 +846,12 @@ class State(object):
         self.__run_num = 0
         self.jid = jid
         self.instance_id = str(id(self))
+        # The chunk fingerprints, while an incremental state run is going on
+        self.fingerprints = None
+        self._template_inputs = None
+        # Whether this is a process running a chunk for a parallel state run
+        self.parallel_child = False
+        self._chunk_index = None
 
     def _gather_pillar(self):
         '''
@@ -777,6 +1025,9 @@ class State(object):
         possible module type, e.g. a python, pyx, or .so. Always refresh if the
         function is recurse, since that can lay down anything.
         '''
+        if self.parallel_child:
+            # The parent process refreshes its own modules
+            return
         _reload_modules = False
         if data.get('reload_grains', False):
             log.debug('Refreshing grains...')
@@ -1168,9 +1419,10 @@ class State(object):
         chunks = self.order_chunks(chunks)
         return chunks
 
-    def reconcile_extend(self, high):
+    def reconcile_extend(self, high, index=None):
         '''
-        Pull the extend data and add it to the respective high data
+        Pull the extend data and add it to the respective high data, the
+        HighIndex of the high data is kept up to date if one is passed
         '''
         errors = []
         if '__extend__' not in high:
@@ -1182,8 +1434,10 @@ class State(object):
                     state_type = next(
                         x for x in body if not x.startswith('__')
                     )
+                    if index is None:
+                        index = HighIndex(high)
                     # Check for a matching 'name' override in high data
-                    id_ = find_name(name, state_type, high)
+                    id_ = find_name(name, state_type, high, index)
                     if id_:
                         name = id_
                     else:
@@ -1202,6 +1456,8 @@ class State(object):
                 for state, run in six.iteritems(body):
                     if state.startswith('__'):
                         continue
+                    if index is not None:
+                        index.add(name, state, run)
                     if state not in high[name]:
                         high[name][state] = run
                         continue
@@ -1306,6 +1562,7 @@ class State(object):
                     ]))
         extend = {}
         errors = []
+        index = HighIndex(high)
         for id_, body in six.iteritems(high):
             if not isinstance(body, dict):
                 continue
@@ -1402,7 +1659,7 @@ class State(object):
                                             )
                                 if key == 'prereq':
                                     # Add prerequired to prereqs
-                                    ext_id = find_name(name, _state, high)
+                                    ext_id = find_name(name, _state, high, index)
                                     if not ext_id:
                                         continue
                                     if ext_id not in extend:
@@ -1416,7 +1673,7 @@ class State(object):
                                 if key == 'use_in':
                                     # Add the running states args to the
                                     # use_in states
-                                    ext_id = find_name(name, _state, high)
+                                    ext_id = find_name(name, _state, high, index)
                                     if not ext_id:
                                         continue
                                     ext_args = state_args(ext_id, _state, high)
@@ -1442,7 +1699,7 @@ class State(object):
                                 if key == 'use':
                                     # Add the use state's args to the
                                     # running state
-                                    ext_id = find_name(name, _state, high)
+                                    ext_id = find_name(name, _state, high, index)
                                     if not ext_id:
                                         continue
                                     loc_args = state_args(id_, state, high)
@@ -1489,7 +1746,7 @@ class State(object):
         high['__extend__'] = []
         for key, val in six.iteritems(extend):
             high['__extend__'].append({key: val})
-        req_in_high, req_in_errors = self.reconcile_extend(high)
+        req_in_high, req_in_errors = self.reconcile_extend(high, index)
         errors.extend(req_in_errors)
         return req_in_high, errors
 
@@ -1636,10 +1893,100 @@ class State(object):
         log.info('Completed state [{0}] at time {1}'.format(low['name'], finish_time.time().isoformat()))
         return ret
 
+    def _chunk_fingerprint(self, low):
+        '''
+        Return the fingerprint of a chunk for incremental state runs, or None
+        if the chunk has to be run every time
+        '''
+        if not low.get('incremental', True) or low['fun'] == 'mod_watch':
+            return None
+        for key in ('prereq', 'prerequired', 'onchanges', 'onfail', 'onlyif',
+                    'unless', 'check_cmd'):
+            if key in low:
+                # These depend on more than the chunk itself
+                return None
+        data = dict((key, val) for key, val in six.iteritems(low)
+                    if key not in FINGERPRINT_IGNORE_KEYS
+                    and not key.startswith('__pub_'))
+        saltenv = low.get('saltenv', low.get('__env__', 'base'))
+        sources = {}
+        for url in _chunk_sources(low):
+            if 'cp.hash_file' not in self.functions:
+                return None
+            hsum = self.functions['cp.hash_file'](url, saltenv)
+            if not hsum:
+                # A directory or a missing file, which can not be
+                # fingerprinted
+                return None
+            sources[url] = hsum
+        data['__sources__'] = sources
+        if 'template' in low:
+            # Templates are rendered with the pillar and the grains
+            if self._template_inputs is None:
+                self._template_inputs = hashlib.md5(json.dumps(
+                    [self.opts['pillar'], self.opts['grains']],
+                    sort_keys=True,
+                    default=repr)).hexdigest()
+            data['__template_inputs__'] = self._template_inputs
+        return hashlib.md5(
+            json.dumps(data, sort_keys=True, default=repr)).hexdigest()
+
+    def call_incremental(self, low, chunks=None, running=None, reqs=None):
+        '''
+        Call a state, unless it last succeeded without changes with the same
+        fingerprint in an incremental state run and none of its requisites,
+        given as returned by check_requisite, changed or failed in this run
+        '''
+        if self.fingerprints is None:
+            return self.call(low, chunks, running)
+        fingerprint = self._chunk_fingerprint(low)
+        if fingerprint is None:
+            return self.call(low, chunks, running)
+        tag = _gen_tag(low)
+        if not self.opts.get('state_incremental_force') \
+                and self.fingerprints.get(tag) == fingerprint \
+                and self._reqs_unchanged(reqs, running):
+            log.info('Skipping unchanged state {0[state]}.{0[fun]} for '
+                     '{0[name]}'.format(low))
+            ret = {'name': low['name'],
+                   'changes': {},
+                   'result': True,
+                   'comment': 'State was not run because it is unchanged '
+                              'since it last succeeded without changes',
+                   '__run_num__': self.__run_num,
+                   '__sls__': low['__sls__']}
+            self.__run_num += 1
+        else:
+            ret = self.call(low, chunks, running)
+            if ret['result'] is not True or ret['changes']:
+                return ret
+        self.fingerprints.set(tag, fingerprint)
+        return ret
+
+    @staticmethod
+    def _reqs_unchanged(reqs, running):
+        '''
+        Return whether every requisite of a chunk ran in this run without
+        changes and without failing
+        '''
+        if not reqs:
+            return True
+        for req_chunks in six.itervalues(reqs):
+            for req_low in req_chunks:
+                req_ret = (running or {}).get(_gen_tag(req_low))
+                if req_ret is None \
+                        or req_ret['changes'] \
+                        or req_ret['result'] is False:
+                    return False
+        return True
+
     def call_chunks(self, chunks):
         '''
         Iterate over a list of chunks and call them, checking for requires.
         '''
+        if self.opts.get('state_parallel', 0) > 1 \
+                and not salt.utils.is_windows():
+            return self.call_chunks_parallel(chunks)
         running = {}
         for low in chunks:
             if '__FAILHARD__' in running:
@@ -1653,6 +2000,251 @@ class State(object):
             self.active = set()
         return running
 
+    def call_chunks_parallel(self, chunks):
+        '''
+        Call the chunks as a graph of their requisites. A chunk is started as
+        soon as the chunks it requires are done, in a process of its own, with
+        up to state_parallel processes at a time. Chunks which can not run in
+        a process of their own are called in this process, alone, once the
+        chunks they require are done.
+
+        The chunks of an order also wait for the chunks of the orders before
+        theirs, the orders given by state_auto_order all count as one. With
+        failhard, no more chunks are
+        started once a chunk fails hard, and the return is made of the chunks
+        which were already done or running.
+        '''
+        running = {}
+        graph = self._chunk_graph(chunks)
+        levels = self._order_levels(chunks)
+        # The chunks which have not been started yet, in the order of the run
+        waiting = OrderedDict()
+        for low in chunks:
+            waiting.setdefault(_gen_tag(low), low)
+        # tag -> (low, process, connection the return is read from)
+        pending = {}
+        cached = set()
+        failhard = False
+        while (waiting and not failhard) or pending:
+            called = False
+            if not failhard:
+                for tag in [tag for tag in waiting if tag in running]:
+                    # Called as the requisite of a chunk of this process
+                    del waiting[tag]
+                if waiting:
+                    level = min(levels[tag] for tag in
+                                list(waiting) + list(pending))
+                for tag, low in list(waiting.items()):
+                    if levels[tag] > level:
+                        continue
+                    if not graph[tag].issubset(running):
+                        continue
+                    if self._parallel_chunk(low):
+                        if len(pending) >= self.opts['state_parallel']:
+                            continue
+                        self._cache_sources(low, cached)
+                        pending[tag] = self._start_parallel(low,
+                                                            chunks,
+                                                            running)
+                        del waiting[tag]
+                        continue
+                    if pending:
+                        # The chunks called in this process run alone, once
+                        # the running chunks are done
+                        break
+                    del waiting[tag]
+                    running = self.call_chunk(low, running, chunks)
+                    self.active = set()
+                    failhard = '__FAILHARD__' in running \
+                        or self.check_failhard(low, running)
+                    called = True
+                    break
+            if called:
+                # The chunks waiting on this one may be ready now
+                continue
+            if pending:
+                for low in self._wait_parallel(pending, running, chunks, 1):
+                    if self.check_failhard(low, running):
+                        failhard = True
+            elif waiting and not failhard:
+                # None of the chunks left can start, because of a recursive
+                # requisite. Call the next one as call_chunks does, which
+                # reports the recursion.
+                tag, low = waiting.popitem(last=False)
+                running = self.call_chunk(low, running, chunks)
+                self.active = set()
+                failhard = '__FAILHARD__' in running \
+                    or self.check_failhard(low, running)
+        running.pop('__FAILHARD__', None)
+        return running
+
+    def _chunk_graph(self, chunks):
+        '''
+        Return the tags of the chunks each chunk has to wait for in a
+        parallel state run, keyed by the tag of the chunk
+        '''
+        graph = {}
+        for low in chunks:
+            deps = graph.setdefault(_gen_tag(low), set())
+            for requisite in ('require', 'watch', 'onchanges', 'onfail',
+                              'prerequired'):
+                for req in low.get(requisite) or []:
+                    req = trim_req(req)
+                    req_key = next(iter(req))
+                    for chunk in self._requisite_chunks(
+                            req_key, req[req_key], chunks):
+                        deps.add(_gen_tag(chunk))
+        for low in chunks:
+            tag = _gen_tag(low)
+            # A chunk calls the prereq chunks in test mode itself, which must
+            # not call the chunks they require again
+            for req in low.get('prereq') or []:
+                req = trim_req(req)
+                req_key = next(iter(req))
+                for chunk in self._requisite_chunks(
+                        req_key, req[req_key], chunks):
+                    graph[tag].update(graph[_gen_tag(chunk)])
+            graph[tag].discard(tag)
+        return graph
+
+    def _order_levels(self, chunks):
+        '''
+        Return the level of the chunks of a parallel state run, keyed by the
+        tag of the chunk. The chunks of a level only start once the chunks of
+        the levels below are done.
+        '''
+        # Every declaration gets an order of its own from state_auto_order,
+        # which would leave nothing to run in parallel. These orders share
+        # the level of the first of them, the orders set in the SLS files
+        # are levels of their own.
+        auto = [low['order'] for low in chunks
+                if low.get('__auto_order__')
+                and isinstance(low.get('order'), (int, float))]
+        levels = {}
+        for low in chunks:
+            order = low.get('order')
+            if not isinstance(order, (int, float)):
+                order = 0
+            elif low.get('__auto_order__'):
+                order = min(auto)
+            levels.setdefault(_gen_tag(low), int(order))
+        return levels
+
+    def _cache_sources(self, low, cached):
+        '''
+        Cache the files from the master a chunk uses before it is called in
+        a process of its own, the processes of the chunks using the same
+        files would write them at the same time
+        '''
+        if 'cp.cache_file' not in self.functions:
+            return
+        saltenv = low.get('saltenv', low.get('__env__', 'base'))
+        for url in _chunk_sources(low):
+            if (url, saltenv) in cached:
+                continue
+            self.functions['cp.cache_file'](url, saltenv)
+            cached.add((url, saltenv))
+
+    def _parallel_chunk(self, low):
+        '''
+        Return whether a chunk can be called in a process of its own
+        '''
+        if not low.get('parallel', True):
+            return False
+        for key in ('prereq', 'prerequired', '__prereq__', 'reload_modules',
+                    'reload_pillar', 'reload_grains'):
+            # Prereqs share the test runs of this process, and the reloads
+            # have to happen in this process
+            if low.get(key):
+                return False
+        state_func_name = '{0[state]}.{0[fun]}'.format(low)
+        if state_func_name not in self.states:
+            return False
+        serial = getattr(
+            sys.modules.get(self.states[state_func_name].__module__),
+            '__serial__',
+            False)
+        if isinstance(serial, list):
+            return low['fun'] not in serial
+        return not serial
+
+    def _start_parallel(self, low, chunks, running):
+        '''
+        Start the process calling a chunk for a parallel state run
+        '''
+        reader, writer = multiprocessing.Pipe(False)
+        proc = multiprocessing.Process(
+            target=self._call_parallel,
+            args=(low, chunks, running, writer))
+        proc.daemon = True
+        proc.start()
+        writer.close()
+        return low, proc, reader
+
+    def _call_parallel(self, low, chunks, running, conn):
+        '''
+        Call a chunk in its own process and send its return to the parent
+        '''
+        self.parallel_child = True
+        # The connections to the master of the parent can not be shared,
+        # open new ones on an IOLoop of this process
+        self.state_con.pop('cp.fileclient', None)
+        tornado.ioloop.IOLoop().make_current()
+        # The chunks it requires are done, so only this chunk is called
+        ret = self.call_chunk(low, running, chunks)[_gen_tag(low)]
+        fingerprint = None
+        if self.fingerprints is not None:
+            fingerprint = self.fingerprints.clean.get(_gen_tag(low))
+        try:
+            conn.send((ret, fingerprint))
+        except Exception as exc:
+            conn.send(({'name': low['name'],
+                        'changes': {},
+                        'result': False,
+                        'comment': 'Unable to send the return of the '
+                                   'state: {0}'.format(exc)},
+                       None))
+        conn.close()
+
+    def _wait_parallel(self, pending, running, chunks, count=0):
+        '''
+        Wait for the chunks called in parallel to return, for all of them or
+        for count of them, add their returns to running and return their low
+        data
+        '''
+        done = []
+        while pending and (not count or len(done) < count):
+            conns = dict((entry[2], tag) for tag, entry in six.iteritems(pending))
+            try:
+                readable = select.select(list(conns), [], [], 1)[0]
+            except select.error:
+                # Interrupted by a signal
+                continue
+            for conn in readable:
+                tag = conns[conn]
+                low, proc, conn = pending.pop(tag)
+                try:
+                    ret, fingerprint = conn.recv()
+                except (EOFError, IOError, OSError):
+                    ret = {'name': low['name'],
+                           'changes': {},
+                           'result': False,
+                           'comment': 'The process running the state exited '
+                                      'without returning',
+                           '__sls__': low['__sls__']}
+                    fingerprint = None
+                conn.close()
+                proc.join()
+                if fingerprint is not None and self.fingerprints is not None:
+                    self.fingerprints.set(tag, fingerprint)
+                ret['__run_num__'] = self.__run_num
+                self.__run_num += 1
+                self.check_refresh(low, ret)
+                running[tag] = ret
+                self.event(ret, len(chunks))
+                done.append(low)
+        return done
+
     def check_failhard(self, low, running):
         '''
         Check if the low data chunk should send a failhard signal
@@ -1663,6 +2255,17 @@ class State(object):
             return not running[tag]['result']
         return False
 
+    def _requisite_chunks(self, req_key, req_val, chunks):
+        '''
+        Return the chunks a requisite refers to, from the index of the chunks
+        which is built the first time the chunks are looked up
+        '''
+        if self._chunk_index is None \
+                or self._chunk_index.chunks is not chunks \
+                or self._chunk_index.size != len(chunks):
+            self._chunk_index = ChunkIndex(chunks)
+        return self._chunk_index.find(req_key, req_val)
+
     def check_requisite(self, low, running, chunks, pre=False):
         '''
         Look into the running data to check the status of all requisite
@@ -1702,25 +2305,11 @@ class State(object):
             if r_state in low and low[r_state] is not None:
                 for req in low[r_state]:
                     req = trim_req(req)
-                    found = False
-                    for chunk in chunks:
-                        req_key = next(iter(req))
-                        req_val = req[req_key]
-                        if req_val is None:
-                            continue
-                        if req_key == 'sls':
-                            # Allow requisite tracking of entire sls files
-                            if fnmatch.fnmatch(chunk['__sls__'], req_val):
-                                found = True
-                                reqs[r_state].append(chunk)
-                            continue
-                        if (fnmatch.fnmatch(chunk['name'], req_val) or
-                            fnmatch.fnmatch(chunk['__id__'], req_val)):
-                            if chunk['state'] == req_key:
-                                found = True
-                                reqs[r_state].append(chunk)
+                    req_key = next(iter(req))
+                    found = self._requisite_chunks(req_key, req[req_key], chunks)
                     if not found:
                         return 'unmet', ()
+                    reqs[r_state].extend(found)
         fun_stats = set()
         for r_state, chunks in six.iteritems(reqs):
             if r_state == 'prereq':
@@ -1778,6 +2367,9 @@ class State(object):
         '''
         Fire an event on the master bus
         '''
+        if self.parallel_child:
+            # The parent process fires the events of the chunks it numbered
+            return
         if not self.opts.get('local') and self.opts.get('state_events', True) and self.opts.get('master_uri'):
             ret = {'ret': chunk_ret,
                    'len': length}
@@ -1812,29 +2404,14 @@ class State(object):
                     continue
                 for req in low[requisite]:
                     req = trim_req(req)
-                    found = False
-                    for chunk in chunks:
-                        req_key = next(iter(req))
-                        req_val = req[req_key]
-                        if req_val is None:
-                            continue
-                        if req_key == 'sls':
-                            # Allow requisite tracking of entire sls files
-                            if fnmatch.fnmatch(chunk['__sls__'], req_val):
-                                if requisite == 'prereq':
-                                    chunk['__prereq__'] = True
-                                reqs.append(chunk)
-                                found = True
-                            continue
-                        if (fnmatch.fnmatch(chunk['name'], req_val) or
-                            fnmatch.fnmatch(chunk['__id__'], req_val)):
-                            if chunk['state'] == req_key:
-                                if requisite == 'prereq':
-                                    chunk['__prereq__'] = True
-                                elif requisite == 'prerequired':
-                                    chunk['__prerequired__'] = True
-                                reqs.append(chunk)
-                                found = True
+                    req_key = next(iter(req))
+                    found = self._requisite_chunks(req_key, req[req_key], chunks)
+                    for chunk in found:
+                        if requisite == 'prereq':
+                            chunk['__prereq__'] = True
+                        elif requisite == 'prerequired' and req_key != 'sls':
+                            chunk['__prerequired__'] = True
+                        reqs.append(chunk)
                     if not found:
                         lost[requisite].append(req)
             if lost['require'] or lost['watch'] or lost['prereq'] or lost['onfail'] or lost['onchanges'] or lost.get('prerequired'):
@@ -1901,7 +2478,8 @@ class State(object):
             if low.get('__prereq__'):
                 self.pre[tag] = self.call(low, chunks, running)
             else:
-                running[tag] = self.call(low, chunks, running)
+                running[tag] = self.call_incremental(low, chunks, running,
+                                                     reqs)
         elif status == 'fail':
             # if the requisite that failed was due to a prereq on this low state
             # show the normal error
@@ -2044,9 +2622,10 @@ class State(object):
         running.update(errors)
         return running
 
-    def call_high(self, high):
+    def compile_high(self, high):
         '''
-        Process a high data call and ensure the defined states.
+        Compile high data into the low chunks to run, return the chunks and
+        the errors
         '''
         errors = []
         # If there is extension data reconcile it
@@ -2054,15 +2633,28 @@ class State(object):
         errors += ext_errors
         errors += self.verify_high(high)
         if errors:
-            return errors
+            return [], errors
         high, req_in_errors = self.requisite_in(high)
         errors += req_in_errors
         high = self.apply_exclude(high)
         # Verify that the high data is structurally sound
         if errors:
-            return errors
+            return [], errors
         # Compile and verify the raw chunks
-        chunks = self.compile_high_data(high)
+        return self.compile_high_data(high), errors
+
+    def call_high(self, high, chunks=None):
+        '''
+        Process a high data call and ensure the defined states.
+
+        If the low chunks the high data compiles to are passed as ``chunks``
+        they are run as they are.
+        '''
+        errors = []
+        if chunks is None:
+            chunks, errors = self.compile_high(high)
+            if errors:
+                return errors
 
         # Check for any disabled states
         disabled = {}
@@ -2093,8 +2685,14 @@ class State(object):
         # the low data chunks
         if errors:
             return errors
+        if self.opts.get('state_incremental') and not self.opts.get('test'):
+            self.fingerprints = StateFingerprints(self.opts)
+            self._template_inputs = None
         ret = dict(list(disabled.items()) + list(self.call_chunks(chunks).items()))
         ret = self.call_listen(chunks, ret)
+        if self.fingerprints is not None:
+            self.fingerprints.write(ret)
+            self.fingerprints = None
 
         def _cleanup_accumulator_data():
             accum_data_path = os.path.join(
@@ -2234,6 +2832,12 @@ class BaseHighState(object):
         self.avail = self.__gather_avail()
         self.serial = salt.payload.Serial(self.opts)
         self.building_highstate = {}
+        # Top and SLS files which render the same in any context are only
+        # rendered once per process
+        self.render_cache = get_render_cache(self.opts)
+        # The (saltenv, url, path) of the files the highstate is compiled
+        # from, gathered for the compiled highstate cache when it is a list
+        self.rendered_files = None
 
     def __gather_avail(self):
         '''
@@ -2307,6 +2911,9 @@ class BaseHighState(object):
                 self.opts['state_top'],
                 self.opts['environment']
             )
+            self._track_file(self.opts['environment'],
+                             self.opts['state_top'],
+                             contents)
             if contents:
                 found = 1
             tops[self.opts['environment']] = [
@@ -2314,7 +2921,9 @@ class BaseHighState(object):
                     contents,
                     self.state.rend,
                     self.state.opts['renderer'],
-                    saltenv=self.opts['environment']
+                    saltenv=self.opts['environment'],
+                    render_cache=self.render_cache,
+                    _rendered_files=self.rendered_files
                 )
             ]
         else:
@@ -2324,6 +2933,7 @@ class BaseHighState(object):
                     self.opts['state_top'],
                     saltenv
                 )
+                self._track_file(saltenv, self.opts['state_top'], contents)
                 if contents:
                     found = found + 1
                 else:
@@ -2334,7 +2944,9 @@ class BaseHighState(object):
                         contents,
                         self.state.rend,
                         self.state.opts['renderer'],
-                        saltenv=saltenv
+                        saltenv=saltenv,
+                        render_cache=self.render_cache,
+                        _rendered_files=self.rendered_files
                     )
                 )
 
@@ -2360,15 +2972,16 @@ class BaseHighState(object):
                     for sls in fnmatch.filter(self.avail[saltenv], sls_match):
                         if sls in done[saltenv]:
                             continue
+                        state_data = self.client.get_state(sls, saltenv)
+                        self._track_state(sls, saltenv, state_data)
                         tops[saltenv].append(
                             compile_template(
-                                self.client.get_state(
-                                    sls,
-                                    saltenv
-                                ).get('dest', False),
+                                state_data.get('dest', False),
                                 self.state.rend,
                                 self.state.opts['renderer'],
-                                saltenv=saltenv
+                                saltenv=saltenv,
+                                render_cache=self.render_cache,
+                                _rendered_files=self.rendered_files
                             )
                         )
                         done[saltenv].append(sls)
@@ -2377,6 +2990,27 @@ class BaseHighState(object):
                     include.pop(saltenv)
         return tops
 
+    def _track_file(self, saltenv, url, dest):
+        '''
+        Record a file the highstate is compiled from, if they are gathered
+        '''
+        if self.rendered_files is not None:
+            self.rendered_files.append((saltenv, url, dest))
+
+    def _track_state(self, sls, saltenv, state_data):
+        '''
+        Record the file an SLS was found in, if the files are gathered
+        '''
+        if self.rendered_files is None or 'source' not in state_data:
+            return
+        source = state_data['source']
+        if source.endswith('/init.sls'):
+            # Adding <sls>.sls would change the file the SLS is found in
+            self._track_file(saltenv,
+                             '{0}.sls'.format(source[:-len('/init.sls')]),
+                             '')
+        self._track_file(saltenv, source, state_data['dest'])
+
     def merge_tops(self, tops):
         '''
         Cleanly merge the top files
@@ -2531,6 +3165,7 @@ class BaseHighState(object):
         errors = []
         if not local:
             state_data = self.client.get_state(sls, saltenv)
+            self._track_state(sls, saltenv, state_data)
             fn_ = state_data.get('dest', False)
         else:
             fn_ = sls
@@ -2549,7 +3184,8 @@ class BaseHighState(object):
         try:
             state = compile_template(
                 fn_, self.state.rend, self.state.opts['renderer'], saltenv,
-                sls, rendered_sls=mods
+                sls, rendered_sls=mods, render_cache=self.render_cache,
+                _rendered_files=self.rendered_files
             )
         except SaltRenderError as exc:
             msg = 'Rendering SLS \'{0}:{1}\' failed: {2}'.format(
@@ -2716,6 +3352,8 @@ class BaseHighState(object):
                         state[name][s_dec].append(
                                 {'order': self.iorder}
                                 )
+                        # Tell the order apart from one set in the SLS
+                        state[name][s_dec].append({'__auto_order__': True})
                         self.iorder += 1
         return state
 
@@ -2955,6 +3593,25 @@ class BaseHighState(object):
                 with salt.utils.fopen(cfn, 'rb') as fp_:
                     high = self.serial.load(fp_)
                     return self.state.call_high(high)
+        ccfn = os.path.join(
+                self.opts['cachedir'],
+                '{0}.compiled.p'.format(cache_name)
+        )
+        self.rendered_files = None
+        if self.opts.get('state_compile_cache'):
+            compiled = None
+            if not self.opts.get('state_incremental_force'):
+                compiled = self._load_compiled(ccfn, exclude, whitelist)
+            if compiled is not None and self._check_pillar(force):
+                self.load_dynamic(compiled['matches'])
+                # Syncing the dynamic modules can change the grains
+                if compiled['inputs'] == self._compiled_inputs(exclude,
+                                                               whitelist):
+                    log.debug('Using the compiled highstate from {0}'.format(
+                        ccfn))
+                    return self.state.call_high(None,
+                                                chunks=compiled['chunks'])
+            self.rendered_files = []
         # File exists so continue
         err = []
         try:
@@ -3007,8 +3664,118 @@ class BaseHighState(object):
             log.error(msg.format(cfn))
 
         os.umask(cumask)
+        if self.rendered_files is not None:
+            chunks, errors = self.state.compile_high(high)
+            if errors:
+                return errors
+            # The chunks are changed by the run, write them first
+            self._write_compiled(ccfn, exclude, whitelist, matches, chunks)
+            self.rendered_files = None
+            return self.state.call_high(None, chunks=chunks)
         return self.state.call_high(high)
 
+    def _compiled_inputs(self, exclude, whitelist):
+        '''
+        Return the hash of what the compiled highstate depends on, besides
+        the rendered files
+        '''
+        opts = dict((key, self.opts.get(key)) for key in (
+            'id', 'environment', 'state_top', 'renderer', 'nodegroups',
+            'state_auto_order', 'jinja_lstrip_blocks', 'jinja_trim_blocks'))
+        return hashlib.md5(json.dumps(
+            [salt.version.__version__,
+             opts,
+             self.avail,
+             self.client.ext_nodes(),
+             self.state.opts['pillar'],
+             self.opts['grains'],
+             exclude,
+             whitelist],
+            sort_keys=True,
+            default=repr)).hexdigest()
+
+    def _file_hash(self, saltenv, url):
+        '''
+        Return the hash of a file on the master and its type, or None if the
+        file does not exist
+        '''
+        ret = self.client.hash_file(url, saltenv)
+        if not isinstance(ret, dict) or not ret.get('hsum'):
+            return None
+        return [ret['hsum'], ret.get('hash_type', self.opts['hash_type'])]
+
+    def _load_compiled(self, ccfn, exclude, whitelist):
+        '''
+        Return the compiled highstate cached in ccfn if none of the files it
+        was rendered from changed and it was compiled with the same inputs,
+        else None
+        '''
+        try:
+            with salt.utils.fopen(ccfn, 'rb') as fp_:
+                compiled = self.serial.load(fp_)
+        except (IOError, OSError):
+            return None
+        except Exception as exc:
+            log.debug('Unable to read the compiled highstate {0}: {1}'.format(
+                ccfn, exc))
+            return None
+        try:
+            if compiled['inputs'] != self._compiled_inputs(exclude,
+                                                           whitelist):
+                return None
+            for saltenv, url, hsum in compiled['files']:
+                if self._file_hash(saltenv, url) != hsum:
+                    log.debug('The compiled highstate is out of date, {0} '
+                              'changed'.format(url))
+                    return None
+        except (KeyError, TypeError, ValueError):
+            return None
+        return compiled
+
+    def _write_compiled(self, ccfn, exclude, whitelist, matches, chunks):
+        '''
+        Cache the compiled highstate with the hashes of the files it was
+        rendered from and of the other inputs
+        '''
+        files = []
+        done = set()
+        for saltenv, url, dest in self.rendered_files:
+            if (saltenv, url) in done:
+                continue
+            done.add((saltenv, url))
+            hsum = self._file_hash(saltenv, url)
+            if hsum is None:
+                rendered = None
+            elif dest and os.path.isfile(dest):
+                rendered = [salt.utils.get_hash(dest, hsum[1]), hsum[1]]
+            else:
+                rendered = False
+            if rendered != hsum:
+                # The file changed while the highstate was rendered
+                log.debug('Not caching the compiled highstate, {0} '
+                          'changed'.format(url))
+                return
+            files.append([saltenv, url, hsum])
+        compiled = {'inputs': self._compiled_inputs(exclude, whitelist),
+                    'files': files,
+                    'matches': matches,
+                    'chunks': chunks}
+        cumask = os.umask(0o77)
+        try:
+            tmpfh, tmpfname = tempfile.mkstemp(dir=os.path.dirname(ccfn))
+            os.close(tmpfh)
+            with salt.utils.fopen(tmpfname, 'w+b') as fp_:
+                self.serial.dump(compiled, fp_)
+            salt.utils.atomicfile.atomic_rename(tmpfname, ccfn)
+        except TypeError:
+            # Can't serialize pydsl
+            os.remove(tmpfname)
+        except (IOError, OSError) as exc:
+            log.error('Unable to write the compiled highstate {0}: {1}'.format(
+                ccfn, exc))
+        finally:
+            os.umask(cumask)
+
     def compile_highstate(self):
         '''
         Return just the highstate or the errors
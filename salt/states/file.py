@@ -258,6 +258,10 @@ from salt.ext.six.moves import map  # pylint: disable=import-error,redefined-bui
 
 log = logging.getLogger(__name__)
 
+# The accumulators are kept in a file shared by the accumulated states, do not
+# call them in parallel
+__serial__ = ['accumulated']
+
 COMMENT_REGEX = r'^([[:space:]]*){0}[[:space:]]?'
 
 
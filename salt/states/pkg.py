@@ -98,6 +98,10 @@ if salt.utils.is_windows():
 
 log = logging.getLogger(__name__)
 
+# The package manager can not run several changes at the same time, do not
+# call the states of this module in parallel
+__serial__ = True
+
 
 def __virtual__():
     '''
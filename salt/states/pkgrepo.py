@@ -74,6 +74,10 @@ from salt.exceptions import CommandExecutionError, SaltInvocationError
 from salt.modules.aptpkg import _strip_uri
 from salt.state import STATE_INTERNAL_KEYWORDS as _STATE_INTERNAL_KEYWORDS
 
+# The repositories are changed and refreshed by the package manager, do not
+# call the states of this module in parallel
+__serial__ = True
+
 
 def __virtual__():
     '''
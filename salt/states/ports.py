@@ -32,6 +32,10 @@ import salt.ext.six as six
 
 log = logging.getLogger(__name__)
 
+# The package manager can not run several changes at the same time, do not
+# call the states of this module in parallel
+__serial__ = True
+
 
 def __virtual__():
     if __grains__.get('os', '') == 'FreeBSD' and 'ports.install' in __salt__:
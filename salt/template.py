@@ -8,8 +8,11 @@ from __future__ import absolute_import
 # Import python libs
 import time
 import os
+import copy
 import codecs
+import hashlib
 import logging
+import collections
 
 # Import salt libs
 import salt.utils
@@ -25,6 +28,95 @@ log = logging.getLogger(__name__)
 SLS_ENCODING = 'utf-8'  # this one has no BOM.
 SLS_ENCODER = codecs.getencoder(SLS_ENCODING)
 
+# Renderers whose output only depends on their input
+DATA_RENDERERS = ('yaml', 'yamlex', 'json')
+
+# Template renderers which pass their input through unchanged if it does not
+# contain any of the given markup
+PASSTHROUGH_RENDERERS = {
+    'jinja': ('{{', '{%', '{#'),
+}
+
+# The render cache of this process, see get_render_cache()
+_RENDER_CACHE = {}
+
+
+class RenderCache(object):
+    '''
+    A least recently used cache of rendered templates.
+
+    Only templates whose rendered data does not depend on the rendering
+    context are cached: templates rendered by DATA_RENDERERS alone, possibly
+    after a template renderer which has no markup to render. Entries are
+    keyed by the hash of the template contents and the render pipe, so the
+    same data can be reused across minions and environments.
+    '''
+    def __init__(self, size):
+        self.size = size
+        self.cache = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, input_data, pipestr):
+        '''
+        Return the cache key for a template, or None if its rendered data may
+        depend on the rendering context
+        '''
+        parts = [part.strip() for part in pipestr.split('|')]
+        if parts[0] == pipestr and pipestr in OLD_STYLE_RENDERERS:
+            parts = OLD_STYLE_RENDERERS[pipestr].split('|')
+        if parts[-1].split(' ', 1)[0] not in DATA_RENDERERS:
+            # Only data structures are cached
+            return None
+        for part in parts:
+            name = part.split(' ', 1)[0]
+            if name in DATA_RENDERERS:
+                continue
+            if name not in PASSTHROUGH_RENDERERS:
+                return None
+            if any(markup in input_data
+                   for markup in PASSTHROUGH_RENDERERS[name]):
+                return None
+        digest = hashlib.sha1(SLS_ENCODER(input_data)[0]).hexdigest()
+        return digest, tuple(parts)
+
+    def get(self, key):
+        '''
+        Return a copy of the data cached for a key, or None
+        '''
+        try:
+            data = self.cache.pop(key)
+        except KeyError:
+            self.misses += 1
+            return None
+        self.cache[key] = data
+        self.hits += 1
+        # Callers are free to modify the data they get back
+        return copy.deepcopy(data)
+
+    def store(self, key, data):
+        '''
+        Cache the data rendered for a key
+        '''
+        self.cache.pop(key, None)
+        self.cache[key] = copy.deepcopy(data)
+        while len(self.cache) > self.size:
+            self.cache.popitem(last=False)
+
+
+def get_render_cache(opts):
+    '''
+    Return the render cache of this process, or None if it is disabled by
+    setting ``render_cache_size`` to 0
+    '''
+    size = opts.get('render_cache_size', 0)
+    if not size:
+        return None
+    if size not in _RENDER_CACHE:
+        _RENDER_CACHE.clear()
+        _RENDER_CACHE[size] = RenderCache(size)
+    return _RENDER_CACHE[size]
+
 
 def compile_template(template,
                      renderers,
@@ -32,10 +124,14 @@ def compile_template(template,
                      saltenv='base',
                      sls='',
                      input_data='',
+                     render_cache=None,
                      **kwargs):
     '''
     Take the path to a template and return the high data structure
     derived from the template.
+
+    If a RenderCache is passed as ``render_cache``, templates which render to
+    the same data in any context are only rendered once.
     '''
 
     # if any error occurs, we return an empty dictionary
@@ -73,6 +169,20 @@ def compile_template(template,
                 log.error('Template is nothing but whitespace: {0}'.format(template))
                 return ret
 
+    cache_key = None
+    if render_cache is not None and template != ':string:':
+        line = input_data.split('\n', 1)[0]
+        if line.startswith('#!') and not line.startswith('#!/'):
+            pipestr = line.strip()[2:]
+        else:
+            pipestr = default
+        cache_key = render_cache.key(input_data, pipestr)
+        if cache_key is not None:
+            ret = render_cache.get(cache_key)
+            if ret is not None:
+                log.debug('Using cached render of {0}'.format(template))
+                return ret
+
     # Get the list of render funcs in the render pipe line.
     render_pipe = template_shebang(template, renderers, default, input_data)
 
@@ -105,6 +215,8 @@ def compile_template(template,
                 # structure. We don't want to log this, so ignore this
                 # exception.
                 pass
+    if cache_key is not None and render_pipe:
+        render_cache.store(cache_key, ret)
     return ret
 
 
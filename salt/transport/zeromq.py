@@ -80,6 +80,7 @@ class AsyncZeroMQReqChannel(salt.transport.client.ReqChannel):
                 opts['id'],          # minion ID
                 kwargs.get('master_uri', opts.get('master_uri')),  # master ID
                 kwargs.get('crypt', 'aes'),  # TODO: use the same channel for crypt
+                kwargs.get('socket', 0),  # REQ sockets serve one request at a time
                 )
 
     # has to remain empty for singletons, since __init__ will *always* be called
@@ -542,10 +543,30 @@ class ZeroMQPubServerChannel(salt.transport.server.PubServerChannel):
     def __init__(self, opts):
         self.opts = opts
         self.serial = salt.payload.Serial(self.opts)  # TODO: in init?
+        # The publish side is set up lazily and then reused for every publish
+        # made from this process
+        self._context = None
+        self._pub_sock = None
+        self._pub_pid = None
+        self._crypticle = None
+        self._sign_key = None
 
     def connect(self):
         return tornado.gen.sleep(5)
 
+    @property
+    def pull_uri(self):
+        '''
+        The URI of the publisher's pull socket
+        '''
+        if self.opts.get('ipc_mode', '') == 'tcp':
+            return 'tcp://127.0.0.1:{0}'.format(
+                self.opts.get('tcp_master_publish_pull', 4514)
+                )
+        return 'ipc://{0}'.format(
+            os.path.join(self.opts['sock_dir'], 'publish_pull.ipc')
+            )
+
     def _publish_daemon(self):
         '''
         Bind to the interface specified in the configuration file
@@ -570,15 +591,7 @@ class ZeroMQPubServerChannel(salt.transport.server.PubServerChannel):
         pub_uri = 'tcp://{interface}:{publish_port}'.format(**self.opts)
         # Prepare minion pull socket
         pull_sock = context.socket(zmq.PULL)
-
-        if self.opts.get('ipc_mode', '') == 'tcp':
-            pull_uri = 'tcp://127.0.0.1:{0}'.format(
-                self.opts.get('tcp_master_publish_pull', 4514)
-                )
-        else:
-            pull_uri = 'ipc://{0}'.format(
-                os.path.join(self.opts['sock_dir'], 'publish_pull.ipc')
-                )
+        pull_uri = self.pull_uri
         salt.utils.zeromq.check_ipc_path_max_len(pull_uri)
 
         # Start the minion command publisher
@@ -643,6 +656,57 @@ class ZeroMQPubServerChannel(salt.transport.server.PubServerChannel):
         '''
         process_manager.add_process(self._publish_daemon)
 
+    def _get_pub_sock(self):
+        '''
+        Return the PUSH socket connected to the publisher, creating it on first
+        use. The socket is recreated in a process forked after it was made,
+        since zeromq sockets must not be shared across a fork.
+        '''
+        if self._pub_sock is None or self._pub_pid != os.getpid():
+            self._context = zmq.Context(1)
+            self._pub_sock = self._context.socket(zmq.PUSH)
+            self._pub_sock.connect(self.pull_uri)
+            self._pub_pid = os.getpid()
+        return self._pub_sock
+
+    def _get_crypticle(self):
+        '''
+        Return a Crypticle for the current AES session key. The Crypticle is
+        only rebuilt when the key has been rotated.
+        '''
+        key = salt.master.SMaster.secrets['aes']['secret'].value
+        if self._crypticle is None or self._crypticle.key_string != key:
+            self._crypticle = salt.crypt.Crypticle(self.opts, key)
+        return self._crypticle
+
+    def _sign(self, data):
+        '''
+        Sign a publication with the master key, which is only loaded once
+        '''
+        master_pem_path = os.path.join(self.opts['pki_dir'], 'master.pem')
+        if self._sign_key is None:
+            self._sign_key = salt.crypt.get_sign_key(master_pem_path)
+        log.debug("Signing data packet")
+        return salt.crypt.sign_message(master_pem_path, data, self._sign_key)
+
+    def close(self):
+        '''
+        Close the connection to the publisher
+        '''
+        if self._pub_pid != os.getpid():
+            # The socket belongs to the parent process, leave it alone
+            return
+        if self._pub_sock is not None and self._pub_sock.closed is False:
+            self._pub_sock.setsockopt(zmq.LINGER, 1000)
+            self._pub_sock.close()
+        if self._context is not None and self._context.closed is False:
+            self._context.term()
+        self._pub_sock = None
+        self._context = None
+
+    def __del__(self):
+        self.close()
+
     def publish(self, load):
         '''
         Publish "load" to minions
@@ -650,32 +714,17 @@ class ZeroMQPubServerChannel(salt.transport.server.PubServerChannel):
         :param dict load: A load to be sent across the wire to minions
         '''
         payload = {'enc': 'aes'}
-
-        crypticle = salt.crypt.Crypticle(self.opts, salt.master.SMaster.secrets['aes']['secret'].value)
-        payload['load'] = crypticle.dumps(load)
+        payload['load'] = self._get_crypticle().dumps(load)
         if self.opts['sign_pub_messages']:
-            master_pem_path = os.path.join(self.opts['pki_dir'], 'master.pem')
-            log.debug("Signing data packet")
-            payload['sig'] = salt.crypt.sign_message(master_pem_path, payload['load'])
-        # Send 0MQ to the publisher
-        context = zmq.Context(1)
-        pub_sock = context.socket(zmq.PUSH)
-        if self.opts.get('ipc_mode', '') == 'tcp':
-            pull_uri = 'tcp://127.0.0.1:{0}'.format(
-                self.opts.get('tcp_master_publish_pull', 4514)
-                )
-        else:
-            pull_uri = 'ipc://{0}'.format(
-                os.path.join(self.opts['sock_dir'], 'publish_pull.ipc')
-                )
-        pub_sock.connect(pull_uri)
+            payload['sig'] = self._sign(payload['load'])
         int_payload = {'payload': self.serial.dumps(payload)}
 
         # add some targeting stuff for lists only (for now)
         if load['tgt_type'] == 'list':
             int_payload['topic_lst'] = load['tgt']
 
-        pub_sock.send(self.serial.dumps(int_payload))
+        # Send 0MQ to the publisher
+        self._get_pub_sock().send(self.serial.dumps(int_payload))
 
 
 # TODO: unit tests!
@@ -54,17 +54,22 @@ from __future__ import absolute_import
 
 # Import python libs
 import os
+import re
 import time
 import errno
 import signal
+import fnmatch
 import hashlib
 import logging
 import datetime
+import tempfile
+import threading
 import multiprocessing
 from collections import MutableMapping
 
 # Import third party libs
 import salt.ext.six as six
+from salt.ext.six.moves import queue  # pylint: disable=import-error
 try:
     import zmq
     import zmq.eventloop.ioloop
@@ -80,6 +85,7 @@ except ImportError:
 import salt.payload
 import salt.loader
 import salt.utils
+import salt.utils.atomicfile
 import salt.utils.cache
 import salt.utils.dicttrim
 import salt.utils.process
@@ -113,6 +119,9 @@ TAGS = {
     'queue': 'queue',  # prefix for all salt/queue events
 }
 
+# Characters which start a wildcard in a glob
+GLOB_CHARS = re.compile(r'[*?[]')
+
 
 def get_event(node, sock_dir=None, transport='zeromq', opts=None, listen=True):
     '''
@@ -165,6 +174,26 @@ def tagify(suffix='', prefix='', base=SALT):
     return TAGPARTER.join([part for part in parts if part])
 
 
+def compile_tag_globs(patterns):
+    '''
+    Return a function matching a tag against any of a list of globs. Patterns
+    without wildcards are looked up in a set, the others are joined into a
+    single regular expression.
+    '''
+    exact = set()
+    globs = []
+    for pattern in patterns:
+        if GLOB_CHARS.search(pattern):
+            globs.append('(?:{0})'.format(fnmatch.translate(pattern)))
+        else:
+            exact.add(pattern)
+    regex = re.compile('|'.join(globs)) if globs else None
+
+    def match(tag):
+        return tag in exact or (regex is not None and regex.match(tag) is not None)
+    return match
+
+
 class SaltEvent(object):
     '''
     Warning! Use the get_event function or the code will not be
@@ -185,6 +214,10 @@ class SaltEvent(object):
         if salt.utils.is_windows() and not hasattr(opts, 'ipc_mode'):
             opts['ipc_mode'] = 'tcp'
         self.puburi, self.pulluri = self.__load_uri(sock_dir, node)
+        # The tag prefixes subscribed to, all events are received until the
+        # first one is subscribed to
+        self.subscriptions = set()
+        self.subscribe_all = True
         self.subscribe()
         self.pending_events = []
         self.__load_cache_regex()
@@ -259,15 +292,39 @@ class SaltEvent(object):
     def subscribe(self, tag=None):
         '''
         Subscribe to events matching the passed tag.
+
+        Events are sent with their tag in front of the payload, so the
+        subscriptions are handed to ZeroMQ, which drops the events not
+        starting with any of the subscribed tags before they reach Python.
+        All events are received until the first tag is subscribed to,
+        subscribe to ``''`` to keep receiving all of them.
+
+        Subscribe before firing the events which trigger the ones waited for,
+        events published before the subscription are not received.
         '''
         if not self.cpub:
             self.connect_pub()
+        if tag is None or tag in self.subscriptions:
+            return
+        self.subscriptions.add(tag)
+        self.sub.setsockopt(zmq.SUBSCRIBE, tag)
+        if self.subscribe_all:
+            self.sub.setsockopt(zmq.UNSUBSCRIBE, '')
+            self.subscribe_all = False
 
     def unsubscribe(self, tag=None):
         '''
         Un-subscribe to events matching the passed tag.
+
+        All events are received again once no tags are subscribed to.
         '''
-        return
+        if tag not in self.subscriptions:
+            return
+        self.subscriptions.remove(tag)
+        if not self.subscriptions:
+            self.sub.setsockopt(zmq.SUBSCRIBE, '')
+            self.subscribe_all = True
+        self.sub.setsockopt(zmq.UNSUBSCRIBE, tag)
 
     def connect_pub(self):
         '''
@@ -276,7 +333,10 @@ class SaltEvent(object):
         self.sub = self.context.socket(zmq.SUB)
         self.sub.connect(self.puburi)
         self.poller.register(self.sub, zmq.POLLIN)
-        self.sub.setsockopt(zmq.SUBSCRIBE, '')
+        if self.subscribe_all:
+            self.sub.setsockopt(zmq.SUBSCRIBE, '')
+        for tag in self.subscriptions:
+            self.sub.setsockopt(zmq.SUBSCRIBE, tag)
         self.sub.setsockopt(zmq.LINGER, 5000)
         self.cpub = True
 
@@ -301,10 +361,31 @@ class SaltEvent(object):
         data = serial.loads(mdata)
         return mtag, data
 
-    def _get_match_func(self, match_type=None):
+    def _get_match_type(self, match_type=None):
         if match_type is None:
             match_type = self.opts.get('event_match_type', 'startswith')
-        return getattr(self, '_match_tag_{0}'.format(match_type), None)
+        return match_type
+
+    def _get_match_func(self, match_type=None):
+        return getattr(self,
+                       '_match_tag_{0}'.format(self._get_match_type(match_type)),
+                       None)
+
+    def _subscribe_match(self, tags, match_type=None):
+        '''
+        Subscribe to the events which can match the passed tags, and return
+        the tags which were not already covered by a subscribed prefix
+        '''
+        if self._get_match_type(match_type) != 'startswith':
+            # Only tag prefixes are matched by ZeroMQ
+            tags = ['']
+        added = []
+        for tag in tags:
+            if any(tag.startswith(sub) for sub in self.subscriptions):
+                continue
+            self.subscribe(tag)
+            added.append(tag)
+        return added
 
     def _check_pending(self, tag, pending_tags, match_func=None):
         """Check the pending_events list for events that match the tag
@@ -376,20 +457,24 @@ class SaltEvent(object):
             try:
                 # Please do not use non-blocking mode here. Reliability is
                 # more important than pure speed on the event bus.
-                ret = self.get_event_block()
+                raw = self.sub.recv()
             except zmq.ZMQError as ex:
                 if ex.errno == errno.EAGAIN or ex.errno == errno.EINTR:
                     continue
                 else:
                     raise
 
-            if not match_func(ret['tag'], tag):     # tag not match
-                if any(match_func(ret['tag'], ptag) for ptag in pending_tags):
-                    self.pending_events.append(ret)
+            # Only deserialize the events which are kept
+            mtag, sep, mdata = raw.partition(TAGEND)
+            if not match_func(mtag, tag):     # tag not match
+                if any(match_func(mtag, ptag) for ptag in pending_tags):
+                    self.pending_events.append(
+                        {'data': self.serial.loads(mdata), 'tag': mtag})
                 if wait:  # only update the wait timeout if we had one
                     wait = timeout_at - time.time()
                 continue
 
+            ret = {'data': self.serial.loads(mdata), 'tag': mtag}
             log.trace('get_event() received = {0}'.format(ret))
             return ret
 
@@ -429,6 +514,11 @@ class SaltEvent(object):
             Default is opts['event_match_type'] or 'startswith'
 
             New in @TBD
+
+        Once tags have been subscribed to, the tag and pending_tags are
+        subscribed to as well for the duration of the call, unless a
+        subscribed prefix already covers them. Subscribe to them beforehand
+        to also receive the events sent between calls.
         '''
 
         match_func = self._get_match_func(match_type)
@@ -436,10 +526,17 @@ class SaltEvent(object):
             pending_tags = ['']
         elif pending_tags is None:
             pending_tags = []
+        added = []
+        if not self.subscribe_all:
+            added = self._subscribe_match([tag] + pending_tags, match_type)
 
-        ret = self._check_pending(tag, pending_tags, match_func)
-        if ret is None:
-            ret = self._get_event(wait, tag, pending_tags, match_func)
+        try:
+            ret = self._check_pending(tag, pending_tags, match_func)
+            if ret is None:
+                ret = self._get_event(wait, tag, pending_tags, match_func)
+        finally:
+            for sub in added:
+                self.unsubscribe(sub)
 
         if ret is None or full:
             return ret
@@ -466,7 +563,11 @@ class SaltEvent(object):
     def iter_events(self, tag='', full=False, match_type=None):
         '''
         Creates a generator that continuously listens for events
+
+        Only the events which can match the tag are received from then on.
         '''
+        if tag:
+            self._subscribe_match([tag], match_type)
         while True:
             data = self.get_event(tag=tag, full=full, match_type=match_type)
             if data is None:
@@ -856,7 +957,17 @@ class EventReturn(multiprocessing.Process):
     '''
     A dedicated process which listens to the master event bus and queues
     and forwards events to the specified returner.
+
+    Queued events are handed to the returner once ``event_return_queue``
+    events are queued, or when the oldest has been queued for
+    ``event_return_flush_interval`` seconds. The returner is called from a
+    thread, so that the bus is still read while it writes. Events which the
+    returner fails to store are spooled to disk, up to
+    ``event_return_spool_max`` events, and retried.
     '''
+    # Batches of events waiting for the returner thread
+    WRITE_QUEUE_SIZE = 100
+
     def __init__(self, opts):
         '''
         Initialize the EventReturn system
@@ -867,33 +978,181 @@ class EventReturn(multiprocessing.Process):
 
         self.opts = opts
         self.event_return_queue = self.opts['event_return_queue']
+        self.flush_interval = self.opts.get('event_return_flush_interval', 5)
+        self.spool_max = self.opts.get('event_return_spool_max', 100000)
+        self.spool_dir = os.path.join(self.opts['cachedir'],
+                                      'event_return_spool')
+        self.whitelist = compile_tag_globs(self.opts['event_return_whitelist'])
+        self.blacklist = compile_tag_globs(self.opts['event_return_blacklist'])
         local_minion_opts = self.opts.copy()
         local_minion_opts['file_client'] = 'local'
         self.minion = salt.minion.MasterMinion(local_minion_opts)
         self.event_queue = []
+        self.queued_at = None
+        self.write_queue = queue.Queue(self.WRITE_QUEUE_SIZE)
+        self.spool_lock = threading.Lock()
+        self.spooled = None
+        self.serial = salt.payload.Serial(self.opts)
         self.stop = False
 
     def sig_stop(self, signum, frame):
         self.stop = True  # tell it to stop
 
     def flush_events(self):
+        '''
+        Hand the queued events to the returner thread, or spool them if it
+        is falling behind
+        '''
+        events = self.event_queue
+        self.event_queue = []
+        self.queued_at = None
+        try:
+            self.write_queue.put_nowait(events)
+        except queue.Full:
+            log.warning('The event returner is falling behind, spooling '
+                        '{0} events'.format(len(events)))
+            self._spool(events)
+
+    def _return(self, events):
+        '''
+        Send events to the returner. Returns False if they should be retried.
+        '''
         event_return = '{0}.event_return'.format(
             self.opts['event_return']
         )
-        if event_return in self.minion.returners:
-            try:
-                self.minion.returners[event_return](self.event_queue)
-            except Exception as exc:
-                log.error('Could not store events {0}. '
-                          'Returner raised exception: {1}'.format(
-                    self.event_queue, exc))
-            del self.event_queue[:]
-        else:
+        if event_return not in self.minion.returners:
             log.error(
                 'Could not store return for event(s) {0}. Returner '
                 '\'{1}\' not found.'
-                    .format(self.event_queue, self.opts['event_return'])
+                    .format(events, self.opts['event_return'])
             )
+            return True
+        try:
+            self.minion.returners[event_return](events)
+        except Exception as exc:
+            log.error('Could not store {0} events. '
+                      'Returner raised exception: {1}'.format(
+                len(events), exc))
+            return False
+        return True
+
+    def _spool_files(self):
+        '''
+        Return the spool files, oldest first, along with the number of events
+        in each
+        '''
+        try:
+            names = os.listdir(self.spool_dir)
+        except OSError:
+            return []
+        ret = []
+        for name in sorted(names):
+            # Spool files are named <time>_<count>.p, anything else is a
+            # temporary file left behind while spooling
+            if name.startswith('.') or not name.endswith('.p'):
+                continue
+            try:
+                ret.append((name, int(name[:-2].rsplit('_', 1)[1])))
+            except (IndexError, ValueError):
+                continue
+        return ret
+
+    def _spool(self, events):
+        '''
+        Write events the returner could not store to disk, dropping the
+        oldest spooled events when there are more than event_return_spool_max
+        '''
+        if len(events) > self.spool_max:
+            log.error('Dropping {0} events which could not be '
+                      'stored'.format(len(events)))
+            return
+        with self.spool_lock:
+            files = self._spool_files()
+            if self.spooled is None:
+                self.spooled = sum(count for _, count in files)
+            while files and self.spooled + len(events) > self.spool_max:
+                name, count = files.pop(0)
+                try:
+                    os.remove(os.path.join(self.spool_dir, name))
+                except OSError:
+                    pass
+                self.spooled -= count
+                log.error('The event return spool is full, dropped {0} '
+                          'events'.format(count))
+            try:
+                if not os.path.isdir(self.spool_dir):
+                    os.makedirs(self.spool_dir)
+                tmpfh, tmpfname = tempfile.mkstemp(dir=self.spool_dir,
+                                                   prefix='.')
+                os.close(tmpfh)
+                with salt.utils.fopen(tmpfname, 'w+b') as fp_:
+                    fp_.write(self.serial.dumps(events))
+                salt.utils.atomicfile.atomic_rename(
+                    tmpfname,
+                    os.path.join(self.spool_dir, '{0:020.6f}_{1}.p'.format(
+                        time.time(), len(events))))
+            except (IOError, OSError) as exc:
+                log.error('Could not spool {0} events: {1}'.format(
+                    len(events), exc))
+                return
+            self.spooled += len(events)
+
+    def _unspool(self):
+        '''
+        Send the spooled events to the returner, oldest first, until it fails
+        '''
+        with self.spool_lock:
+            if self.spooled == 0:
+                return
+            for name, count in self._spool_files():
+                path = os.path.join(self.spool_dir, name)
+                try:
+                    with salt.utils.fopen(path, 'rb') as fp_:
+                        events = self.serial.load(fp_)
+                except Exception as exc:
+                    log.error('Could not read spooled events {0}: {1}'.format(
+                        path, exc))
+                    events = []
+                if events and not self._return(events):
+                    return
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self.spooled = 0
+
+    def _writer(self, stop):
+        '''
+        Send the batches of events to the returner until the stop sentinel is
+        received
+        '''
+        while True:
+            try:
+                events = self.write_queue.get(timeout=self.flush_interval or 5)
+            except queue.Empty:
+                # Retry the spooled events while idle
+                self._unspool()
+                continue
+            done = events is stop
+            if not done:
+                # Send everything which queued up while the returner was busy
+                # in one go
+                while True:
+                    try:
+                        more = self.write_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if more is stop:
+                        done = True
+                        break
+                    events.extend(more)
+                if events:
+                    if self._return(events):
+                        self._unspool()
+                    else:
+                        self._spool(events)
+            if done:
+                break
 
     def run(self):
         '''
@@ -904,22 +1163,33 @@ class EventReturn(multiprocessing.Process):
 
         salt.utils.appendproctitle(self.__class__.__name__)
         self.event = get_event('master', opts=self.opts)
-        events = self.event.iter_events(full=True)
         self.event.fire_event({}, 'salt/event_listen/start')
+        stop = object()
+        writer = threading.Thread(target=self._writer, args=(stop,))
+        writer.daemon = True
+        writer.start()
         try:
-            for event in events:
-                if self._filter(event):
+            while not self.stop:
+                # Wake up at least once a second to flush on time
+                event = self.event.get_event(wait=1, full=True)
+                if event is not None and self._filter(event):
+                    if not self.event_queue:
+                        self.queued_at = time.time()
                     self.event_queue.append(event)
-                if len(self.event_queue) >= self.event_return_queue:
+                if not self.event_queue:
+                    continue
+                if len(self.event_queue) >= self.event_return_queue \
+                        or (self.flush_interval and time.time()
+                            - self.queued_at >= self.flush_interval):
                     self.flush_events()
-                if self.stop:
-                    break
         except zmq.error.ZMQError as exc:
             if exc.errno != errno.EINTR:  # Outside interrupt is a normal shutdown case
                 raise
         finally:  # flush all we have at this moment
             if self.event_queue:
                 self.flush_events()
+            self.write_queue.put(stop)
+            writer.join()
 
     def _filter(self, event):
         '''
@@ -928,14 +1198,9 @@ class EventReturn(multiprocessing.Process):
         Returns True if event should be stored, else False
         '''
         tag = event['tag']
-        if tag in self.opts['event_return_whitelist']:
-            if tag not in self.opts['event_return_blacklist']:
-                return True
-            else:
-                return False  # Event was whitelisted and blacklisted
-        elif tag in self.opts['event_return_blacklist']:
+        if self.opts['event_return_whitelist'] and not self.whitelist(tag):
             return False
-        return True
+        return not self.blacklist(tag)
 
 
 class StateFire(object):
@@ -9,9 +9,10 @@ from __future__ import absolute_import
 
 # Import python libs
 import gzip
+import zlib
 
-# Import 3rd-party libs
-from salt.ext.six.moves import StringIO  # pylint: disable=import-error
+# The window bits which make zlib read and write the gzip format
+GZIP_WBITS = 16 + zlib.MAX_WBITS
 
 
 class GzipFile(gzip.GzipFile):
@@ -51,15 +52,11 @@ def compress(data, compresslevel=9):
     '''
     Returns the data compressed at gzip level compression.
     '''
-    buf = StringIO()
-    with open_fileobj(buf, 'wb', compresslevel) as ogz:
-        ogz.write(data)
-    compressed = buf.getvalue()
-    return compressed
+    # zlib writes the gzip format directly, without copying the data through
+    # a file object
+    compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, GZIP_WBITS)
+    return compressor.compress(data) + compressor.flush()
 
 
 def uncompress(data):
-    buf = StringIO(data)
-    with open_fileobj(buf, 'rb') as igz:
-        unc = igz.read()
-        return unc
+    return zlib.decompress(data, GZIP_WBITS)
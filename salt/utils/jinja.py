@@ -54,7 +54,7 @@ class SaltCacheLoader(BaseLoader):
     and only loaded once per loader instance.
     '''
     def __init__(self, opts, saltenv='base', encoding='utf-8', env=None,
-                 pillar_rend=False):
+                 pillar_rend=False, rendered_files=None):
         if env is not None:
             salt.utils.warn_until(
                 'Boron',
@@ -75,6 +75,9 @@ class SaltCacheLoader(BaseLoader):
         self._file_client = None
         self.cached = []
         self.pillar_rend = pillar_rend
+        # The (saltenv, url, path) of the templates fetched are appended to
+        # this list, if it is passed
+        self.rendered_files = rendered_files
 
     def file_client(self):
         '''
@@ -90,7 +93,9 @@ class SaltCacheLoader(BaseLoader):
         Cache a file from the salt master
         '''
         saltpath = path.join('salt://', template)
-        self.file_client().get_file(saltpath, '', True, self.saltenv)
+        dest = self.file_client().get_file(saltpath, '', True, self.saltenv)
+        if self.rendered_files is not None:
+            self.rendered_files.append((self.saltenv, saltpath, dest))
 
     def check_cache(self, template):
         '''
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+'''
+Index of the jobs in the master job cache.
+
+Listing the jobs in the :py:mod:`local_cache <salt.returners.local_cache>`
+means listing every job directory and reading the load of every job, which
+takes minutes on a busy master. Instead, when a job is saved its summary (the
+jid, function, arguments, target, user, metadata and the number of targeted
+minions) is appended to this index, which the :py:func:`jobs.list_jobs
+<salt.runners.jobs.list_jobs>` runner searches.
+
+The index is kept in ``cachedir/job_index``. Each process appends to its own
+file, and starts a new one every hour, so that the files can be removed
+along with the jobs once they are older than ``keep_jobs`` hours. A process
+reading the index keeps it in memory and only reads the records added since
+it last looked.
+'''
+
+# Import python libs
+from __future__ import absolute_import
+import os
+import time
+import errno
+import struct
+import fnmatch
+import logging
+import threading
+
+# Import salt libs
+import salt.payload
+import salt.utils
+import salt.utils.jid
+
+# Import 3rd-party libs
+import salt.ext.six as six
+
+log = logging.getLogger(__name__)
+
+RECORD_HEAD = struct.Struct('>I')
+
+INDEX_SUFFIX = '.idx'
+
+# The file this process appends to
+_FILE = {'pid': None, 'fd': None, 'hour': None}
+_FILE_LOCK = threading.Lock()
+
+# The summaries read so far, and the offsets the files were read to
+_INDEX = {'dir': None, 'files': {}, 'jobs': {}}
+
+
+def index_dir(opts):
+    '''
+    Return the directory holding the index
+    '''
+    return os.path.join(opts['cachedir'], 'job_index')
+
+
+def summarize(jid, load, minions=None):
+    '''
+    Return the summary of a job kept in the index
+    '''
+    metadata = load.get('metadata')
+    if metadata is None and isinstance(load.get('kwargs'), dict):
+        metadata = load['kwargs'].get('metadata')
+    return {'jid': str(jid),
+            'fun': load.get('fun', 'unknown-function'),
+            'arg': list(load.get('arg', [])),
+            'tgt': load.get('tgt', 'unknown-target'),
+            'tgt_type': load.get('tgt_type', []),
+            'user': load.get('user', 'root'),
+            'metadata': metadata,
+            'minions': None if minions is None else len(minions)}
+
+
+def add(opts, summary):
+    '''
+    Append the summary of a job to the index
+    '''
+    data = salt.payload.Serial(opts).dumps(summary)
+    data = RECORD_HEAD.pack(len(data)) + data
+    hour = int(time.time() // 3600)
+    with _FILE_LOCK:
+        if _FILE['pid'] != os.getpid() \
+                or _FILE['fd'] is None \
+                or _FILE['hour'] != hour:
+            if _FILE['pid'] == os.getpid() and _FILE['fd'] is not None:
+                os.close(_FILE['fd'])
+            dirname = index_dir(opts)
+            if not os.path.isdir(dirname):
+                try:
+                    os.makedirs(dirname)
+                except OSError as exc:
+                    if exc.errno != errno.EEXIST:
+                        raise
+            path = os.path.join(
+                dirname, '{0}.{1}{2}'.format(hour, os.getpid(), INDEX_SUFFIX))
+            _FILE['fd'] = os.open(
+                path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            _FILE['pid'] = os.getpid()
+            _FILE['hour'] = hour
+        # Only this process writes to its file, readers ignore a record until
+        # all of it has been written
+        while data:
+            written = os.write(_FILE['fd'], data)
+            data = data[written:]
+
+
+def _scan(path, offset, serial):
+    '''
+    Read the records of an index file after the given offset, and return the
+    offset of the first record not read
+    '''
+    jobs = _INDEX['jobs']
+    try:
+        with salt.utils.fopen(path, 'rb') as fp_:
+            fp_.seek(offset)
+            data = fp_.read()
+    except (IOError, OSError):
+        return offset
+    pos = 0
+    while pos + RECORD_HEAD.size <= len(data):
+        length, = RECORD_HEAD.unpack_from(data, pos)
+        end = pos + RECORD_HEAD.size + length
+        if end > len(data):
+            # The record is still being written
+            break
+        try:
+            summary = serial.loads(data[pos + RECORD_HEAD.size:end])
+        except Exception as exc:
+            log.error('Corrupt record in job index {0} at offset {1}: '
+                      '{2}'.format(path, offset + pos, exc))
+            return offset + len(data)
+        jobs[summary['jid']] = summary
+        pos = end
+    return offset + pos
+
+
+def jobs(opts):
+    '''
+    Bring the index up to date, and return the summaries of the jobs keyed by
+    jid
+    '''
+    dirname = index_dir(opts)
+    if _INDEX['dir'] != dirname:
+        _INDEX.update({'dir': dirname, 'files': {}, 'jobs': {}})
+    try:
+        paths = [os.path.join(dirname, name) for name in os.listdir(dirname)
+                 if name.endswith(INDEX_SUFFIX)]
+    except OSError:
+        paths = []
+    files = _INDEX['files']
+    if set(files).difference(paths):
+        # Old files have been removed, read the index again
+        files.clear()
+        _INDEX['jobs'].clear()
+    serial = salt.payload.Serial(opts)
+    for path in sorted(paths):
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            continue
+        if size > files.get(path, 0):
+            files[path] = _scan(path, files.get(path, 0), serial)
+    return _INDEX['jobs']
+
+
+def _match_any(value, patterns):
+    '''
+    Return True if the value matches a glob, or any glob in a list
+    '''
+    if isinstance(patterns, six.string_types):
+        patterns = [patterns]
+    value = str(value)
+    for pattern in patterns:
+        if fnmatch.fnmatch(value, pattern):
+            return True
+    return False
+
+
+def search(opts,
+           fun=None,
+           tgt=None,
+           user=None,
+           start=None,
+           end=None,
+           metadata=None,
+           limit=None,
+           offset=0):
+    '''
+    Return the summaries of the jobs matching all of the given filters,
+    newest first.
+
+    fun, tgt, user
+        A glob, or a list of globs, matched against the function, target and
+        user of the job
+
+    start, end
+        Only return jobs started at or after, and at or before, these times,
+        given as jids (``YYYYmmddHHMMSSffffff``)
+
+    metadata
+        A dictionary, jobs with metadata matching any of its items are
+        returned
+
+    limit, offset
+        Return at most ``limit`` jobs, skipping the ``offset`` newest matches
+    '''
+    ret = []
+    for jid in sorted(jobs(opts), reverse=True):
+        summary = _INDEX['jobs'][jid]
+        if start and jid < start:
+            continue
+        if end and jid > end:
+            continue
+        if fun and not _match_any(summary['fun'], fun):
+            continue
+        if tgt and not _match_any(summary['tgt'], tgt):
+            continue
+        if user and not _match_any(summary['user'], user):
+            continue
+        if metadata:
+            job_metadata = summary['metadata']
+            if not isinstance(job_metadata, dict):
+                continue
+            if not any(job_metadata.get(key) == value
+                       for key, value in six.iteritems(metadata)
+                       if key in job_metadata):
+                continue
+        ret.append(summary)
+        if limit and len(ret) >= offset + limit:
+            break
+    return ret[offset:]
+
+
+def format_job(summary):
+    '''
+    Format a job summary the way the job cache returners format jobs
+    '''
+    ret = {'Function': summary['fun'],
+           'Arguments': summary['arg'],
+           'Target': summary['tgt'],
+           'Target-type': summary['tgt_type'],
+           'User': summary['user'],
+           'StartTime': salt.utils.jid.jid_to_time(summary['jid'])}
+    if summary['metadata'] is not None:
+        ret['Metadata'] = summary['metadata']
+    if summary['minions'] is not None:
+        ret['Minion-count'] = summary['minions']
+    return ret
+
+
+def clean(opts, keep_jobs):
+    '''
+    Remove the index files last written to more than keep_jobs hours ago
+    '''
+    dirname = index_dir(opts)
+    try:
+        names = os.listdir(dirname)
+    except OSError:
+        return
+    cur = time.time()
+    for name in names:
+        if not name.endswith(INDEX_SUFFIX):
+            # Leave the files the job cache keeps next to the index alone
+            continue
+        path = os.path.join(dirname, name)
+        try:
+            if (cur - os.path.getmtime(path)) / 3600.0 > keep_jobs:
+                os.remove(path)
+        except OSError:
+            continue
@@ -0,0 +1,452 @@
+# -*- coding: utf-8 -*-
+'''
+Inverted index over the grains and pillar data stored in the master's minion
+data cache.
+
+Without the index, every grain or pillar target has to open and deserialize
+``cachedir/minions/<id>/data.p`` for every minion the master knows about. The
+index flattens the grains and pillar of each minion into key paths, and maps
+each path to the distinct values found there and the minions holding them. A
+target is then resolved by matching the expression against the (few) distinct
+values of a path instead of against every minion.
+
+The index is persisted in ``cachedir/minion_index`` as a snapshot plus an
+append-only journal, so that it can be shared by all of the master worker
+processes:
+
+``snapshot.<gen>.p``
+    The complete index, as a mapping of minion id to flattened data.
+
+``journal.<gen>``
+    Length-prefixed records appended by writers since the snapshot was taken.
+
+Readers keep the index in memory and only read the journal records appended
+since their last refresh. When the journal grows larger than the snapshot it
+is folded into a new snapshot with the next generation number.
+'''
+
+# Import python libs
+from __future__ import absolute_import
+import os
+import re
+import errno
+import struct
+import fnmatch
+import logging
+import tempfile
+import contextlib
+
+# Import salt libs
+import salt.payload
+import salt.utils
+import salt.utils.atomicfile
+
+# Import 3rd-party libs
+import salt.ext.six as six
+
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
+
+log = logging.getLogger(__name__)
+
+# Separates the components of a flattened key path. Target expressions are
+# split on their delimiter and joined with this, so that the index does not
+# depend on the delimiter used in a target.
+PATH_SEP = '\x1f'
+
+SEARCH_TYPES = ('grains', 'pillar')
+
+# Fold the journal into a new snapshot once it is larger than the snapshot,
+# but never bother for journals smaller than this
+MIN_COMPACT_SIZE = 1048576
+
+_HEADER = struct.Struct('>I')
+
+
+def _to_str(value):
+    '''
+    Return the string form of a value, as used by salt.utils.subdict_match
+    '''
+    try:
+        return str(value).lower()
+    except UnicodeError:
+        return six.text_type(value).lower()
+
+
+def flatten(data):
+    '''
+    Flatten a grains or pillar dict into a list of ``[path, value]`` leaves and
+    a list of the paths which hold a non-empty dict.
+
+    The paths follow the traversal rules of
+    :py:func:`salt.utils.traverse_dict_and_list`: list members are reachable
+    by their numeric index, and the keys of dicts embedded in a list are
+    reachable directly below the list (and below ``<list>:*``, which
+    :py:func:`salt.utils.subdict_match` strips when matching list members).
+    '''
+    leaves = []
+    trees = []
+
+    def _walk(node, path):
+        if isinstance(node, dict):
+            if not node:
+                return
+            if path:
+                trees.append(path)
+            for key, val in six.iteritems(node):
+                if not isinstance(key, six.string_types):
+                    continue
+                _walk(val, path + PATH_SEP + key if path else key)
+        elif isinstance(node, list):
+            for idx, member in enumerate(node):
+                leaves.append([path, _to_str(member)])
+                _walk(member, path + PATH_SEP + str(idx))
+                if isinstance(member, dict):
+                    for key, val in six.iteritems(member):
+                        if not isinstance(key, six.string_types):
+                            continue
+                        _walk(val, path + PATH_SEP + key)
+                        _walk(val, path + PATH_SEP + '*' + PATH_SEP + key)
+        elif path:
+            leaves.append([path, _to_str(node)])
+
+    if isinstance(data, dict):
+        _walk(data, '')
+    return {'leaves': leaves, 'trees': trees}
+
+
+def _match(value, pattern, regex_match=False, exact_match=False):
+    '''
+    Match a stringified (and lowercased) value against a pattern, the same way
+    salt.utils.subdict_match does
+    '''
+    if regex_match:
+        try:
+            return re.match(pattern.lower(), value)
+        except Exception:
+            log.error('Invalid regex {0!r} in match'.format(pattern))
+            return False
+    elif exact_match:
+        return value == pattern.lower()
+    return fnmatch.fnmatch(value, pattern.lower())
+
+
+class MinionDataIndex(object):
+    '''
+    Index of the grains and pillar data in the minion data cache
+    '''
+    def __init__(self, opts):
+        self.opts = opts
+        self.serial = salt.payload.Serial(opts)
+        self.cdir = os.path.join(opts['cachedir'], 'minions')
+        self.idx_dir = os.path.join(opts['cachedir'], 'minion_index')
+        self.gen = None
+        self.offset = 0
+        self.minions = {}
+        self.values = dict((stype, {}) for stype in SEARCH_TYPES)
+        self.trees = dict((stype, {}) for stype in SEARCH_TYPES)
+
+    @contextlib.contextmanager
+    def _lock(self, exclusive=False):
+        '''
+        Hold the index lock file, shared for readers and exclusive for writers
+        '''
+        if not os.path.isdir(self.idx_dir):
+            try:
+                os.makedirs(self.idx_dir)
+            except OSError as exc:
+                if exc.errno != errno.EEXIST:
+                    raise
+        with salt.utils.fopen(os.path.join(self.idx_dir, '.lock'), 'a') as fp_:
+            if HAS_FCNTL:
+                fcntl.flock(
+                    fp_.fileno(),
+                    fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+                )
+            try:
+                yield
+            finally:
+                if HAS_FCNTL:
+                    fcntl.flock(fp_.fileno(), fcntl.LOCK_UN)
+
+    def _current_gen(self):
+        '''
+        Return the newest snapshot generation on disk, or None
+        '''
+        gens = []
+        for fn_ in os.listdir(self.idx_dir):
+            if fn_.startswith('snapshot.') and fn_.endswith('.p'):
+                try:
+                    gens.append(int(fn_[9:-2]))
+                except ValueError:
+                    continue
+        return max(gens) if gens else None
+
+    def _snapshot_path(self, gen):
+        return os.path.join(self.idx_dir, 'snapshot.{0}.p'.format(gen))
+
+    def _journal_path(self, gen):
+        return os.path.join(self.idx_dir, 'journal.{0}'.format(gen))
+
+    def _write_snapshot(self, gen):
+        '''
+        Atomically write the in-memory index as snapshot ``gen`` and start an
+        empty journal for it. Must be called with the exclusive lock held.
+        '''
+        tmpfh, tmpfname = tempfile.mkstemp(dir=self.idx_dir)
+        os.close(tmpfh)
+        with salt.utils.fopen(tmpfname, 'w+b') as fp_:
+            fp_.write(self.serial.dumps({'minions': self.minions}))
+        salt.utils.fopen(self._journal_path(gen), 'wb').close()
+        salt.utils.atomicfile.atomic_rename(tmpfname, self._snapshot_path(gen))
+        for fn_ in os.listdir(self.idx_dir):
+            if fn_ in ('snapshot.{0}.p'.format(gen), 'journal.{0}'.format(gen)):
+                continue
+            if fn_.startswith(('snapshot.', 'journal.')):
+                try:
+                    os.remove(os.path.join(self.idx_dir, fn_))
+                except OSError:
+                    pass
+        self.gen = gen
+        self.offset = 0
+
+    def _reset(self):
+        self.minions = {}
+        self.values = dict((stype, {}) for stype in SEARCH_TYPES)
+        self.trees = dict((stype, {}) for stype in SEARCH_TYPES)
+
+    def _unindex(self, minion_id):
+        '''
+        Drop a minion from the in-memory inverted index
+        '''
+        old = self.minions.pop(minion_id, None)
+        if not old:
+            return
+        for stype in SEARCH_TYPES:
+            flat = old.get(stype) or {}
+            values = self.values[stype]
+            for path, value in flat.get('leaves', ()):
+                ids = values.get(path, {}).get(value)
+                if ids is None:
+                    continue
+                ids.discard(minion_id)
+                if not ids:
+                    del values[path][value]
+                    if not values[path]:
+                        del values[path]
+            trees = self.trees[stype]
+            for path in flat.get('trees', ()):
+                ids = trees.get(path)
+                if ids is None:
+                    continue
+                ids.discard(minion_id)
+                if not ids:
+                    del trees[path]
+
+    def _apply(self, record):
+        '''
+        Apply a journal record to the in-memory inverted index
+        '''
+        minion_id = record['id']
+        self._unindex(minion_id)
+        if record.get('rm'):
+            return
+        entry = {}
+        for stype in SEARCH_TYPES:
+            flat = record.get(stype) or {'leaves': [], 'trees': []}
+            entry[stype] = flat
+            values = self.values[stype]
+            for path, value in flat['leaves']:
+                values.setdefault(path, {}).setdefault(value, set()).add(minion_id)
+            trees = self.trees[stype]
+            for path in flat['trees']:
+                trees.setdefault(path, set()).add(minion_id)
+        self.minions[minion_id] = entry
+
+    def _append(self, records):
+        '''
+        Append records to the current journal. Must be called with the
+        exclusive lock held.
+        '''
+        gen = self._current_gen()
+        if gen is None:
+            # No snapshot yet, start one from what is held in memory
+            self._write_snapshot(0)
+            gen = 0
+        with salt.utils.fopen(self._journal_path(gen), 'ab') as fp_:
+            for record in records:
+                payload = self.serial.dumps(record)
+                fp_.write(_HEADER.pack(len(payload)) + payload)
+        return gen
+
+    def _read_journal(self):
+        '''
+        Apply the journal records written since the last read. Must be called
+        with a lock held.
+        '''
+        try:
+            with salt.utils.fopen(self._journal_path(self.gen), 'rb') as fp_:
+                fp_.seek(self.offset)
+                while True:
+                    header = fp_.read(_HEADER.size)
+                    if len(header) < _HEADER.size:
+                        break
+                    size = _HEADER.unpack(header)[0]
+                    payload = fp_.read(size)
+                    if len(payload) < size:
+                        break
+                    self._apply(self.serial.loads(payload))
+                    self.offset += _HEADER.size + size
+        except (IOError, OSError):
+            pass
+
+    def _load(self):
+        '''
+        Bring the in-memory index up to date with the files on disk. Must be
+        called with a lock held.
+        '''
+        gen = self._current_gen()
+        if gen is None:
+            return
+        if gen != self.gen:
+            self._reset()
+            try:
+                with salt.utils.fopen(self._snapshot_path(gen), 'rb') as fp_:
+                    snapshot = self.serial.load(fp_)
+            except (IOError, OSError):
+                return
+            for minion_id, entry in six.iteritems(snapshot.get('minions', {})):
+                entry['id'] = minion_id
+                self._apply(entry)
+            self.gen = gen
+            self.offset = 0
+        self._read_journal()
+
+    def _maybe_compact(self):
+        '''
+        Fold the journal into a new snapshot if it has grown too large. Must be
+        called with the exclusive lock held.
+        '''
+        gen = self._current_gen()
+        if gen is None:
+            return
+        try:
+            jsize = os.path.getsize(self._journal_path(gen))
+            ssize = os.path.getsize(self._snapshot_path(gen))
+        except OSError:
+            return
+        if jsize < max(ssize, MIN_COMPACT_SIZE):
+            return
+        self._load()
+        log.debug(
+            'Compacting minion data index into generation {0}'.format(gen + 1)
+        )
+        self._write_snapshot(gen + 1)
+
+    def _read_data(self, minion_id):
+        '''
+        Read the grains and pillar for a minion out of the minion data cache
+        '''
+        datap = os.path.join(self.cdir, minion_id, 'data.p')
+        try:
+            with salt.utils.fopen(datap, 'rb') as fp_:
+                return self.serial.load(fp_)
+        except (IOError, OSError):
+            return None
+
+    def update(self, minion_id, grains=None, pillar=None):
+        '''
+        Record the current grains and pillar of a minion
+        '''
+        record = {'id': minion_id,
+                  'grains': flatten(grains),
+                  'pillar': flatten(pillar)}
+        with self._lock(exclusive=True):
+            self._append([record])
+            self._maybe_compact()
+
+    def remove(self, *minion_ids):
+        '''
+        Drop minions from the index
+        '''
+        if not minion_ids:
+            return
+        with self._lock(exclusive=True):
+            self._append([{'id': id_, 'rm': True} for id_ in minion_ids])
+            self._maybe_compact()
+
+    def refresh(self, cached=None):
+        '''
+        Load the changes other processes made to the index. Minions in
+        ``cached`` which have data in the minion data cache, but are not yet
+        indexed, are read in and added to the index.
+        '''
+        with self._lock():
+            self._load()
+        if not cached:
+            return
+        missing = [id_ for id_ in cached if id_ not in self.minions]
+        if not missing:
+            return
+        records = []
+        for minion_id in missing:
+            data = self._read_data(minion_id)
+            if not isinstance(data, dict):
+                continue
+            records.append({'id': minion_id,
+                            'grains': flatten(data.get('grains')),
+                            'pillar': flatten(data.get('pillar'))})
+        if not records:
+            return
+        log.debug('Adding {0} minions to the minion data index'.format(len(records)))
+        with self._lock(exclusive=True):
+            self._append(records)
+            self._load()
+            self._maybe_compact()
+
+    def indexed(self):
+        '''
+        Return the set of minion ids held in the index
+        '''
+        return set(self.minions)
+
+    def path_values(self, search_type, path, delimiter=':'):
+        '''
+        Return a dict mapping the values found at a key path to the set of
+        minions holding them
+        '''
+        key = PATH_SEP.join(path.split(delimiter))
+        return self.values[search_type].get(key, {})
+
+    def match(self,
+              search_type,
+              expr,
+              delimiter=':',
+              regex_match=False,
+              exact_match=False):
+        '''
+        Return the set of indexed minions whose data matches the expression,
+        following the semantics of :py:func:`salt.utils.subdict_match`
+        '''
+        ret = set()
+        values = self.values[search_type]
+        trees = self.trees[search_type]
+        splits = expr.split(delimiter)
+        for idx in range(1, len(splits)):
+            key = PATH_SEP.join(splits[:idx])
+            matchstr = delimiter.join(splits[idx:])
+            if matchstr == '*' and key in trees:
+                # We are just checking that the key exists
+                ret.update(trees[key])
+            for value, ids in six.iteritems(values.get(key, {})):
+                if ids <= ret:
+                    continue
+                if _match(value,
+                          matchstr,
+                          regex_match=regex_match,
+                          exact_match=exact_match):
+                    ret.update(ids)
+        return ret
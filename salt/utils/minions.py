@@ -9,11 +9,15 @@ from __future__ import absolute_import
 import os
 import fnmatch
 import re
+import time
 import logging
+import tempfile
 
 # Import salt libs
 import salt.payload
 import salt.utils
+import salt.utils.atomicfile
+import salt.utils.minion_index
 from salt.defaults import DEFAULT_TARGET_DELIM
 from salt.exceptions import CommandExecutionError
 
@@ -39,6 +43,10 @@ TARGET_REX = re.compile(
     )
 
 
+# The minions connected to the master, as last seen by the master
+PRESENCE_P = 'presence.p'
+
+
 def parse_target(target_expression):
     '''Parse `target_expressing` splitting it into `engine`, `delimiter`,
      `pattern` - returns a dict'''
@@ -96,6 +104,41 @@ def get_minion_data(minion, opts):
     return minion if minion else None, None, None
 
 
+def write_presence(opts, present):
+    '''
+    Record the ids of the minions connected to the master
+    '''
+    serial = salt.payload.Serial(opts)
+    try:
+        tmpfh, tmpfname = tempfile.mkstemp(dir=opts['cachedir'])
+        os.close(tmpfh)
+        with salt.utils.fopen(tmpfname, 'w+b') as fp_:
+            fp_.write(serial.dumps(sorted(present)))
+        salt.utils.atomicfile.atomic_rename(
+            tmpfname, os.path.join(opts['cachedir'], PRESENCE_P))
+    except (IOError, OSError) as exc:
+        log.debug('Unable to write minion presence: {0}'.format(exc))
+
+
+def read_presence(opts, max_age):
+    '''
+    Return the set of the ids of the minions connected to the master, or None
+    if they were not recorded in the last max_age seconds
+    '''
+    path = os.path.join(opts['cachedir'], PRESENCE_P)
+    serial = salt.payload.Serial(opts)
+    try:
+        if time.time() - os.path.getmtime(path) > max_age:
+            return None
+        with salt.utils.fopen(path, 'rb') as fp_:
+            return set(serial.load(fp_))
+    except (IOError, OSError):
+        return None
+    except Exception as exc:
+        log.debug('Unable to read minion presence: {0}'.format(exc))
+        return None
+
+
 def nodegroup_comp(nodegroup, nodegroups, skip=None):
     '''
     Recursively expand ``nodegroup`` from ``nodegroups``; ignore nodegroups in ``skip``
@@ -161,6 +204,11 @@ class CkMinions(object):
             self.acc = 'minions'
         else:
             self.acc = 'accepted'
+        if self.opts.get('minion_data_cache', False) \
+                and self.opts.get('minion_data_cache_index', False):
+            self.index = salt.utils.minion_index.MinionDataIndex(self.opts)
+        else:
+            self.index = None
 
     def _check_glob_minions(self, expr, greedy):  # pylint: disable=unused-argument
         '''
@@ -221,6 +269,18 @@ class CkMinions(object):
             cdir = os.path.join(self.opts['cachedir'], 'minions')
             if not os.path.isdir(cdir):
                 return list(minions)
+            if self.index is not None:
+                cached = set(os.listdir(cdir))
+                self.index.refresh(cached)
+                matched = self.index.match(search_type,
+                                           expr,
+                                           delimiter=delimiter,
+                                           regex_match=regex_match,
+                                           exact_match=exact_match)
+                return self._filter_indexed_minions(minions,
+                                                    cached,
+                                                    matched,
+                                                    greedy)
             for id_ in os.listdir(cdir):
                 if not greedy and id_ not in minions:
                     continue
@@ -240,6 +300,18 @@ class CkMinions(object):
                     minions.remove(id_)
         return list(minions)
 
+    def _filter_indexed_minions(self, minions, cached, matched, greedy):
+        '''
+        Narrow down ``minions`` using the set of minions the minion data index
+        matched. Like the full cache scan, greedy matching only drops the
+        minions which have cached data that does not match, and non-greedy
+        matching only keeps the minions with matching cached data.
+        '''
+        if greedy:
+            indexed = self.index.indexed() & cached
+            return list(set(minions) - (indexed - matched))
+        return list(set(minions) & cached & matched)
+
     def _check_grain_minions(self, expr, delimiter, greedy):
         '''
         Return the minions found by looking via grains
@@ -301,6 +373,11 @@ class CkMinions(object):
             cdir = os.path.join(self.opts['cachedir'], 'minions')
             if not os.path.isdir(cdir):
                 return list(minions)
+            if self.index is not None:
+                return self._check_ipcidr_index_minions(expr,
+                                                        minions,
+                                                        cdir,
+                                                        greedy)
             for id_ in os.listdir(cdir):
                 if not greedy and id_ not in minions:
                     continue
@@ -337,6 +414,34 @@ class CkMinions(object):
                             minions.remove(id_)
         return list(minions)
 
+    def _check_ipcidr_index_minions(self, expr, minions, cdir, greedy):
+        '''
+        Return the minions found by looking up ipcidr in the minion data index
+        '''
+        num_parts = len(expr.split('/'))
+        if num_parts > 2:
+            # Target is not valid CIDR, no minions match
+            return []
+        elif num_parts == 1:
+            # Target is an IPv4 address
+            import socket
+            try:
+                socket.inet_aton(expr)
+            except socket.error:
+                # Not a valid IPv4 address, no minions match
+                return []
+        cached = set(os.listdir(cdir))
+        self.index.refresh(cached)
+        matched = set()
+        for addr, ids in six.iteritems(self.index.path_values('grains', 'ipv4')):
+            if num_parts == 2:
+                if not salt.utils.network.in_subnet(expr, addrs=[addr]):
+                    continue
+            elif addr != expr:
+                continue
+            matched.update(ids)
+        return self._filter_indexed_minions(minions, cached, matched, greedy)
+
     def _check_range_minions(self, expr, greedy):
         '''
         Return the minions found by looking via range expression
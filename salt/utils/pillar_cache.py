@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+'''
+Cache of the pillar data compiled by the master.
+
+When a minion requests its pillar, the master renders the pillar top file,
+every matching SLS file and every external pillar. The cache keeps the result
+of the last compile for each minion, keyed by the saltenv and a hash of the
+grains the minion sent, so that requesting the pillar again (as happens for
+every ``saltutil.refresh_pillar`` and highstate) does not recompile it.
+
+Each entry records the files read by the compile, the directories holding them
+and the :conf_master:`pillar_roots` of the environments used, along with their
+mtimes and sizes. An entry is discarded as soon as any of them changes, which
+catches edited, added and removed SLS files. Data pulled in from elsewhere,
+such as external pillars and files imported by templates, is only refreshed
+when the entry expires after :conf_master:`pillar_cache_ttl` seconds, or when
+the entries using an external pillar are cleared with the
+:py:func:`cache.clear_pillar_cache <salt.runners.cache.clear_pillar_cache>`
+runner.
+
+Entries are stored in ``cachedir/pillar_cache/minions`` so that they are
+shared by all of the master worker processes. Each process periodically writes
+its hit and miss counts to ``cachedir/pillar_cache/stats``, which are summed by
+the :py:func:`cache.pillar_cache_stats <salt.runners.cache.pillar_cache_stats>`
+runner. The counts of processes which are not running anymore, or which were
+not written for longer than the TTL, are removed.
+'''
+
+# Import python libs
+from __future__ import absolute_import
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+
+# Import salt libs
+import salt.payload
+import salt.utils
+import salt.utils.atomicfile
+import salt.utils.process
+
+# Import 3rd-party libs
+import salt.ext.six as six
+
+log = logging.getLogger(__name__)
+
+# Seconds between writes of the statistics of a process
+STATS_INTERVAL = 10
+
+STAT_KEYS = ('hits', 'misses', 'stale', 'expired', 'stored')
+
+
+def _stat(path):
+    '''
+    Return the values recorded for a dependency of a cache entry
+    '''
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_mtime, stat.st_size]
+
+
+class PillarCache(object):
+    '''
+    Read and write the compiled pillar cache
+    '''
+    def __init__(self, opts):
+        self.opts = opts
+        self.serial = salt.payload.Serial(opts)
+        self.cache_dir = os.path.join(opts['cachedir'], 'pillar_cache')
+        self.minions_dir = os.path.join(self.cache_dir, 'minions')
+        self.stats_dir = os.path.join(self.cache_dir, 'stats')
+        self.ttl = opts.get('pillar_cache_ttl', 3600)
+        self.stats = dict((key, 0) for key in STAT_KEYS)
+        self.stats_written = 0
+
+    def _entry_path(self, minion_id):
+        return os.path.join(self.minions_dir, '{0}.p'.format(minion_id))
+
+    def _write(self, path, data):
+        '''
+        Atomically replace a file in the cache
+        '''
+        dirname = os.path.dirname(path)
+        if not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        tmpfh, tmpfname = tempfile.mkstemp(dir=dirname)
+        os.close(tmpfh)
+        with salt.utils.fopen(tmpfname, 'w+b') as fp_:
+            fp_.write(self.serial.dumps(data))
+        salt.utils.atomicfile.atomic_rename(tmpfname, path)
+
+    def _read(self, path):
+        '''
+        Read a file from the cache, returns None if it cannot be read
+        '''
+        try:
+            with salt.utils.fopen(path, 'rb') as fp_:
+                return self.serial.load(fp_)
+        except (IOError, OSError):
+            return None
+        except Exception as exc:
+            log.debug('Unable to read pillar cache file {0}: {1}'
+                      .format(path, exc))
+            return None
+
+    def _count(self, key):
+        '''
+        Count a cache event, and write out the statistics of this process if
+        they have not been written for a while
+        '''
+        self.stats[key] += 1
+        now = time.time()
+        if now - self.stats_written < STATS_INTERVAL:
+            return
+        if not self.stats_written:
+            # Clear out the statistics of the processes this one replaced
+            self._prune_stats()
+        self.stats_written = now
+        try:
+            self._write(os.path.join(self.stats_dir,
+                                     '{0}.p'.format(os.getpid())),
+                        self.stats)
+        except (IOError, OSError) as exc:
+            log.debug('Unable to write pillar cache stats: {0}'.format(exc))
+
+    def key(self, saltenv, grains):
+        '''
+        Return the key of the entry for a saltenv and set of grains
+        '''
+        try:
+            data = json.dumps([saltenv, grains], sort_keys=True, default=repr)
+        except (TypeError, ValueError):
+            # Grains which cannot be dumped as JSON only cause a cache miss
+            # when their order changes
+            data = repr([saltenv, grains])
+        return hashlib.sha1(data).hexdigest()
+
+    def get(self, minion_id, saltenv, grains):
+        '''
+        Return the cached pillar of a minion, or None if there is no valid
+        entry for the given saltenv and grains
+        '''
+        entry = self._read(self._entry_path(minion_id))
+        if entry is None or entry.get('key') != self.key(saltenv, grains):
+            self._count('misses')
+            return None
+        if time.time() - entry['time'] > self.ttl:
+            self._count('expired')
+            return None
+        for path, stat in six.iteritems(entry['deps']):
+            if _stat(path) != stat:
+                log.debug('Pillar cache entry for {0} is stale, {1} has '
+                          'changed'.format(minion_id, path))
+                self._count('stale')
+                return None
+        self._count('hits')
+        return entry['pillar']
+
+    def store(self, minion_id, saltenv, grains, pillar, sources, ext_pillars):
+        '''
+        Cache the pillar compiled for a minion.
+
+        sources
+            The paths of the top and SLS files read by the compile
+
+        ext_pillars
+            The names of the external pillars run by the compile
+        '''
+        if '_errors' in pillar:
+            # Do not hold on to a broken compile
+            return
+        deps = set(sources)
+        deps.update(os.path.dirname(path) for path in sources)
+        if saltenv:
+            deps.update(self.opts['pillar_roots'].get(saltenv, []))
+        else:
+            for roots in six.itervalues(self.opts['pillar_roots']):
+                deps.update(roots)
+        entry = {'key': self.key(saltenv, grains),
+                 'time': time.time(),
+                 'deps': dict((path, _stat(path)) for path in deps),
+                 'ext_pillars': sorted(ext_pillars),
+                 'pillar': pillar}
+        try:
+            self._write(self._entry_path(minion_id), entry)
+        except (IOError, OSError) as exc:
+            log.error('Unable to write pillar cache entry for {0}: {1}'
+                      .format(minion_id, exc))
+            return
+        self._count('stored')
+
+    def clear(self, minions=None, ext_pillar=None):
+        '''
+        Remove cache entries and return the ids of the minions they belonged
+        to. Entries are removed for the minions in the ``minions`` list, or
+        for all minions if it is None. If ``ext_pillar`` is given, only the
+        entries compiled using that external pillar are removed.
+        '''
+        if not os.path.isdir(self.minions_dir):
+            return []
+        if minions is None:
+            minions = [os.path.splitext(fn_)[0]
+                       for fn_ in os.listdir(self.minions_dir)
+                       if fn_.endswith('.p')]
+        ret = []
+        for minion_id in minions:
+            path = self._entry_path(minion_id)
+            if ext_pillar is not None:
+                entry = self._read(path)
+                if entry is None \
+                        or ext_pillar not in entry.get('ext_pillars', []):
+                    continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            ret.append(minion_id)
+        return sorted(ret)
+
+    def _prune_stats(self):
+        '''
+        Remove the statistics of the processes which are not running anymore,
+        or which have not written them for longer than the cache TTL, and
+        return the paths of the statistics left
+        '''
+        ret = []
+        try:
+            names = os.listdir(self.stats_dir)
+        except OSError:
+            return ret
+        now = time.time()
+        for fn_ in names:
+            if not fn_.endswith('.p'):
+                # A file being written
+                continue
+            path = os.path.join(self.stats_dir, fn_)
+            try:
+                pid = int(fn_[:-2])
+                if salt.utils.process.os_is_running(pid) \
+                        and now - os.path.getmtime(path) <= self.ttl:
+                    ret.append(path)
+                    continue
+                os.remove(path)
+            except (ValueError, OSError):
+                continue
+        return ret
+
+    def get_stats(self):
+        '''
+        Return the cache statistics summed over the running master
+        processes, along with the number of cached entries
+        '''
+        ret = dict((key, 0) for key in STAT_KEYS)
+        for path in self._prune_stats():
+            stats = self._read(path)
+            if not isinstance(stats, dict):
+                continue
+            for key in STAT_KEYS:
+                ret[key] += stats.get(key, 0)
+        lookups = ret['hits'] + ret['misses'] + ret['stale'] + ret['expired']
+        ret['hit_ratio'] = float(ret['hits']) / lookups if lookups else 0.0
+        if os.path.isdir(self.minions_dir):
+            ret['entries'] = len([fn_ for fn_ in os.listdir(self.minions_dir)
+                                  if fn_.endswith('.p')])
+        else:
+            ret['entries'] = 0
+        return ret
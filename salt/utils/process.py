@@ -202,6 +202,124 @@ class ThreadPool(object):
                 log.debug(err, exc_info=True)
 
 
+class ProcessPool(object):
+    '''
+    A pool of worker processes forked from this one, which call target with
+    the arguments passed to fire_async. The workers inherit the state of this
+    process when they are forked, so target does not need to be picklable.
+
+    Each worker exits after max_jobs calls (0 for no limit) and is replaced.
+    fire_async returns False when more than queue_size calls would wait for
+    a free worker, so that the caller can run it another way.
+
+    Only available where processes are forked, not on Windows.
+    '''
+    def __init__(self,
+                 target,
+                 num_workers,
+                 max_jobs=0,
+                 queue_size=0,
+                 name=None):
+        self.target = target
+        self.num_workers = num_workers
+        self.max_jobs = max_jobs
+        self.queue_size = queue_size
+        self.name = name or self.__class__.__name__
+        self._pid = os.getpid()
+        self._job_queue = multiprocessing.Queue()
+        # the number of idle workers and of calls no worker has picked up yet
+        self._lock = multiprocessing.Lock()
+        self._idle = multiprocessing.Value('i', 0, lock=False)
+        self._queued = multiprocessing.Value('i', 0, lock=False)
+        # workers started before the generation changed exit
+        self._generation = multiprocessing.Value('i', 0)
+        self._workers = []
+        self.check_workers()
+
+    def check_workers(self):
+        '''
+        Replace the workers which exited
+        '''
+        for worker in list(self._workers):
+            if not worker.is_alive():
+                worker.join(0)
+                self._workers.remove(worker)
+        while len(self._workers) < self.num_workers:
+            worker = multiprocessing.Process(
+                target=self._worker_target,
+                args=(self._generation.value,))
+            worker.daemon = True
+            worker.start()
+            self._workers.append(worker)
+
+    def recycle(self):
+        '''
+        Replace all of the workers, once they are done with the calls they
+        are running, for instance after the modules they inherited have been
+        reloaded
+        '''
+        with self._generation.get_lock():
+            self._generation.value += 1
+        self._workers = []
+        self.check_workers()
+
+    def fire_async(self, *args):
+        '''
+        Queue a call of target with args for the workers, returns False if
+        the queue is full
+        '''
+        self.check_workers()
+        with self._lock:
+            if self._queued.value >= self._idle.value + self.queue_size:
+                return False
+            self._queued.value += 1
+        self._job_queue.put(args)
+        return True
+
+    def _worker_target(self, generation):
+        salt.utils.appendproctitle('{0}Worker'.format(self.name))
+        jobs = 0
+        while not self.max_jobs or jobs < self.max_jobs:
+            with self._lock:
+                self._idle.value += 1
+            try:
+                # 1s timeout so that workers notice when they are replaced,
+                # or when the parent died
+                args = self._job_queue.get(timeout=1)
+            except queue.Empty:
+                args = None
+            with self._lock:
+                self._idle.value -= 1
+                if args is not None:
+                    self._queued.value -= 1
+            if self._generation.value != generation \
+                    or os.getppid() != self._pid:
+                if args is not None:
+                    # Leave the call to the current workers
+                    with self._lock:
+                        self._queued.value += 1
+                    self._job_queue.put(args)
+                break
+            if args is None:
+                continue
+            jobs += 1
+            try:
+                self.target(*args)
+            except Exception as err:
+                log.error('{0} worker failed: {1}'.format(self.name, err),
+                          exc_info=True)
+
+    def stop(self):
+        '''
+        Stop the workers
+        '''
+        for worker in self._workers:
+            worker.terminate()
+        for worker in self._workers:
+            worker.join(1)
+        self._workers = []
+
+
 class ProcessManager(object):
     '''
     A class which will manage processes that should be running
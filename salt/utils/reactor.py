@@ -2,24 +2,230 @@
 from __future__ import absolute_import
 
 # Import python libs
+import os
+import re
+import time
 import fnmatch
 import glob
 import logging
+import tempfile
+import threading
+import collections
 import multiprocessing
 
 import yaml
 
 # Import salt libs
+import salt.payload
 import salt.runner
 import salt.state
 import salt.utils
+import salt.utils.atomicfile
 import salt.utils.cache
 import salt.utils.event
 import salt.utils.process
+import salt.template
 from salt.ext.six import string_types, iterkeys
 from salt._compat import string_types
 log = logging.getLogger(__name__)
 
+# Characters which start a wildcard in an fnmatch pattern
+GLOB_CHARS = re.compile(r'[*?[]')
+
+# Seconds between writes of the reaction pool statistics
+STATS_INTERVAL = 10
+
+
+class TagMatcher(object):
+    '''
+    Match event tags against the fnmatch patterns of a reactor map.
+
+    The patterns are stored in a trie keyed by their literal prefix, the part
+    before the first wildcard. Looking up a tag walks the trie along the tag,
+    so only the patterns whose literal prefix the tag starts with are matched
+    with their compiled regular expression. Patterns without wildcards are
+    looked up directly.
+    '''
+    def __init__(self, patterns):
+        '''
+        patterns
+            A list of (pattern, value) tuples. A tag matches the values of all
+            of the patterns it matches, in the order they are given.
+        '''
+        self.exact = {}
+        self.trie = {}
+        for idx, (pattern, value) in enumerate(patterns):
+            pattern = os.path.normcase(pattern)
+            match = GLOB_CHARS.search(pattern)
+            if match is None:
+                self.exact.setdefault(pattern, []).append((idx, None, value))
+                continue
+            node = self.trie
+            for char in pattern[:match.start()]:
+                node = node.setdefault(char, {})
+            node.setdefault(None, []).append(
+                (idx, re.compile(fnmatch.translate(pattern)), value)
+            )
+
+    def match(self, tag):
+        '''
+        Return the values of all the patterns matching a tag
+        '''
+        tag = os.path.normcase(tag)
+        found = list(self.exact.get(tag, []))
+        node = self.trie
+        for char in tag:
+            found.extend(item for item in node.get(None, ())
+                         if item[1].match(tag))
+            node = node.get(char)
+            if node is None:
+                break
+        else:
+            found.extend(item for item in node.get(None, ())
+                         if item[1].match(tag))
+        return [value for idx, regex, value in sorted(found)]
+
+
+class ReactionPool(object):
+    '''
+    Run the reactions to events in a bounded pool of threads.
+
+    At most ``queue_size`` events wait to be run. When the queue is full,
+    ``submit`` blocks the event loop for up to ``timeout`` seconds, leaving
+    new events in the event socket, and then drops the event. At most
+    ``tag_concurrency`` reactions to events with the same tag run at once; the
+    other events with that tag wait without holding up events with other
+    tags.
+    '''
+    def __init__(self,
+                 func,
+                 num_threads,
+                 queue_size=0,
+                 tag_concurrency=0,
+                 timeout=5):
+        self.func = func
+        self.queue_size = queue_size
+        self.tag_concurrency = tag_concurrency
+        self.timeout = timeout
+        self.cond = threading.Condition()
+        # Events which can be run now
+        self.ready = collections.deque()
+        # Events held back by the concurrency limit of their tag
+        self.waiting = {}
+        # Number of events of each tag which are ready or running
+        self.active = {}
+        self.depth = 0
+        self.stats = {'queued': 0,
+                      'dropped': 0,
+                      'done': 0,
+                      'failed': 0,
+                      'max_depth': 0}
+        self.latency = {}
+
+        self._workers = []
+        for _ in range(num_threads):
+            thread = threading.Thread(target=self._thread_target)
+            thread.daemon = True
+            thread.start()
+            self._workers.append(thread)
+
+    def submit(self, tag, args=(), name=None):
+        '''
+        Queue a call of ``func(tag, *args)``. The latency of the call is
+        recorded under ``name``, which defaults to the tag. Returns False if
+        the event was dropped.
+        '''
+        deadline = time.time() + self.timeout
+        with self.cond:
+            while self.queue_size and self.depth >= self.queue_size:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    self.stats['dropped'] += 1
+                    log.warning(
+                        'Reactor queue is full, dropping event {0}'.format(tag)
+                    )
+                    return False
+                self.cond.wait(remaining)
+            self.depth += 1
+            self.stats['queued'] += 1
+            self.stats['max_depth'] = max(self.stats['max_depth'], self.depth)
+            item = (tag, args, name or tag, time.time())
+            if self.tag_concurrency \
+                    and self.active.get(tag, 0) >= self.tag_concurrency:
+                self.waiting.setdefault(tag, collections.deque()).append(item)
+            else:
+                self.active[tag] = self.active.get(tag, 0) + 1
+                self.ready.append(item)
+                self.cond.notify_all()
+        return True
+
+    def _done(self, tag, name, wait, elapsed, failed):
+        '''
+        Record a finished call and let the next event with its tag run
+        '''
+        with self.cond:
+            self.stats['failed' if failed else 'done'] += 1
+            latency = self.latency.setdefault(
+                name, {'count': 0, 'total': 0.0, 'max': 0.0, 'wait': 0.0})
+            latency['count'] += 1
+            latency['total'] += elapsed
+            latency['max'] = max(latency['max'], elapsed)
+            latency['wait'] += wait
+            waiting = self.waiting.get(tag)
+            if waiting:
+                self.ready.append(waiting.popleft())
+                if not waiting:
+                    del self.waiting[tag]
+                self.cond.notify_all()
+            else:
+                self.active[tag] -= 1
+                if not self.active[tag]:
+                    del self.active[tag]
+
+    def _thread_target(self):
+        while True:
+            with self.cond:
+                # 1s timeout so that if the parent dies this thread will die
+                # within 1s
+                while not self.ready:
+                    self.cond.wait(1)
+                tag, args, name, queued = self.ready.popleft()
+                self.depth -= 1
+                # Wake up the event loop if it is waiting for room
+                self.cond.notify_all()
+            start = time.time()
+            failed = False
+            try:
+                self.func(tag, *args)
+            except Exception:
+                failed = True
+                log.error('Reaction to {0} failed'.format(tag), exc_info=True)
+            self._done(tag, name, start - queued, time.time() - start, failed)
+
+    def get_stats(self):
+        '''
+        Return the queue depth, counts and the latency of each reaction
+        '''
+        with self.cond:
+            ret = dict(self.stats)
+            ret['depth'] = self.depth
+            ret['running'] = sum(self.active.values()) - len(self.ready)
+            ret['latency'] = {}
+            for name, latency in self.latency.items():
+                ret['latency'][name] = {
+                    'count': latency['count'],
+                    'avg': latency['total'] / latency['count'],
+                    'max': latency['max'],
+                    'avg_wait': latency['wait'] / latency['count']}
+        return ret
+
+
+def stats_path(opts):
+    '''
+    Return the path of the file the reactor writes its statistics to
+    '''
+    return os.path.join(opts['cachedir'], 'reactor', 'stats.p')
+
 
 class Reactor(multiprocessing.Process, salt.state.Compiler):
     '''
@@ -35,6 +241,16 @@ class Reactor(multiprocessing.Process, salt.state.Compiler):
         local_minion_opts = self.opts.copy()
         local_minion_opts['file_client'] = 'local'
         self.minion = salt.minion.MasterMinion(local_minion_opts)
+        # The reactor map is only parsed again when it changes
+        self.react_map_stamp = None
+        self.matcher = None
+        # Reaction files which do not depend on the event are only rendered
+        # once
+        self.render_cache = salt.template.get_render_cache(self.opts)
+        # Rendering is not thread safe, reactions only run in parallel once
+        # they are compiled
+        self.render_lock = threading.Lock()
+        self.pool = None
 
     def render_reaction(self, glob_ref, tag, data):
         '''
@@ -51,7 +267,8 @@ class Reactor(multiprocessing.Process, salt.state.Compiler):
                 res = self.render_template(
                     fn_,
                     tag=tag,
-                    data=data)
+                    data=data,
+                    render_cache=self.render_cache)
 
                 # for #20841, inject the sls name here since verify_high()
                 # assumes it exists in case there are any errors
@@ -63,43 +280,75 @@ class Reactor(multiprocessing.Process, salt.state.Compiler):
                 log.error('Failed to render "{0}": '.format(fn_), exc_info=True)
         return react
 
-    def list_reactors(self, tag):
+    def _read_react_map(self):
         '''
-        Take in the tag from an event and return a list of the reactors to
-        process
+        Read the reactor map from the file named by the reactor option.
+        Returns None if it cannot be read.
         '''
-        log.debug('Gathering reactors for tag {0}'.format(tag))
-        reactors = []
-        if isinstance(self.opts['reactor'], string_types):
-            try:
-                with salt.utils.fopen(self.opts['reactor']) as fp_:
-                    react_map = yaml.safe_load(fp_.read())
-            except (OSError, IOError):
-                log.error(
-                    'Failed to read reactor map: "{0}"'.format(
-                        self.opts['reactor']
-                        )
+        try:
+            with salt.utils.fopen(self.opts['reactor']) as fp_:
+                return yaml.safe_load(fp_.read())
+        except (OSError, IOError):
+            log.error(
+                'Failed to read reactor map: "{0}"'.format(
+                    self.opts['reactor']
                     )
-            except Exception:
-                log.error(
-                    'Failed to parse YAML in reactor map: "{0}"'.format(
-                        self.opts['reactor']
-                        )
+                )
+        except Exception:
+            log.error(
+                'Failed to parse YAML in reactor map: "{0}"'.format(
+                    self.opts['reactor']
                     )
+                )
+        return None
+
+    def get_matcher(self):
+        '''
+        Return the TagMatcher for the reactor map, parsing the map again if
+        the file it is read from has changed
+        '''
+        if isinstance(self.opts['reactor'], string_types):
+            try:
+                stat = os.stat(self.opts['reactor'])
+                stamp = (stat.st_mtime, stat.st_size, stat.st_ino)
+            except OSError:
+                stamp = None
+            if self.matcher is not None and stamp == self.react_map_stamp:
+                return self.matcher
+            react_map = self._read_react_map()
+            if react_map is None:
+                # Keep using the last map which could be read, and try again
+                # on the next event
+                return self.matcher or TagMatcher([])
+            self.react_map_stamp = stamp
+        elif self.matcher is not None:
+            return self.matcher
         else:
             react_map = self.opts['reactor']
-        for ropt in react_map:
+        patterns = []
+        for ropt in react_map or []:
             if not isinstance(ropt, dict):
                 continue
             if len(ropt) != 1:
                 continue
             key = next(iterkeys(ropt))
             val = ropt[key]
-            if fnmatch.fnmatch(tag, key):
-                if isinstance(val, string_types):
-                    reactors.append(val)
-                elif isinstance(val, list):
-                    reactors.extend(val)
+            if isinstance(val, string_types):
+                patterns.append((key, [val]))
+            elif isinstance(val, list):
+                patterns.append((key, val))
+        self.matcher = TagMatcher(patterns)
+        return self.matcher
+
+    def list_reactors(self, tag):
+        '''
+        Take in the tag from an event and return a list of the reactors to
+        process
+        '''
+        log.debug('Gathering reactors for tag {0}'.format(tag))
+        reactors = []
+        for val in self.get_matcher().match(tag):
+            reactors.extend(val)
         return reactors
 
     def reactions(self, tag, data, reactors):
@@ -131,6 +380,41 @@ class Reactor(multiprocessing.Process, salt.state.Compiler):
         for chunk in chunks:
             self.wrap.run(chunk)
 
+    def react(self, tag, data, reactors):
+        '''
+        Compile and execute the reactions to an event
+        '''
+        with self.render_lock:
+            chunks = self.reactions(tag, data, reactors)
+        if chunks:
+            try:
+                self.call_reactions(chunks)
+            except SystemExit:
+                log.warning('Exit ignored by reactor')
+
+    def write_stats(self):
+        '''
+        Write the reaction pool statistics for the reactor.stats runner
+        '''
+        path = stats_path(self.opts)
+        serial = salt.payload.Serial(self.opts)
+        try:
+            dirname = os.path.dirname(path)
+            if not os.path.isdir(dirname):
+                os.makedirs(dirname)
+            tmpfh, tmpfname = tempfile.mkstemp(dir=dirname)
+            os.close(tmpfh)
+            with salt.utils.fopen(tmpfname, 'w+b') as fp_:
+                fp_.write(serial.dumps(self.pool.get_stats()))
+            salt.utils.atomicfile.atomic_rename(tmpfname, path)
+        except (IOError, OSError) as exc:
+            log.debug('Unable to write reactor stats: {0}'.format(exc))
+
+    def _stats_loop(self):
+        while True:
+            time.sleep(STATS_INTERVAL)
+            self.write_stats()
+
     def run(self):
         '''
         Enter into the server loop
@@ -144,7 +428,20 @@ class Reactor(multiprocessing.Process, salt.state.Compiler):
                 self.opts['transport'],
                 opts=self.opts,
                 listen=True)
-        self.wrap = ReactWrap(self.opts)
+        # The pool threads run the runner and wheel reactions themselves, so
+        # that the pool limits and measures them
+        self.wrap = ReactWrap(self.opts,
+                              inline=bool(self.opts['reactor_event_threads']))
+        if self.opts['reactor_event_threads']:
+            self.pool = ReactionPool(
+                self.react,
+                self.opts['reactor_event_threads'],
+                queue_size=self.opts['reactor_event_hwm'],
+                tag_concurrency=self.opts['reactor_tag_concurrency'],
+                timeout=self.opts['reactor_queue_timeout'])
+            thread = threading.Thread(target=self._stats_loop)
+            thread.daemon = True
+            thread.start()
 
         for data in self.event.iter_events(full=True):
             # skip all events fired by ourselves
@@ -153,12 +450,12 @@ class Reactor(multiprocessing.Process, salt.state.Compiler):
             reactors = self.list_reactors(data['tag'])
             if not reactors:
                 continue
-            chunks = self.reactions(data['tag'], data['data'], reactors)
-            if chunks:
-                try:
-                    self.call_reactions(chunks)
-                except SystemExit:
-                    log.warning('Exit ignored by reactor')
+            if self.pool is None:
+                self.react(data['tag'], data['data'], reactors)
+            else:
+                self.pool.submit(data['tag'],
+                                 (data['data'], reactors),
+                                 name=','.join(reactors))
 
 
 class ReactWrap(object):
@@ -167,17 +464,53 @@ class ReactWrap(object):
     '''
     # class-wide cache of clients
     client_cache = None
+    # Reactions run in several threads of a ReactionPool
+    client_lock = threading.Lock()
     event_user = 'Reactor'
 
-    def __init__(self, opts):
+    def __init__(self, opts, inline=False):
+        '''
+        inline
+            Run the runner and wheel functions in the calling thread, for
+            when the reactions already run in a ReactionPool thread, instead
+            of handing them off to a pool of their own
+        '''
         self.opts = opts
         if ReactWrap.client_cache is None:
             ReactWrap.client_cache = salt.utils.cache.CacheDict(opts['reactor_refresh_interval'])
 
-        self.pool = salt.utils.process.ThreadPool(
-            self.opts['reactor_worker_threads'],  # number of workers for runner/wheel
-            queue_size=self.opts['reactor_worker_hwm']  # queue size for those workers
-        )
+        self.pool = None
+        if not inline:
+            self.pool = salt.utils.process.ThreadPool(
+                self.opts['reactor_worker_threads'],  # number of workers for runner/wheel
+                queue_size=self.opts['reactor_worker_hwm']  # queue size for those workers
+            )
+
+    def _call(self, func, fun, kwargs):
+        '''
+        Call a runner or wheel function, in the pool of this wrapper if it
+        has one
+        '''
+        if self.pool is None:
+            func(fun, kwargs)
+        else:
+            self.pool.fire_async(func, args=(fun, kwargs))
+
+    def _client(self, name, factory):
+        '''
+        Return the cached client called ``name``, creating it with
+        ``factory`` if it is not cached. The LocalClient is cached per
+        thread, its event socket can not be used by several threads.
+        '''
+        key = name
+        if name == 'local':
+            key = (name, threading.current_thread().ident)
+        with self.client_lock:
+            try:
+                return self.client_cache[key]
+            except KeyError:
+                client = self.client_cache[key] = factory()
+                return client
 
     def run(self, low):
         '''
@@ -206,10 +539,11 @@ class ReactWrap(object):
         '''
         Wrap LocalClient for running :ref:`execution modules <all-salt.modules>`
         '''
-        if 'local' not in self.client_cache:
-            self.client_cache['local'] = salt.client.LocalClient(self.opts['conf_file'])
+        client = self._client(
+            'local',
+            lambda: salt.client.LocalClient(self.opts['conf_file']))
         try:
-            self.client_cache['local'].cmd_async(*args, **kwargs)
+            client.cmd_async(*args, **kwargs)
         except SystemExit:
             log.warning('Attempt to exit reactor. Ignored.')
         except Exception as exc:
@@ -221,10 +555,11 @@ class ReactWrap(object):
         '''
         Wrap RunnerClient for executing :ref:`runner modules <all-salt.runners>`
         '''
-        if 'runner' not in self.client_cache:
-            self.client_cache['runner'] = salt.runner.RunnerClient(self.opts)
+        client = self._client(
+            'runner',
+            lambda: salt.runner.RunnerClient(self.opts))
         try:
-            self.pool.fire_async(self.client_cache['runner'].low, args=(fun, kwargs))
+            self._call(client.low, fun, kwargs)
         except SystemExit:
             log.warning('Attempt to exit in reactor by runner. Ignored')
         except Exception as exc:
@@ -234,10 +569,11 @@ class ReactWrap(object):
         '''
         Wrap Wheel to enable executing :ref:`wheel modules <all-salt.wheel>`
         '''
-        if 'wheel' not in self.client_cache:
-            self.client_cache['wheel'] = salt.wheel.Wheel(self.opts)
+        client = self._client(
+            'wheel',
+            lambda: salt.wheel.Wheel(self.opts))
         try:
-            self.pool.fire_async(self.client_cache['wheel'].low, args=(fun, kwargs))
+            self._call(client.low, fun, kwargs)
         except SystemExit:
             log.warning('Attempt to in reactor by whell. Ignored.')
         except Exception as exc:
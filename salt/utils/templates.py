@@ -256,7 +256,11 @@ def render_jinja_tmpl(tmplstr, context, tmplpath=None):
             loader = jinja2.FileSystemLoader(
                 context, os.path.dirname(tmplpath))
     else:
-        loader = JinjaSaltCacheLoader(opts, saltenv, pillar_rend=context.get('_pillar_rend', False))
+        loader = JinjaSaltCacheLoader(
+            opts,
+            saltenv,
+            pillar_rend=context.get('_pillar_rend', False),
+            rendered_files=context.get('_rendered_files'))
 
     env_args = {'extensions': [], 'loader': loader}
 
@@ -103,5 +103,15 @@ class WheelClient(mixins.SyncClientMixin, mixins.AsyncClientMixin, object):
         fun = low.pop('fun')
         return self.async(fun, low)
 
+    def pub_async(self, low, io_loop=None):
+        '''
+        Execute a wheel function through the master, without blocking the
+        IOLoop; eauth is respected
+
+        Return a future of the tag and the data of the job, its return
+        included, see :py:meth:`cmd_sync`.
+        '''
+        return self.master_call_async(io_loop=io_loop, **low)
+
 
 Wheel = WheelClient  # for backward-compat
@@ -12,12 +12,13 @@ import shutil
 # Import Salt Testing libs
 from salttesting import skipIf
 from salttesting.helpers import ensure_in_syspath
-from salttesting.mock import patch, NO_MOCK, NO_MOCK_REASON
+from salttesting.mock import MagicMock, patch, NO_MOCK, NO_MOCK_REASON
 
 ensure_in_syspath('../..')
 
 # Import salt libs
 import integration
+import salt.utils
 from salt.fileserver import gitfs
 
 gitfs.__opts__ = {'gitfs_remotes': [''],
@@ -126,5 +127,76 @@ class GitFSTest(integration.ModuleCase):
             ret = gitfs.envs()
             self.assertIn('base', ret)
 
+    def test_tree_index(self):
+        with patch.dict(gitfs.__opts__, {'cachedir': self.master_opts['cachedir'],
+                                         'gitfs_remotes': ['file://' + self.tmp_repo_dir],
+                                         'sock_dir': self.master_opts['sock_dir']}):
+            with salt.utils.fopen(os.path.join(self.tmp_repo_dir, 'newfile'), 'w') as fp_:
+                fp_.write('new')
+            repo = git.Repo(self.tmp_repo_dir)
+            repo.index.add(['newfile'])
+            repo.index.commit('Add newfile')
+            gitfs.update()
+            # Skip the file list cache, to get the lists from the tree index
+            ret = gitfs._get_lists(LOAD)
+            self.assertIn('newfile', ret['files'])
+            self.assertIn('testfile', ret['files'])
+            self.assertIn('grail', ret['dirs'])
+
+    def test_serve_objects(self):
+        with patch.dict(gitfs.__opts__, {'cachedir': self.master_opts['cachedir'],
+                                         'gitfs_remotes': ['file://' + self.tmp_repo_dir],
+                                         'sock_dir': self.master_opts['sock_dir'],
+                                         'gitfs_serve_objects': True,
+                                         'hash_type': 'md5',
+                                         'file_buffer_size': 262144}):
+            gitfs.update()
+            self.assertFalse(os.path.isdir(
+                os.path.join(self.master_opts['cachedir'], 'gitfs/refs')))
+            self.assertIn('testfile', gitfs.file_list(LOAD))
+            self.assertIn('grail', gitfs.dir_list(LOAD))
+
+            fnd = gitfs.find_file('testfile', 'base')
+            self.assertIn('blob', fnd)
+            path = os.path.join(self.tmp_repo_dir, 'testfile')
+            with salt.utils.fopen(path, 'rb') as fp_:
+                data = fp_.read()
+            load = {'path': 'testfile', 'saltenv': 'base', 'loc': 0}
+            self.assertEqual(gitfs.serve_file(load, fnd)['data'], data)
+            # Hash the blob from the object database
+            gitfs._BLOB_DATA.clear()
+            self.assertEqual(gitfs.file_hash(load, fnd),
+                             {'hsum': salt.utils.get_hash(path, 'md5'),
+                              'hash_type': 'md5'})
+            self.assertEqual(gitfs.find_file('testfile', 'nonexistent'),
+                             {'path': '', 'rel': ''})
+
+    def test_blob_cache(self):
+        with patch.dict(gitfs.__opts__, {'cachedir': self.master_opts['cachedir'],
+                                         'gitfs_remotes': ['file://' + self.tmp_repo_dir],
+                                         'sock_dir': self.master_opts['sock_dir'],
+                                         'gitfs_serve_objects': True,
+                                         'hash_type': 'md5',
+                                         'file_buffer_size': 262144}):
+            gitfs.update()
+            paths = ['testfile', 'core.sls']
+            fnds = [gitfs.find_file(path, 'base') for path in paths]
+            gitfs._BLOB_DATA.clear()
+            read_blob = MagicMock(side_effect=gitfs._read_blob)
+            with patch.object(gitfs, '_read_blob', read_blob):
+                # The chunks of two files asked for in turn
+                for _ in range(2):
+                    for path, fnd in zip(paths, fnds):
+                        load = {'path': path, 'saltenv': 'base', 'loc': 0}
+                        gitfs.serve_file(load, fnd)
+                self.assertEqual(read_blob.call_count, 2)
+                # Only the blob read last is kept when they do not fit
+                gitfs._BLOB_DATA.clear()
+                with patch.object(gitfs, 'BLOB_CACHE_SIZE', 1):
+                    for path, fnd in zip(paths, fnds):
+                        load = {'path': path, 'saltenv': 'base', 'loc': 0}
+                        gitfs.serve_file(load, fnd)
+                self.assertEqual(list(gitfs._BLOB_DATA), [fnds[1]['blob']])
+
 if __name__ == '__main__':
     integration.run_tests(GitFSTest)
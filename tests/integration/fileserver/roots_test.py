@@ -10,7 +10,7 @@ import os
 # Import Salt Testing libs
 from salttesting import skipIf
 from salttesting.helpers import ensure_in_syspath
-from salttesting.mock import patch, NO_MOCK, NO_MOCK_REASON
+from salttesting.mock import MagicMock, patch, NO_MOCK, NO_MOCK_REASON
 ensure_in_syspath('../..')
 
 # Import salt libs
@@ -39,6 +39,26 @@ class RootsTest(integration.ModuleCase):
             ret = roots.file_list({'saltenv': 'base'})
             self.assertIn('testfile', ret)
 
+    def test_file_list_watch(self):
+        with patch.dict(roots.__opts__, {'cachedir': self.master_opts['cachedir'],
+                                         'file_roots': self.master_opts['file_roots'],
+                                         'file_roots_watch': True,
+                                         'fileserver_ignoresymlinks': False,
+                                         'fileserver_followsymlinks': False,
+                                         'fileserver_events': False,
+                                         'file_ignore_regex': False,
+                                         'file_ignore_glob': False,
+                                         'hash_type': self.master_opts['hash_type']}):
+            roots.update()
+            with patch('os.walk') as walk:
+                ret = roots.file_list({'saltenv': 'base'})
+                self.assertFalse(walk.called)
+            self.assertIn('testfile', ret)
+            self.assertEqual(ret, sorted(ret))
+            ret = roots.file_list({'saltenv': 'base', 'prefix': 'test'})
+            self.assertIn('testfile', ret)
+            self.assertTrue(all(x.startswith('test') for x in ret))
+
     def test_find_file(self):
         with patch.dict(roots.__opts__, {'file_roots': self.master_opts['file_roots'],
                                          'fileserver_ignoresymlinks': False,
@@ -81,7 +101,29 @@ class RootsTest(integration.ModuleCase):
                          'OLD MAN:  Seek you the Bridge of Death.\n  ARTHUR:  '
                          'The Bridge of Death, which leads to the Grail?\n  '
                          'OLD MAN:  Hee hee ha ha!\n\n',
-                 'dest': 'testfile'})
+                 'dest': 'testfile',
+                 'size': 262144})
+
+    def test_serve_file_chunk_size(self):
+        with patch.dict(roots.__opts__, {'file_roots': self.master_opts['file_roots'],
+                                        'file_buffer_size': 4,
+                                        'file_buffer_size_max': 16}):
+            load = {'saltenv': 'base',
+                    'path': os.path.join(integration.FILES, 'file', 'base', 'testfile'),
+                    'loc': 0,
+                    'size': 8
+                    }
+            fnd = {'path': os.path.join(integration.FILES, 'file', 'base', 'testfile'),
+                   'rel': 'testfile'}
+            ret = roots.serve_file(load, fnd)
+            self.assertEqual(ret['data'], 'Scene 24')
+            self.assertEqual(ret['size'], 8)
+
+            # Minions can not ask for chunks over file_buffer_size_max
+            load['size'] = 1048576
+            ret = roots.serve_file(load, fnd)
+            self.assertEqual(ret['data'], 'Scene 24\n\n \n  OL')
+            self.assertEqual(ret['size'], 16)
 
     @skipIf(True, "Update test not yet implemented")
     def test_update(self):
@@ -106,6 +148,54 @@ class RootsTest(integration.ModuleCase):
             ret = roots.file_hash(load, fnd)
             self.assertDictEqual(ret, {'hsum': '98aa509006628302ce38ce521a7f805f', 'hash_type': 'md5'})
 
+    def test_file_hash_index(self):
+        with patch.dict(roots.__opts__, {'file_roots': self.master_opts['file_roots'],
+                                 'fileserver_ignoresymlinks': False,
+                                 'fileserver_followsymlinks': False,
+                                 'fileserver_events': False,
+                                 'file_ignore_regex': False,
+                                 'file_ignore_glob': False,
+                                 'hash_type': self.master_opts['hash_type'],
+                                 'cachedir': self.master_opts['cachedir']}):
+            roots.update()
+            # Drop the in-memory index so that it is read back from disk
+            roots._HASH_INDEX.update({'stamp': None, 'data': {}})
+            load = {
+                    'saltenv': 'base',
+                    'path': os.path.join(integration.FILES, 'file', 'base', 'testfile'),
+                    }
+            fnd = {
+                'path': os.path.join(integration.FILES, 'file', 'base', 'testfile'),
+                'rel': 'testfile'
+            }
+            with patch('salt.utils.get_hash') as get_hash:
+                ret = roots.file_hash(load, fnd)
+                self.assertFalse(get_hash.called)
+            self.assertDictEqual(ret, {'hsum': '98aa509006628302ce38ce521a7f805f', 'hash_type': 'md5'})
+
+    def test_file_hash_index_watch(self):
+        with patch.dict(roots.__opts__, {'cachedir': self.master_opts['cachedir'],
+                                         'file_roots': self.master_opts['file_roots'],
+                                         'file_roots_watch': True,
+                                         'fileserver_ignoresymlinks': False,
+                                         'fileserver_followsymlinks': False,
+                                         'fileserver_events': False,
+                                         'file_ignore_regex': False,
+                                         'file_ignore_glob': False,
+                                         'hash_type': self.master_opts['hash_type']}):
+            roots.update()
+            path = os.path.join(integration.FILES, 'file', 'base', 'testfile')
+            stat_key = MagicMock(side_effect=roots._stat_key)
+            # inotify saw no change
+            with patch.object(roots, '_watch_dirty', MagicMock(return_value=set())), \
+                    patch.object(roots, '_stat_key', stat_key), \
+                    patch('os.walk') as walk:
+                roots.update()
+                self.assertFalse(walk.called)
+            self.assertNotIn(path, [call[0][0] for call in stat_key.call_args_list])
+            index = roots._hash_index()
+            self.assertEqual(index['base']['testfile'][0], path)
+
     def test_file_list_emptydirs(self):
         if integration.TMP_STATE_TREE not in self.master_opts['file_roots']['base']:
             self.skipTest('This test fails when using tests/runtests.py. salt-runtests will be available soon.')
@@ -199,6 +199,25 @@ class CPModuleTest(integration.ModuleCase):
         for path in ret:
             self.assertTrue(os.path.exists(path))
 
+    def test_cache_dir(self):
+        '''
+        cp.cache_dir
+        '''
+        ret = self.run_function(
+                'cp.cache_dir',
+                ['salt://grail'])
+        self.assertEqual(
+                sorted(os.path.basename(path) for path in ret),
+                ['scene', 'scene33'])
+        for path in ret:
+            with salt.utils.fopen(path, 'r') as cp_:
+                self.assertIn('ARTHUR', cp_.read())
+
+        # Files already cached are not fetched again
+        self.assertEqual(
+                sorted(self.run_function('cp.cache_dir', ['salt://grail'])),
+                sorted(ret))
+
     def test_cache_local_file(self):
         '''
         cp.cache_local_file
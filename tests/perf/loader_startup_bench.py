@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+'''
+Measure how long ``salt-call --local test.ping`` takes to start and return,
+without the loader index, with a cold index which has to be built, and with a
+warm index written by a previous run.
+
+Each run is a new process with a minion configuration of its own in a
+temporary directory, so no running master or minion is needed:
+
+.. code-block:: bash
+
+    python tests/perf/loader_startup_bench.py -n 10
+'''
+
+# Import python libs
+from __future__ import absolute_import, print_function
+import getpass
+import optparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+SALT_CALL = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'scripts',
+    'salt-call')
+
+
+def write_config(root_dir, loader_index):
+    '''
+    Write the minion configuration of a run and return its directory
+    '''
+    conf_dir = os.path.join(root_dir, 'conf')
+    if not os.path.isdir(conf_dir):
+        os.makedirs(conf_dir)
+    with open(os.path.join(conf_dir, 'minion'), 'w') as fp_:
+        fp_.write('root_dir: {0}\n'
+                  'user: {1}\n'
+                  'id: loader-bench\n'
+                  'file_client: local\n'
+                  'loader_index: {2}\n'.format(root_dir,
+                                               getpass.getuser(),
+                                               loader_index))
+    return conf_dir
+
+
+def run(salt_call, conf_dir):
+    '''
+    Run test.ping and return how long it took
+    '''
+    start = time.time()
+    proc = subprocess.Popen(
+        [sys.executable, salt_call, '--local', '--config-dir', conf_dir,
+         '--out', 'quiet', '--log-level', 'quiet', 'test.ping'],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT)
+    out = proc.communicate()[0]
+    elapsed = time.time() - start
+    if proc.returncode:
+        raise SystemExit('salt-call failed:\n{0}'.format(out))
+    return elapsed
+
+
+def bench(salt_call, count, loader_index, cold):
+    '''
+    Return the times of ``count`` runs. With ``cold``, the index written by
+    the previous run is removed before each run.
+    '''
+    root_dir = tempfile.mkdtemp()
+    try:
+        conf_dir = write_config(root_dir, loader_index)
+        # A first run creates the cachedir and the pki_dir, which every run
+        # would otherwise pay for
+        run(salt_call, conf_dir)
+        index_dir = os.path.join(root_dir, 'var', 'cache', 'salt', 'minion',
+                                 'loader')
+        times = []
+        for _ in range(count):
+            if cold:
+                shutil.rmtree(index_dir, ignore_errors=True)
+            times.append(run(salt_call, conf_dir))
+        return times
+    finally:
+        shutil.rmtree(root_dir)
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('-n', '--runs', type='int', default=10,
+                      help='Number of runs of each case')
+    parser.add_option('--salt-call', default=SALT_CALL,
+                      help='Path to the salt-call script')
+    options, _ = parser.parse_args()
+
+    for name, loader_index, cold in (('no index:', False, False),
+                                     ('cold index:', True, True),
+                                     ('warm index:', True, False)):
+        times = sorted(bench(options.salt_call,
+                             options.runs,
+                             loader_index,
+                             cold))
+        print('{0:<14} min {1:>6.3f}s  median {2:>6.3f}s'.format(
+            name, times[0], times[len(times) // 2]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+'''
+Measure how long the master takes to compile the pillar of many minions, with
+and without the render cache (see the render_cache_size master option).
+
+A pillar tree is generated in a temporary directory, with a top file assigning
+a mix of plain YAML and Jinja SLS files to every minion, so no running master
+is needed:
+
+.. code-block:: bash
+
+    python tests/perf/pillar_render_bench.py -m 1000
+    python tests/perf/pillar_render_bench.py -m 1000 -s 50 --templated 10
+'''
+
+# Import python libs
+from __future__ import absolute_import, print_function
+import optparse
+import os
+import shutil
+import tempfile
+import time
+
+# Import salt libs
+import salt.config
+import salt.loader
+import salt.pillar
+import salt.template
+import salt.utils
+
+
+def make_tree(root, static, templated):
+    '''
+    Write a pillar tree with ``static`` plain YAML and ``templated`` Jinja
+    SLS files, all of which are assigned to every minion
+    '''
+    os.makedirs(root)
+    names = []
+    for idx in range(static):
+        name = 'static{0}'.format(idx)
+        with salt.utils.fopen(os.path.join(root, name + '.sls'), 'w') as fp_:
+            fp_.write('{0}:\n'.format(name))
+            for key in range(50):
+                fp_.write('  key{0}: value{0}\n'.format(key))
+        names.append(name)
+    for idx in range(templated):
+        name = 'templated{0}'.format(idx)
+        with salt.utils.fopen(os.path.join(root, name + '.sls'), 'w') as fp_:
+            fp_.write('{0}:\n'.format(name))
+            fp_.write('  minion: {{ grains["id"] }}\n')
+        names.append(name)
+    with salt.utils.fopen(os.path.join(root, 'top.sls'), 'w') as fp_:
+        fp_.write("base:\n  '*':\n")
+        for name in names:
+            fp_.write('    - {0}\n'.format(name))
+
+
+def bench(opts, functions, minions):
+    '''
+    Compile the pillar of ``minions`` minions and return the elapsed time
+    '''
+    start = time.time()
+    for idx in range(minions):
+        minion_id = 'minion{0}'.format(idx)
+        pillar = salt.pillar.Pillar(opts,
+                                    {'id': minion_id},
+                                    minion_id,
+                                    'base',
+                                    functions=functions)
+        pillar.compile_pillar()
+    return time.time() - start
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('-m', '--minions', type='int', default=1000,
+                      help='Number of minions to compile the pillar of')
+    parser.add_option('-s', '--static', type='int', default=20,
+                      help='Number of plain YAML SLS files')
+    parser.add_option('--templated', type='int', default=5,
+                      help='Number of SLS files using Jinja')
+    options, _ = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        root = os.path.join(tmpdir, 'pillar')
+        make_tree(root, options.static, options.templated)
+        opts = salt.config.master_config(None)
+        opts.update({'cachedir': os.path.join(tmpdir, 'cache'),
+                     'pillar_roots': {'base': [root]},
+                     'ext_pillar': []})
+        functions = salt.loader.minion_mods(opts)
+        for size in (0, opts['render_cache_size'] or 1000):
+            opts['render_cache_size'] = size
+            elapsed = bench(opts, functions, options.minions)
+            print('{0:<16} {1:>8.2f}s {2:>10.1f} minions/sec'.format(
+                'render cache:' if size else 'no render cache:',
+                elapsed,
+                options.minions / elapsed))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
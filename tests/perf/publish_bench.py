@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+'''
+Measure how many publishes per second a single master worker can push to the
+publisher, with a publish channel reused across jobs versus a new channel set
+up for every job.
+
+The publisher daemon is replaced by a PULL socket drained in a thread, so no
+running master is needed:
+
+.. code-block:: bash
+
+    python tests/perf/publish_bench.py -n 20000
+    python tests/perf/publish_bench.py -n 2000 --sign -c /etc/salt/master
+'''
+
+# Import python libs
+from __future__ import absolute_import, print_function
+import ctypes
+import multiprocessing
+import optparse
+import shutil
+import tempfile
+import threading
+import time
+
+# Import salt libs
+import salt.config
+import salt.crypt
+import salt.master
+import salt.transport.server
+
+# Import 3rd-party libs
+import zmq
+
+
+def drain(context, uri, count, done):
+    '''
+    Receive ``count`` messages from the publish pull socket
+    '''
+    sock = context.socket(zmq.PULL)
+    sock.bind(uri)
+    for _ in range(count):
+        sock.recv()
+    sock.close()
+    done.set()
+
+
+def bench(opts, count, reuse):
+    '''
+    Publish ``count`` loads and return the number of publishes per second
+    '''
+    context = zmq.Context()
+    done = threading.Event()
+    chan = salt.transport.server.PubServerChannel.factory(opts)
+    thread = threading.Thread(
+        target=drain, args=(context, chan.pull_uri, count, done)
+    )
+    thread.start()
+    # Give the pull socket time to bind
+    time.sleep(0.5)
+    load = {'fun': 'test.ping',
+            'arg': [],
+            'tgt': 'web*',
+            'tgt_type': 'glob',
+            'ret': '',
+            'jid': '20150101000000000000',
+            'user': 'root'}
+    start = time.time()
+    for _ in range(count):
+        if not reuse:
+            chan = salt.transport.server.PubServerChannel.factory(opts)
+        chan.publish(load)
+    done.wait()
+    elapsed = time.time() - start
+    chan.close()
+    thread.join()
+    context.term()
+    return count / elapsed
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('-c', '--config', default=None,
+                      help='Master config to read pki_dir from (for --sign)')
+    parser.add_option('-n', '--count', type='int', default=5000,
+                      help='Number of publishes per run')
+    parser.add_option('--sign', action='store_true', default=False,
+                      help='Sign publishes, as with sign_pub_messages')
+    options, _ = parser.parse_args()
+
+    if options.config:
+        opts = salt.config.master_config(options.config)
+    else:
+        opts = salt.config.master_config(None)
+    tmpdir = tempfile.mkdtemp()
+    opts.update({'transport': 'zeromq',
+                 'ipc_mode': 'ipc',
+                 'sock_dir': tmpdir,
+                 'sign_pub_messages': options.sign})
+    salt.master.SMaster.secrets['aes'] = {
+        'secret': multiprocessing.Array(
+            ctypes.c_char,
+            salt.crypt.Crypticle.generate_key_string()
+        ),
+        'reload': salt.crypt.Crypticle.generate_key_string,
+    }
+    try:
+        for reuse in (False, True):
+            rate = bench(opts, options.count, reuse)
+            print('{0:<22} {1:>10.1f} publishes/sec'.format(
+                'reused channel:' if reuse else 'channel per publish:',
+                rate))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
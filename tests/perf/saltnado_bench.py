@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+'''
+Measure the rest_tornado API under load.
+
+Without ``--url``, measure how long the EventListener takes to find the
+futures an event is for, with thousands of requests waiting on the returns of
+their jobs. The events are fed to the listener directly, so no running master
+is needed:
+
+.. code-block:: bash
+
+    python tests/perf/saltnado_bench.py -w 5000 -n 20000
+
+With ``--url``, send concurrent requests to a running salt-api and report the
+requests per second and the latency of the requests:
+
+.. code-block:: bash
+
+    python tests/perf/saltnado_bench.py --url http://localhost:8000 \\
+        --username saltdev --password saltdev --eauth pam \\
+        -c 200 -n 5000 --fun test.ping --tgt '*'
+'''
+
+# Import python libs
+from __future__ import absolute_import, print_function
+import json
+import optparse
+import time
+
+# Import salt libs
+from salt.netapi.rest_tornado import saltnado
+
+# Import 3rd-party libs
+import tornado.gen
+import tornado.httpclient
+import tornado.ioloop
+from tornado.concurrent import Future
+
+
+class FakeEvent(object):
+    '''
+    Stand in for the event bus of the EventListener, the "raw" events are
+    already unpacked
+    '''
+    serial = None
+
+    @staticmethod
+    def unpack(raw, serial):
+        return raw
+
+
+def bench_dispatch(waiting, count):
+    '''
+    Dispatch ``count`` job return events to an EventListener with ``waiting``
+    futures, and return the number of events dispatched per second
+    '''
+    listener = saltnado.EventListener.__new__(saltnado.EventListener)
+    listener.event = FakeEvent()
+    listener.tag_map = saltnado.PrefixTrie()
+    listener.request_map = {}
+    listener.timeout_map = {}
+    jids = ['2015010100000{0:07d}'.format(idx) for idx in range(waiting)]
+    for jid in jids:
+        listener.tag_map.add('salt/job/{0}/ret'.format(jid), Future())
+    start = time.time()
+    for idx in range(count):
+        jid = jids[idx % waiting]
+        tag = 'salt/job/{0}/ret/minion{1}'.format(jid, idx)
+        listener._handle_event_socket_recv([(tag, {'id': 'minion'})])
+        # Wait on the next return of the job, as all_returns() does
+        listener.tag_map.add('salt/job/{0}/ret'.format(jid), Future())
+    return count / (time.time() - start)
+
+
+@tornado.gen.coroutine
+def login(client, options):
+    '''
+    Return a token for the requests
+    '''
+    body = json.dumps({'username': options.username,
+                       'password': options.password,
+                       'eauth': options.eauth})
+    response = yield client.fetch(
+        '{0}/login'.format(options.url),
+        method='POST',
+        body=body,
+        headers={'Content-Type': 'application/json',
+                 'Accept': 'application/json'})
+    raise tornado.gen.Return(json.loads(response.body)['return'][0]['token'])
+
+
+@tornado.gen.coroutine
+def bench_api(options):
+    '''
+    Send the requests, ``concurrency`` of them at a time, and return the
+    elapsed time, the latency of every request and the number of errors
+    '''
+    client = tornado.httpclient.AsyncHTTPClient(
+        max_clients=options.concurrency)
+    token = yield login(client, options)
+    body = json.dumps([{'client': options.client,
+                        'tgt': options.tgt,
+                        'fun': options.fun}])
+    headers = {'Content-Type': 'application/json',
+               'Accept': 'application/json',
+               'X-Auth-Token': token}
+    latencies = []
+    errors = [0]
+    remaining = [options.count]
+
+    @tornado.gen.coroutine
+    def worker():
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            start = time.time()
+            try:
+                yield client.fetch(options.url,
+                                   method='POST',
+                                   body=body,
+                                   headers=headers,
+                                   request_timeout=options.timeout)
+            except tornado.httpclient.HTTPError:
+                errors[0] += 1
+            latencies.append(time.time() - start)
+
+    start = time.time()
+    yield [worker() for _ in range(options.concurrency)]
+    raise tornado.gen.Return((time.time() - start, latencies, errors[0]))
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('-n', '--count', type='int', default=20000,
+                      help='Number of events, or of requests with --url')
+    parser.add_option('-w', '--waiting', type='int', default=5000,
+                      help='Number of requests waiting on job returns')
+    parser.add_option('--url', default=None,
+                      help='URL of a running salt-api to send requests to')
+    parser.add_option('-c', '--concurrency', type='int', default=100,
+                      help='Number of concurrent requests')
+    parser.add_option('--username', default='saltdev')
+    parser.add_option('--password', default='saltdev')
+    parser.add_option('--eauth', default='auto')
+    parser.add_option('--client', default='local')
+    parser.add_option('--tgt', default='*')
+    parser.add_option('--fun', default='test.ping')
+    parser.add_option('--timeout', type='float', default=300,
+                      help='Timeout of a request, in seconds')
+    options, _ = parser.parse_args()
+
+    if not options.url:
+        rate = bench_dispatch(options.waiting, options.count)
+        print('{0} waiting: {1:>10.1f} events/sec'.format(options.waiting,
+                                                          rate))
+        return
+
+    elapsed, latencies, errors = tornado.ioloop.IOLoop.current().run_sync(
+        lambda: bench_api(options))
+    latencies.sort()
+    print('{0} requests, {1} concurrent, {2} errors'.format(
+        len(latencies), options.concurrency, errors))
+    print('{0:<12} {1:>10.1f}'.format('requests/s:', len(latencies) / elapsed))
+    for pct in (50, 90, 99):
+        idx = min(len(latencies) - 1, len(latencies) * pct // 100)
+        print('{0:<12} {1:>10.3f}s'.format('p{0}:'.format(pct),
+                                           latencies[idx]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+'''
+Measure how long it takes to resolve the requisites of a large highstate:
+extending the high data with the requisite_in statements, compiling it to
+low chunks, and checking the requisites of every chunk.
+
+The high data is generated, with a mix of require, watch_in by name, sls and
+glob requisites, and nothing is run, so no running master is needed:
+
+.. code-block:: bash
+
+    python tests/perf/state_requisite_bench.py -n 10000
+'''
+
+# Import python libs
+from __future__ import absolute_import, print_function
+import optparse
+import os
+import shutil
+import tempfile
+import time
+
+# Import salt libs
+import salt.config
+import salt.state
+
+
+def make_high(num):
+    '''
+    Return high data with ``num`` file states, a service watching every
+    tenth of them and a command requiring them by sls and by glob
+    '''
+    high = {}
+    for idx in range(num):
+        run = ['managed', {'name': '/srv/bench/{0}'.format(idx)}]
+        if idx % 10:
+            run.append({'require': [{'file': 'file{0}'.format(idx - 1)}]})
+        else:
+            # watch_in by name, the service ids are not their names
+            run.append({'watch_in': [{'service': 'svc{0}'.format(idx)}]})
+            high['service-{0}'.format(idx)] = {
+                'service': ['running', {'name': 'svc{0}'.format(idx)}],
+                '__sls__': 'bench.services',
+                '__env__': 'base'}
+        high['file{0}'.format(idx)] = {
+            'file': run,
+            '__sls__': 'bench.files{0}'.format(idx % 100),
+            '__env__': 'base'}
+    high['report'] = {
+        'cmd': ['run',
+                {'name': 'true'},
+                {'require': [{'sls': 'bench.files1*'},
+                             {'file': '/srv/bench/99*'}]}],
+        '__sls__': 'bench.report',
+        '__env__': 'base'}
+    return high
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('-n', '--states', type='int', default=10000,
+                      help='Number of file states')
+    options, _ = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        opts = salt.config.minion_config(None)
+        opts.update({'cachedir': os.path.join(tmpdir, 'cache'),
+                     'file_client': 'local',
+                     'file_roots': {'base': [tmpdir]},
+                     'pillar_roots': {'base': [tmpdir]},
+                     'state_incremental': False})
+        state = salt.state.State(opts)
+        high = make_high(options.states)
+
+        start = time.time()
+        high, errors = state.requisite_in(high)
+        if errors:
+            raise SystemExit('\n'.join(errors))
+        requisite_in = time.time() - start
+
+        start = time.time()
+        chunks = state.compile_high_data(high)
+        compile_high = time.time() - start
+
+        running = {}
+        for chunk in chunks:
+            running[salt.state._gen_tag(chunk)] = {'result': True,
+                                                  'changes': {},
+                                                  'comment': '',
+                                                  '__run_num__': 0}
+        start = time.time()
+        for chunk in chunks:
+            status, _ = state.check_requisite(chunk, running, chunks)
+            if status != 'met':
+                raise SystemExit('Unexpected requisite status {0} for '
+                                 '{1}'.format(status, chunk['__id__']))
+        check_requisite = time.time() - start
+
+        print('{0} chunks'.format(len(chunks)))
+        for name, elapsed in (('requisite_in:', requisite_in),
+                              ('compile_high_data:', compile_high),
+                              ('check_requisite:', check_requisite)):
+            print('{0:<20} {1:>8.2f}s'.format(name, elapsed))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -63,6 +63,43 @@ class BatchTestCase(TestCase):
         ret = Batch.get_bnum(self.batch)
         self.assertEqual(ret, None)
 
+    # run tests
+
+    def test_run_refills_on_return(self):
+        '''
+        The next minion is sent the job as soon as a running minion returns
+        '''
+        self.batch.opts = {'batch': '1', 'timeout': 5, 'fun': 'test.ping',
+                           'arg': [], 'gather_job_timeout': 5}
+        self.batch.minions = ['foo', 'bar']
+        self.batch.local.run_job.side_effect = [{'jid': '1'}, {'jid': '2'}]
+        self.batch.local.event.get_event.side_effect = [
+            {'tag': 'salt/job/1/ret/foo',
+             'data': {'id': 'foo', 'return': True}},
+            {'tag': 'salt/job/2/ret/bar',
+             'data': {'id': 'bar', 'return': True, 'retcode': 0}},
+        ]
+        self.batch.local.event.get_event_noblock.return_value = None
+        self.assertEqual(list(self.batch.run()),
+                         [{'foo': True}, {'bar': True}])
+        self.assertEqual(
+            [call[0][0] for call in self.batch.local.run_job.call_args_list],
+            [['foo'], ['bar']])
+
+    def test_run_timeout(self):
+        '''
+        Minions which do not return and are not running the job time out
+        '''
+        self.batch.opts = {'batch': '1', 'timeout': 0, 'fun': 'test.ping',
+                           'arg': [], 'gather_job_timeout': 0}
+        self.batch.minions = ['foo']
+        self.batch.local.run_job.return_value = {'jid': '1'}
+        self.batch.local.gather_job_info.return_value = {'jid': '2'}
+        self.batch.local.event.get_event.return_value = None
+        self.assertEqual(list(self.batch.run()), [{'foo': {}}])
+        self.batch.local.gather_job_info.assert_called_once_with(
+            '1', ['foo'], 'list')
+
 
 if __name__ == '__main__':
     from integration import run_tests
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+'''
+    tests.unit.fileclient_test
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~
+'''
+# Import python libs
+from __future__ import absolute_import
+import hashlib
+import os
+import shutil
+import tempfile
+
+# Import Salt Testing libs
+from salttesting import TestCase, skipIf
+from salttesting.helpers import ensure_in_syspath
+from salttesting.mock import NO_MOCK, NO_MOCK_REASON, MagicMock
+ensure_in_syspath('../')
+
+# Import Salt libs
+import salt.utils
+from salt.exceptions import MinionError
+from salt.fileclient import RemoteClient
+from salt.utils.async import SyncWrapper
+
+# Import 3rd-party libs
+import tornado.concurrent
+import tornado.ioloop
+
+DATA = b''.join(chr(idx % 256) for idx in range(1000))
+SIZE = 64
+
+
+class FakeAsyncChannel(object):
+    '''
+    Serve the chunks of a file. The replies to the requests in flight on the
+    channels sharing ``inflight`` come back the last one first.
+    '''
+    def __init__(self, io_loop, inflight=None, data=DATA, replies=None):
+        self.io_loop = io_loop
+        self.inflight = [] if inflight is None else inflight
+        self.data = data
+        self.replies = replies
+        self.loads = []
+
+    def reply(self, load):
+        return {'data': self.data[load['loc']:load['loc'] + SIZE],
+                'dest': 'file'}
+
+    def send(self, load):
+        self.loads.append(load)
+        future = tornado.concurrent.Future()
+        self.inflight.append((future, load))
+        self.io_loop.add_callback(self._flush)
+        return future
+
+    def _flush(self):
+        while self.inflight:
+            future, load = self.inflight.pop()
+            if self.replies:
+                future.set_result(self.replies.pop(0))
+            else:
+                future.set_result(self.reply(load))
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class FetchChunksTestCase(TestCase):
+    '''
+    Test the pipelined transfers of the chunks of a file
+    '''
+    def setUp(self):
+        self.io_loop = tornado.ioloop.IOLoop()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.dest = os.path.join(self.tmp_dir, 'file')
+        client = RemoteClient.__new__(RemoteClient)
+        client.opts = {'file_pipeline': 3}
+        client.channel = MagicMock(spec=SyncWrapper)
+        client.channel.io_loop = self.io_loop
+        self.locs = []
+
+        def send(load):
+            # get_file sends the same load with another loc each time
+            self.locs.append(load['loc'])
+            return dict(FakeAsyncChannel(self.io_loop).reply(load), size=SIZE)
+        # The requests are proxied by SyncWrapper, which has no send method
+        client.channel.send = MagicMock(side_effect=send)
+        client.hash_file = MagicMock(
+            return_value={'hsum': hashlib.md5(DATA).hexdigest(),
+                          'hash_type': 'md5'})
+        self.client = client
+
+    def tearDown(self):
+        self.io_loop.close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _fetch(self, channels, loc=SIZE):
+        with salt.utils.fopen(self.dest, 'wb+') as fn_:
+            fn_.write(DATA[:loc])
+            self.io_loop.run_sync(lambda: self.client._fetch_chunks(
+                {'path': 'file', 'saltenv': 'base', 'cmd': '_serve_file'},
+                fn_,
+                SIZE,
+                channels))
+        with salt.utils.fopen(self.dest, 'rb') as fn_:
+            return fn_.read()
+
+    def test_out_of_order(self):
+        '''
+        The chunks are written in order, whichever order they come back in,
+        up to the short final chunk
+        '''
+        inflight = []
+        channels = [FakeAsyncChannel(self.io_loop, inflight)
+                    for _ in range(3)]
+        self.assertEqual(self._fetch(channels), DATA)
+        locs = sorted(load['loc'] for channel in channels
+                      for load in channel.loads)
+        self.assertEqual(locs[:15], list(range(SIZE, len(DATA), SIZE)))
+        # The requests past the final chunk were in flight along with it
+        self.assertTrue(all(loc < len(DATA) + 3 * SIZE for loc in locs))
+        self.assertEqual(channels[1].loads[0]['loc'], SIZE)
+
+    def test_bad_reply(self):
+        channels = [FakeAsyncChannel(self.io_loop,
+                                     replies=['Bad load from minion'])]
+        self.assertRaises(MinionError, self._fetch, channels)
+
+    def test_bad_hash(self):
+        '''
+        A pipelined transfer which does not match the hash of the master is
+        fetched again one chunk at a time
+        '''
+        inflight = []
+        channels = [FakeAsyncChannel(self.io_loop, inflight, data=DATA[::-1])
+                    for _ in range(3)]
+        self.client._pipeline = channels
+        ret = self.client.get_file('salt://file', self.dest)
+        self.assertEqual(ret, self.dest)
+        with salt.utils.fopen(self.dest, 'rb') as fn_:
+            self.assertEqual(fn_.read(), DATA)
+        self.assertTrue(all(channel.loads for channel in channels))
+        self.assertEqual(self.locs,
+                         [0] + list(range(0, len(DATA), SIZE)) + [len(DATA)])
+
+
+if __name__ == '__main__':
+    from integration import run_tests
+    run_tests(FetchChunksTestCase, needs_daemon=False)
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+'''
+    tests.unit.loader_test
+    ~~~~~~~~~~~~~~~~~~~~~~
+'''
+
+# Import python libs
+from __future__ import absolute_import
+import os
+import time
+import shutil
+import threading
+
+# Import Salt Testing libs
+from salttesting import TestCase
+from salttesting.helpers import ensure_in_syspath
+ensure_in_syspath('../')
+
+# Import salt libs
+import integration
+import salt.loader
+
+
+class CallGrainsTestCase(TestCase):
+    '''
+    Test calling the grain functions
+    '''
+    def setUp(self):
+        self.release = threading.Event()
+
+        def slow():
+            self.release.wait(5)
+            return {'slow': True}
+
+        def fails():
+            raise Exception('grain failed')
+
+        self.funcs = {'core.fast': lambda: {'fast': True},
+                      'core.slow': slow,
+                      'custom.fails': fails}
+
+    def tearDown(self):
+        self.release.set()
+
+    def test_call_grains(self):
+        self.release.set()
+        for threads in (0, 4):
+            ret, timing = salt.loader._call_grains(
+                {'grains_threads': threads, 'grains_timeout': 5},
+                self.funcs,
+                sorted(self.funcs))
+            self.assertEqual(ret, {'core.fast': {'fast': True},
+                                   'core.slow': {'slow': True},
+                                   'custom.fails': None})
+            self.assertEqual(sorted(timing), sorted(self.funcs))
+
+    def test_call_grains_timeout(self):
+        start = time.time()
+        ret, timing = salt.loader._call_grains(
+            {'grains_threads': 1, 'grains_timeout': 1},
+            self.funcs,
+            ['core.slow', 'core.fast'])
+        self.assertEqual(ret, {'core.fast': {'fast': True}})
+        self.assertIn('core.slow', timing)
+        self.assertLess(time.time() - start, 4)
+
+
+class LoaderIndexTestCase(TestCase):
+    '''
+    Test the loader index
+    '''
+    def setUp(self):
+        self.cachedir = os.path.join(integration.SYS_TMP_DIR, 'loader-index')
+        os.makedirs(self.cachedir)
+        self.opts = {'cachedir': self.cachedir}
+        self.grains = {'os': 'Debian'}
+        self.fpath = os.path.join(self.cachedir, 'aptpkg.py')
+        with open(self.fpath, 'w') as fp_:
+            fp_.write('')
+
+    def tearDown(self):
+        shutil.rmtree(self.cachedir, ignore_errors=True)
+
+    def test_index(self):
+        index = salt.loader.LoaderIndex(self.opts, 'module', self.grains)
+        self.assertEqual(index.get(self.fpath), (False, None))
+        index.set(self.fpath, 'pkg')
+        index.write()
+        index = salt.loader.LoaderIndex(self.opts, 'module', self.grains)
+        self.assertEqual(index.get(self.fpath), (True, 'pkg'))
+
+        # The index is dropped when the grains change
+        self.grains['os'] = 'Fedora'
+        index = salt.loader.LoaderIndex(self.opts, 'module', self.grains)
+        self.assertEqual(index.get(self.fpath), (False, None))
+
+    def test_index_file_changed(self):
+        index = salt.loader.LoaderIndex(self.opts, 'module', self.grains)
+        index.set(self.fpath, 'pkg')
+        with open(self.fpath, 'w') as fp_:
+            fp_.write('# changed')
+        index.refresh()
+        self.assertEqual(index.get(self.fpath), (False, None))
+
+
+if __name__ == '__main__':
+    from integration import run_tests
+    run_tests(CallGrainsTestCase, LoaderIndexTestCase, needs_daemon=False)
@@ -48,6 +48,40 @@ class TestUtils(TestCase):
         self.assertEqual(11, saltnado.get_batch_size('110%', 10))
 
 
+@skipIf(HAS_TORNADO is False, 'The tornado package needs to be installed')
+class TestPrefixTrie(TestCase):
+    def test_pop(self):
+        '''
+        Test that an event tag gets the futures waiting on its prefixes
+        '''
+        trie = saltnado.PrefixTrie()
+        trie.add('salt/job/1/ret', 'ret1')
+        trie.add('salt/job/1/ret', 'ret2')
+        trie.add('salt/job/12', 'job12')
+        trie.add('', 'all')
+        self.assertEqual(len(trie), 4)
+
+        self.assertEqual(sorted(trie.pop('salt/job/1/ret/minion')),
+                         ['all', 'ret1', 'ret2'])
+        self.assertEqual(trie.pop('salt/job/1/ret/minion'), [])
+        self.assertEqual(trie.pop('salt/job/123/ret/minion'), ['job12'])
+        self.assertEqual(len(trie), 0)
+        self.assertEqual(trie.root, {})
+
+    def test_remove(self):
+        '''
+        Test that removing the futures drops the nodes of their prefixes
+        '''
+        trie = saltnado.PrefixTrie()
+        trie.add('salt/job/1/ret', 'ret1')
+        trie.add('salt/job/2/ret', 'ret2')
+        trie.remove('salt/job/1/ret', 'ret1')
+        trie.remove('salt/job/3/ret', 'ret3')
+        self.assertEqual(trie.pop('salt/job/1/ret/minion'), [])
+        trie.remove('salt/job/2/ret', 'ret2')
+        self.assertEqual(trie.root, {})
+
+
 @skipIf(HAS_TORNADO is False, 'The tornado package needs to be installed')
 class TestSaltnadoUtils(AsyncTestCase):
     def test_any_future(self):
@@ -133,4 +167,4 @@ class TestEventListener(AsyncTestCase):
 
 if __name__ == '__main__':
     from integration import run_tests  # pylint: disable=import-error
-    run_tests(TestUtils, needs_daemon=False)
+    run_tests(TestUtils, TestPrefixTrie, needs_daemon=False)
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+'''
+    tests.unit.returners.local_segment_cache_test
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+'''
+
+# Import Python libs
+from __future__ import absolute_import
+import os
+import shutil
+import tempfile
+import multiprocessing
+
+# Import Salt Testing libs
+from salttesting import TestCase
+from salttesting.helpers import ensure_in_syspath
+
+ensure_in_syspath('../../')
+
+# Import salt libs
+import integration
+from salt.returners import local_segment_cache
+
+local_segment_cache.__opts__ = {}
+
+
+class LocalSegmentCacheTestCase(TestCase):
+    '''
+    Test the segmented job cache
+    '''
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(dir=integration.SYS_TMP_DIR)
+        local_segment_cache.__opts__.update({'cachedir': self.tmpdir,
+                                             'keep_jobs': 24,
+                                             'serial': 'msgpack'})
+
+    def tearDown(self):
+        if local_segment_cache._SEGMENT['fd'] is not None:
+            os.close(local_segment_cache._SEGMENT['fd'])
+        local_segment_cache._SEGMENT.update({'pid': None, 'fd': None})
+        local_segment_cache._INDEX['files'].clear()
+        local_segment_cache._INDEX['jobs'].clear()
+        shutil.rmtree(self.tmpdir)
+
+    def test_job(self):
+        '''
+        Loads and returns are stored and looked up by jid
+        '''
+        jid = local_segment_cache.prep_jid()
+        local_segment_cache.save_load(jid, {'fun': 'test.ping', 'jid': jid})
+        local_segment_cache.returner({'jid': jid, 'id': 'web1',
+                                      'return': True})
+        local_segment_cache.returner({'jid': jid, 'id': 'web2',
+                                      'return': 'foo', 'out': 'txt'})
+        self.assertFalse(local_segment_cache.returner(
+            {'jid': jid, 'id': 'web2', 'return': 'bar'}))
+
+        # Read the segments from scratch, as another process would
+        local_segment_cache._INDEX['files'].clear()
+        local_segment_cache._INDEX['jobs'].clear()
+        self.assertEqual(local_segment_cache.get_load(jid),
+                         {'fun': 'test.ping', 'jid': jid})
+        self.assertEqual(local_segment_cache.get_jid(jid),
+                         {'web1': {'return': True},
+                          'web2': {'return': 'foo', 'out': 'txt'}})
+        self.assertEqual(list(local_segment_cache.get_jids()), [jid])
+        self.assertEqual(local_segment_cache.get_jid('12345'), {})
+        self.assertEqual(local_segment_cache.get_load('12345'), {})
+
+    def test_concurrent_returns(self):
+        '''
+        A return sent to several master processes at once is stored once
+        '''
+        jid = local_segment_cache.prep_jid()
+        start = multiprocessing.Event()
+
+        def _return():
+            start.wait(5)
+            local_segment_cache.returner({'jid': jid, 'id': 'web1',
+                                          'return': True})
+
+        procs = [multiprocessing.Process(target=_return) for _ in range(4)]
+        for proc in procs:
+            proc.start()
+        start.set()
+        for proc in procs:
+            proc.join()
+        local_segment_cache._INDEX['files'].clear()
+        local_segment_cache._INDEX['jobs'].clear()
+        jobs = local_segment_cache._refresh()
+        self.assertEqual(list(jobs[jid]['returns']), ['web1'])
+        records = 0
+        segment_dir = os.path.join(self.tmpdir, 'job_segments')
+        for name in os.listdir(segment_dir):
+            if name.endswith(local_segment_cache.SEGMENT_SUFFIX):
+                with open(os.path.join(segment_dir, name), 'rb') as fp_:
+                    records += fp_.read().count(b'web1')
+        self.assertEqual(records, 1)
+
+    def test_nocache(self):
+        '''
+        Returns to nocache jobs are not stored
+        '''
+        jid = local_segment_cache.prep_jid(nocache=True)
+        local_segment_cache.returner({'jid': jid, 'id': 'web1',
+                                      'return': True})
+        self.assertEqual(local_segment_cache.get_jid(jid), {})
+
+    def test_clean_old_jobs(self):
+        '''
+        Whole segments are expired
+        '''
+        jid = local_segment_cache.prep_jid()
+        local_segment_cache.save_load(jid, {'fun': 'test.ping', 'jid': jid})
+        self.assertIn(jid, local_segment_cache.get_jids())
+        local_segment_cache.clean_old_jobs()
+        self.assertIn(jid, local_segment_cache.get_jids())
+
+        segment_dir = os.path.join(self.tmpdir, 'job_segments')
+        for name in os.listdir(segment_dir):
+            path = os.path.join(segment_dir, name)
+            mtime = os.path.getmtime(path) - 25 * 3600
+            os.utime(path, (mtime, mtime))
+        local_segment_cache.clean_old_jobs()
+        self.assertEqual(local_segment_cache.get_jids(), {})
+
+
+if __name__ == '__main__':
+    from integration import run_tests
+    run_tests(LocalSegmentCacheTestCase, needs_daemon=False)
@@ -0,0 +1,355 @@
+# -*- coding: utf-8 -*-
+'''
+    tests.unit.state_test
+    ~~~~~~~~~~~~~~~~~~~~~
+'''
+
+# Import python libs
+from __future__ import absolute_import
+import os
+import shutil
+
+# Import Salt Testing libs
+from salttesting import TestCase, skipIf
+from salttesting.helpers import ensure_in_syspath
+from salttesting.mock import NO_MOCK, NO_MOCK_REASON, MagicMock
+ensure_in_syspath('../')
+
+# Import salt libs
+import integration
+import salt.utils
+import salt.state
+import salt.payload
+
+
+class ChunkSourcesTestCase(TestCase):
+    '''
+    Test finding the files from the master a chunk uses
+    '''
+    def test_chunk_sources(self):
+        low = {'state': 'file',
+               'fun': 'managed',
+               'name': '/etc/motd',
+               'source': ['salt://motd/web', 'salt://motd/default'],
+               'defaults': {'banner': 'salt://not/a/file/but/matches'},
+               'template': 'jinja'}
+        self.assertEqual(salt.state._chunk_sources(low),
+                         set(['salt://motd/web',
+                              'salt://motd/default',
+                              'salt://not/a/file/but/matches']))
+        self.assertEqual(salt.state._chunk_sources({'name': 'vim'}), set())
+
+
+class RequisiteIndexTestCase(TestCase):
+    '''
+    Test the indexes used to resolve requisites
+    '''
+    def test_chunk_index(self):
+        chunks = [{'state': 'pkg', 'name': 'nginx', '__id__': 'nginx',
+                   '__sls__': 'web'},
+                  {'state': 'file', 'name': '/etc/nginx/nginx.conf',
+                   '__id__': 'nginx-conf', '__sls__': 'web.conf'},
+                  {'state': 'service', 'name': 'nginx', '__id__': 'nginx',
+                   '__sls__': 'web'}]
+        index = salt.state.ChunkIndex(chunks)
+        self.assertEqual(index.find('pkg', 'nginx'), [chunks[0]])
+        self.assertEqual(index.find('file', 'nginx-conf'), [chunks[1]])
+        self.assertEqual(index.find('file', '/etc/nginx/*'), [chunks[1]])
+        self.assertEqual(index.find('sls', 'web'), [chunks[0], chunks[2]])
+        self.assertEqual(index.find('sls', 'web*'), chunks)
+        self.assertEqual(index.find('pkg', 'apache'), [])
+        self.assertEqual(index.find('pkg', None), [])
+
+    def test_high_index(self):
+        high = {'nginx': {'pkg': ['installed'],
+                          '__sls__': 'web',
+                          '__env__': 'base'},
+                'nginx-conf': {'file': ['managed',
+                                        {'name': '/etc/nginx/nginx.conf'}],
+                               '__sls__': 'web',
+                               '__env__': 'base'}}
+        index = salt.state.HighIndex(high)
+        for name, state in (('nginx', 'pkg'),
+                            ('/etc/nginx/nginx.conf', 'file'),
+                            ('/etc/nginx/nginx.conf', 'pkg'),
+                            ('missing', 'file')):
+            self.assertEqual(salt.state.find_name(name, state, high, index),
+                             salt.state.find_name(name, state, high))
+
+        # Arguments added to the high data are found once they are indexed
+        high['nginx']['pkg'].append({'name': 'nginx-full'})
+        index.add('nginx', 'pkg', high['nginx']['pkg'])
+        self.assertEqual(index.find_name('nginx-full', 'pkg'), 'nginx')
+
+
+class StateFingerprintsTestCase(TestCase):
+    '''
+    Test the fingerprints of incremental state runs
+    '''
+    def setUp(self):
+        self.cachedir = os.path.join(integration.SYS_TMP_DIR,
+                                     'state-fingerprints')
+        os.makedirs(self.cachedir)
+        self.opts = {'cachedir': self.cachedir}
+
+    def tearDown(self):
+        shutil.rmtree(self.cachedir, ignore_errors=True)
+
+    def test_fingerprints(self):
+        fingerprints = salt.state.StateFingerprints(self.opts)
+        self.assertIsNone(fingerprints.get('clean'))
+        fingerprints.set('clean', 'abc')
+        fingerprints.set('other', 'def')
+        fingerprints.write({'clean': {}, 'changed': {}})
+
+        fingerprints = salt.state.StateFingerprints(self.opts)
+        self.assertEqual(fingerprints.get('clean'), 'abc')
+        # Only the chunks which ran are updated
+        self.assertIsNone(fingerprints.get('other'))
+
+        # A chunk which is not clean any more loses its fingerprint
+        fingerprints.write({'clean': {}})
+        fingerprints = salt.state.StateFingerprints(self.opts)
+        self.assertIsNone(fingerprints.get('clean'))
+
+
+class ParallelSchedulerTestCase(TestCase):
+    '''
+    Test when the chunks of a parallel state run are started
+    '''
+    def setUp(self):
+        state = salt.state.State.__new__(salt.state.State)
+        state.opts = {'state_parallel': 4,
+                      'state_auto_order': True,
+                      'failhard': False}
+        state.functions = {}
+        state.active = set()
+        state._chunk_index = None
+        state._start_parallel = self._start_parallel
+        state._wait_parallel = self._wait_parallel
+        state.call_chunk = self._call_chunk
+        state._parallel_chunk = lambda low: low.get('parallel', True)
+        self.state = state
+        self.log = []
+        self.started = []
+        self.failing = set()
+
+    def _chunk(self, id_, order=10000, **kwargs):
+        low = {'state': 'file', 'fun': 'managed', 'name': id_,
+               '__id__': id_, '__sls__': 'test', '__env__': 'base',
+               'order': order}
+        low.update(kwargs)
+        return low
+
+    def _ret(self, low):
+        return {'name': low['name'],
+                'changes': {},
+                'result': low['__id__'] not in self.failing,
+                'comment': ''}
+
+    def _start_parallel(self, low, chunks, running):
+        self.log.append(('start', low['__id__']))
+        self.started.append(salt.state._gen_tag(low))
+        return low, None, None
+
+    def _wait_parallel(self, pending, running, chunks, count=0):
+        # The chunks return in the order they were started
+        tag = [tag for tag in self.started if tag in pending][0]
+        low = pending.pop(tag)[0]
+        self.log.append(('done', low['__id__']))
+        running[tag] = self._ret(low)
+        return [low]
+
+    def _call_chunk(self, low, running, chunks):
+        self.log.append(('call', low['__id__']))
+        running[salt.state._gen_tag(low)] = self._ret(low)
+        return running
+
+    def test_requisites(self):
+        chunks = [self._chunk('a'),
+                  self._chunk('b', require=[{'file': 'a'}]),
+                  self._chunk('c')]
+        ret = self.state.call_chunks_parallel(chunks)
+        self.assertEqual(len(ret), 3)
+        self.assertEqual(self.log, [('start', 'a'), ('start', 'c'),
+                                    ('done', 'a'), ('start', 'b'),
+                                    ('done', 'c'), ('done', 'b')])
+
+    def test_limit(self):
+        self.state.opts['state_parallel'] = 2
+        chunks = [self._chunk('a'), self._chunk('b'), self._chunk('c')]
+        self.state.call_chunks_parallel(chunks)
+        self.assertEqual(self.log, [('start', 'a'), ('start', 'b'),
+                                    ('done', 'a'), ('start', 'c'),
+                                    ('done', 'b'), ('done', 'c')])
+
+    def test_order(self):
+        self.state.opts['state_auto_order'] = False
+        chunks = [self._chunk('a', order=1),
+                  self._chunk('c', order=1),
+                  self._chunk('b', order=2)]
+        self.state.call_chunks_parallel(chunks)
+        self.assertEqual(self.log, [('start', 'a'), ('start', 'c'),
+                                    ('done', 'a'), ('done', 'c'),
+                                    ('start', 'b'), ('done', 'b')])
+
+    def test_order_last(self):
+        chunks = [self._chunk('a', __auto_order__=True),
+                  self._chunk('b', order=10001, __auto_order__=True),
+                  self._chunk('z', order=1010101),
+                  self._chunk('c', order=10003, __auto_order__=True)]
+        self.state.call_chunks_parallel(chunks)
+        self.assertEqual(self.log, [('start', 'a'), ('start', 'b'),
+                                    ('start', 'c'), ('done', 'a'),
+                                    ('done', 'b'), ('done', 'c'),
+                                    ('start', 'z'), ('done', 'z')])
+
+    def test_alone(self):
+        chunks = [self._chunk('a'),
+                  self._chunk('b', parallel=False),
+                  self._chunk('c')]
+        self.state.call_chunks_parallel(chunks)
+        self.assertEqual(self.log, [('start', 'a'), ('done', 'a'),
+                                    ('call', 'b'), ('start', 'c'),
+                                    ('done', 'c')])
+
+    def test_failhard(self):
+        self.state.opts['state_parallel'] = 1
+        self.failing.add('a')
+        chunks = [self._chunk('a', failhard=True), self._chunk('b')]
+        ret = self.state.call_chunks_parallel(chunks)
+        self.assertEqual(list(ret), [salt.state._gen_tag(chunks[0])])
+        self.assertEqual(self.log, [('start', 'a'), ('done', 'a')])
+
+    def test_recursive(self):
+        chunks = [self._chunk('a', require=[{'file': 'b'}]),
+                  self._chunk('b', require=[{'file': 'a'}])]
+        self.state.call_chunks_parallel(chunks)
+        # Left to call_chunk, which reports the recursion
+        self.assertEqual(self.log, [('call', 'a'), ('start', 'b'),
+                                    ('done', 'b')])
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class IncrementalCallTestCase(TestCase):
+    '''
+    Test which chunks are skipped in incremental state runs
+    '''
+    def setUp(self):
+        self.cachedir = os.path.join(integration.SYS_TMP_DIR,
+                                     'state-incremental')
+        os.makedirs(self.cachedir)
+        state = salt.state.State.__new__(salt.state.State)
+        state.opts = {}
+        state.functions = {}
+        state._template_inputs = None
+        state._State__run_num = 0
+        state.fingerprints = salt.state.StateFingerprints(
+            {'cachedir': self.cachedir})
+        state.call = MagicMock(return_value={'name': 'app',
+                                             'changes': {},
+                                             'result': True,
+                                             'comment': ''})
+        self.state = state
+        self.pkg = {'state': 'pkg', 'fun': 'installed', 'name': 'app',
+                    '__id__': 'app', '__sls__': 'app', '__env__': 'base'}
+        self.low = {'state': 'service', 'fun': 'running', 'name': 'app',
+                    '__id__': 'app', '__sls__': 'app', '__env__': 'base',
+                    'require': [{'pkg': 'app'}]}
+        state.fingerprints.chunks[salt.state._gen_tag(self.low)] = \
+            state._chunk_fingerprint(self.low)
+
+    def tearDown(self):
+        shutil.rmtree(self.cachedir, ignore_errors=True)
+
+    def test_unchanged(self):
+        running = {salt.state._gen_tag(self.pkg): {'changes': {},
+                                                   'result': True}}
+        ret = self.state.call_incremental(self.low, [], running,
+                                          {'require': [self.pkg]})
+        self.assertTrue(ret['result'])
+        self.assertFalse(self.state.call.called)
+
+    def test_changed_requisite(self):
+        running = {salt.state._gen_tag(self.pkg): {'changes': {'new': '2.0'},
+                                                   'result': True}}
+        self.state.call_incremental(self.low, [], running,
+                                    {'require': [self.pkg]})
+        self.assertEqual(self.state.call.call_count, 1)
+
+    def test_onchanges(self):
+        low = dict(self.low, onchanges=[{'pkg': 'app'}])
+        self.assertIsNone(self.state._chunk_fingerprint(low))
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class CompiledHighStateTestCase(TestCase):
+    '''
+    Test the cache of the compiled highstate
+    '''
+    def setUp(self):
+        self.cachedir = os.path.join(integration.SYS_TMP_DIR,
+                                     'state-compiled')
+        os.makedirs(self.cachedir)
+        self.ccfn = os.path.join(self.cachedir, 'highstate.compiled.p')
+        self.sls = os.path.join(self.cachedir, 'web.sls')
+        with salt.utils.fopen(self.sls, 'w') as fp_:
+            fp_.write('nginx:\n  pkg.installed\n')
+        self.hsum = {'hsum': salt.utils.get_hash(self.sls, 'md5'),
+                     'hash_type': 'md5'}
+
+        highstate = salt.state.BaseHighState.__new__(salt.state.BaseHighState)
+        highstate.opts = {'id': 'minion',
+                          'environment': None,
+                          'hash_type': 'md5',
+                          'grains': {'os': 'Debian'}}
+        highstate.serial = salt.payload.Serial(highstate.opts)
+        highstate.avail = {'base': ['web']}
+        highstate.client = MagicMock()
+        highstate.client.ext_nodes.return_value = {}
+        highstate.client.hash_file.side_effect = lambda url, saltenv: \
+            dict(self.hsum) if url == 'salt://web.sls' else {}
+        highstate.state = MagicMock()
+        highstate.state.opts = {'pillar': {'role': 'web'}}
+        highstate.rendered_files = [('base', 'salt://web.sls', self.sls),
+                                    ('base', 'salt://web/init.sls', '')]
+        self.highstate = highstate
+        self.chunks = [{'state': 'pkg', 'fun': 'installed', 'name': 'nginx',
+                        '__id__': 'nginx', '__sls__': 'web',
+                        '__env__': 'base', 'order': 10000}]
+
+    def tearDown(self):
+        shutil.rmtree(self.cachedir, ignore_errors=True)
+
+    def test_compiled_highstate(self):
+        self.highstate._write_compiled(
+            self.ccfn, None, None, {'base': ['web']}, self.chunks)
+        compiled = self.highstate._load_compiled(self.ccfn, None, None)
+        self.assertEqual(compiled['chunks'], self.chunks)
+        self.assertEqual(compiled['matches'], {'base': ['web']})
+
+        # Other exclusions, pillar or rendered files invalidate it
+        self.assertIsNone(
+            self.highstate._load_compiled(self.ccfn, 'nginx', None))
+        self.highstate.state.opts['pillar']['role'] = 'db'
+        self.assertIsNone(self.highstate._load_compiled(self.ccfn, None, None))
+        self.highstate.state.opts['pillar']['role'] = 'web'
+        self.hsum['hsum'] = 'changed'
+        self.assertIsNone(self.highstate._load_compiled(self.ccfn, None, None))
+
+    def test_changed_while_rendered(self):
+        self.hsum['hsum'] = 'changed'
+        self.highstate._write_compiled(
+            self.ccfn, None, None, {'base': ['web']}, self.chunks)
+        self.assertFalse(os.path.isfile(self.ccfn))
+
+
+if __name__ == '__main__':
+    from integration import run_tests
+    run_tests(ChunkSourcesTestCase,
+              RequisiteIndexTestCase,
+              ParallelSchedulerTestCase,
+              StateFingerprintsTestCase,
+              IncrementalCallTestCase,
+              CompiledHighStateTestCase,
+              needs_daemon=False)
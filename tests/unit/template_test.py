@@ -5,6 +5,9 @@
 
 # Import Python libs
 from __future__ import absolute_import
+import os
+import shutil
+import tempfile
 
 # Import Salt Testing libs
 from salttesting import TestCase
@@ -13,6 +16,8 @@ from salttesting.helpers import ensure_in_syspath
 ensure_in_syspath('../')
 
 # Import Salt libs
+import integration
+import salt.utils
 from salt import template
 
 
@@ -38,6 +43,61 @@ class TemplateTestCase(TestCase):
         self.assertIn(('fake_json_func', ''), ret)
         self.assertNotIn(('OBVIOUSLY_NOT_HERE', ''), ret)
 
+    def test_render_cache_key(self):
+        '''
+        Only templates which render the same in any context are cached
+        '''
+        cache = template.RenderCache(10)
+        self.assertIsNotNone(cache.key('foo: bar', 'yaml'))
+        self.assertIsNotNone(cache.key('foo: bar', 'yaml_jinja'))
+        self.assertEqual(cache.key('foo: bar', 'jinja|yaml'),
+                         cache.key('foo: bar', 'yaml_jinja'))
+        self.assertNotEqual(cache.key('foo: bar', 'yaml'),
+                            cache.key('foo: baz', 'yaml'))
+        self.assertIsNone(cache.key('foo: {{ grains.id }}', 'yaml_jinja'))
+        self.assertIsNone(cache.key('foo: bar', 'yaml_mako'))
+        self.assertIsNone(cache.key('foo: bar', 'py'))
+        self.assertIsNone(cache.key('foo: bar', 'jinja'))
+
+    def test_render_cache_lru(self):
+        '''
+        The least recently used entries are dropped and callers get copies
+        '''
+        cache = template.RenderCache(2)
+        cache.store('a', {'a': [1]})
+        cache.store('b', {'b': [2]})
+        cache.get('a')['a'].append(3)
+        cache.store('c', {'c': [4]})
+        self.assertEqual(cache.get('a'), {'a': [1]})
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), {'c': [4]})
+
+    def test_compile_template_render_cache(self):
+        '''
+        A cached template is not rendered again
+        '''
+        calls = []
+
+        def render_yaml(data, saltenv='base', sls='', **kwargs):
+            calls.append(sls)
+            return {'foo': data.read().split(': ')[1].strip()}
+
+        tmpdir = tempfile.mkdtemp(dir=integration.SYS_TMP_DIR)
+        try:
+            path = os.path.join(tmpdir, 'foo.sls')
+            with salt.utils.fopen(path, 'w') as fp_:
+                fp_.write('#!yaml\nfoo: bar\n')
+            cache = template.RenderCache(10)
+            renderers = {'yaml': render_yaml}
+            for sls in ('first', 'second'):
+                ret = template.compile_template(path, renderers, 'yaml',
+                                                sls=sls, render_cache=cache)
+                self.assertEqual(ret, {'foo': 'bar'})
+            self.assertEqual(calls, ['first'])
+            self.assertEqual(cache.hits, 1)
+        finally:
+            shutil.rmtree(tmpdir)
+
 if __name__ == '__main__':
     from integration import run_tests
     run_tests(TemplateTestCase, needs_daemon=False)
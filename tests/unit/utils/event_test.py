@@ -10,6 +10,7 @@
 # Import python libs
 from __future__ import absolute_import
 import os
+import shutil
 import hashlib
 import time
 from tornado.testing import AsyncTestCase
@@ -24,6 +25,7 @@ from multiprocessing import Process
 # Import Salt Testing libs
 from salttesting import (expectedFailure, skipIf)
 from salttesting import TestCase
+from salttesting.mock import MagicMock, patch, NO_MOCK, NO_MOCK_REASON
 from salttesting.helpers import ensure_in_syspath
 ensure_in_syspath('../../')
 
@@ -227,6 +229,48 @@ class TestSaltEvent(TestCase):
                 evt1 = me.get_event(tag='evt1', wait=10)
             self.assertGotEvent(evt1, {'data': 'foo1'})
 
+    def test_event_tag_subscription(self):
+        '''Test events not matching the subscribed tags are not received'''
+        with eventpublisher_process():
+            me = event.MasterEvent(SOCK_DIR)
+            me.subscribe('evt1')
+            time.sleep(0.5)
+            me.fire_event({'data': 'foo2'}, 'evt2')
+            me.fire_event({'data': 'foo1'}, 'evt10')
+            evt1 = me.get_event_block()
+            self.assertEqual(evt1['tag'], 'evt10')
+            self.assertGotEvent(evt1['data'], {'data': 'foo1'})
+            me.unsubscribe('evt1')
+            time.sleep(0.5)
+            me.fire_event({'data': 'foo2'}, 'evt2')
+            evt2 = me.get_event(tag='')
+            self.assertGotEvent(evt2, {'data': 'foo2'})
+
+    @skipIf(NO_MOCK, NO_MOCK_REASON)
+    def test_get_event_subscriptions(self):
+        '''
+        Tags are only subscribed to for the duration of get_event, and only
+        when no subscribed prefix covers them
+        '''
+        me = event.MasterEvent(SOCK_DIR)
+        me.sub = MagicMock()
+        me.cpub = True
+        me._get_event = MagicMock(return_value=None)
+        me.subscribe('')
+        me.sub.reset_mock()
+        me.get_event(wait=0.01, tag='salt/job/1')
+        self.assertFalse(me.sub.setsockopt.called)
+        self.assertEqual(me.subscriptions, set(['']))
+
+        me.unsubscribe('')
+        me.subscribe('salt/auth')
+        me.sub.reset_mock()
+        me.get_event(wait=0.01, tag='salt/job/2')
+        self.assertEqual(me.sub.setsockopt.call_args_list,
+                         [((zmq.SUBSCRIBE, 'salt/job/2'),),
+                          ((zmq.UNSUBSCRIBE, 'salt/job/2'),)])
+        self.assertEqual(me.subscriptions, set(['salt/auth']))
+
     def test_event_multiple_clients(self):
         '''Test event is received by multiple clients'''
         with eventpublisher_process():
@@ -343,6 +387,64 @@ class TestAsyncEventPublisher(AsyncTestCase):
         self.data.pop('_stamp')  # drop the stamp
         self.assertEqual(self.data, {'data': 'foo1'})
 
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class TestEventReturn(TestCase):
+    def setUp(self):
+        self.cachedir = os.path.join(integration.SYS_TMP_DIR, 'event-return')
+        opts = {'cachedir': self.cachedir,
+                'event_return': 'test',
+                'event_return_queue': 10,
+                'event_return_flush_interval': 5,
+                'event_return_spool_max': 3,
+                'event_return_whitelist': ['salt/job/*', 'salt/auth'],
+                'event_return_blacklist': ['salt/job/*/new']}
+        with patch('salt.minion.MasterMinion', MagicMock()):
+            self.event_return = event.EventReturn(opts)
+        self.returner = MagicMock()
+        self.event_return.minion.returners = {
+            'test.event_return': self.returner}
+
+    def tearDown(self):
+        shutil.rmtree(self.cachedir, ignore_errors=True)
+
+    def test_filter(self):
+        self.assertTrue(self.event_return._filter({'tag': 'salt/auth'}))
+        self.assertTrue(self.event_return._filter({'tag': 'salt/job/1/ret/foo'}))
+        self.assertFalse(self.event_return._filter({'tag': 'salt/job/1/new'}))
+        self.assertFalse(self.event_return._filter({'tag': 'salt/key'}))
+
+    def test_spool(self):
+        '''
+        Events the returner fails to store are spooled and sent with the next
+        batch, the oldest are dropped when the spool is full
+        '''
+        stop = object()
+        self.returner.side_effect = Exception
+        for batch in ([1], [2], [3, 4]):
+            self.event_return.write_queue.put(batch)
+            self.event_return.write_queue.put(stop)
+            self.event_return._writer(stop)
+        self.returner.side_effect = None
+        self.returner.reset_mock()
+        self.event_return.write_queue.put([5])
+        self.event_return.write_queue.put(stop)
+        self.event_return._writer(stop)
+        self.assertEqual([call[0][0] for call in self.returner.call_args_list],
+                         [[5], [2], [3, 4]])
+        self.assertEqual(os.listdir(self.event_return.spool_dir), [])
+
+    def test_spool_files(self):
+        '''
+        Temporary files left in the spool are not taken for spooled events
+        '''
+        os.makedirs(self.event_return.spool_dir)
+        for name in ('0000001234.500000_3.p', '.tmp_5x', 'tmp_7.p.swp'):
+            open(os.path.join(self.event_return.spool_dir, name), 'w').close()
+        self.assertEqual(self.event_return._spool_files(),
+                         [('0000001234.500000_3.p', 3)])
+
+
 if __name__ == '__main__':
     from integration import run_tests
-    run_tests(TestSaltEvent, needs_daemon=False)
+    run_tests(TestSaltEvent, TestEventReturn, needs_daemon=False)
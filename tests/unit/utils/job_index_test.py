@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+'''
+    tests.unit.utils.job_index_test
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Test the job index of the master job cache
+'''
+
+# Import python libs
+from __future__ import absolute_import
+import os
+import shutil
+import tempfile
+
+# Import Salt Testing libs
+from salttesting import TestCase
+from salttesting.helpers import ensure_in_syspath
+ensure_in_syspath('../../')
+
+# Import salt libs
+import integration
+import salt.utils.job_index as job_index
+
+JOBS = [
+    ('20150316190000000000', {'fun': 'test.ping', 'tgt': '*',
+                              'user': 'root'}),
+    ('20150317190000000000', {'fun': 'state.sls', 'tgt': 'web*',
+                              'user': 'sudo_alice', 'arg': ['nginx'],
+                              'metadata': {'foo': 'bar'}}),
+    ('20150318190000000000', {'fun': 'state.highstate', 'tgt': 'db1',
+                              'user': 'root',
+                              'kwargs': {'metadata': {'foo': 'baz'}}}),
+]
+
+
+class JobIndexTestCase(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(dir=integration.SYS_TMP_DIR)
+        self.opts = {'cachedir': self.tmpdir, 'serial': 'msgpack'}
+        for jid, load in JOBS:
+            job_index.add(self.opts,
+                          job_index.summarize(jid, load, ['web1', 'web2']))
+
+    def tearDown(self):
+        if job_index._FILE['fd'] is not None:
+            os.close(job_index._FILE['fd'])
+        job_index._FILE.update({'pid': None, 'fd': None, 'hour': None})
+        shutil.rmtree(self.tmpdir)
+
+    def _search(self, **kwargs):
+        return [summary['jid']
+                for summary in job_index.search(self.opts, **kwargs)]
+
+    def test_search(self):
+        '''
+        Jobs are filtered by function, target, user, metadata and time,
+        newest first
+        '''
+        self.assertEqual(self._search(), [jid for jid, _ in reversed(JOBS)])
+        self.assertEqual(self._search(fun='state.*'),
+                         ['20150318190000000000', '20150317190000000000'])
+        self.assertEqual(self._search(fun=['test.*', 'state.sls']),
+                         ['20150317190000000000', '20150316190000000000'])
+        self.assertEqual(self._search(tgt='web*'), ['20150317190000000000'])
+        self.assertEqual(self._search(user='sudo_*'),
+                         ['20150317190000000000'])
+        self.assertEqual(self._search(metadata={'foo': 'baz'}),
+                         ['20150318190000000000'])
+        self.assertEqual(self._search(start='20150317000000000000',
+                                      end='20150317235959999999'),
+                         ['20150317190000000000'])
+
+    def test_pagination(self):
+        '''
+        Results can be paged through with limit and offset
+        '''
+        self.assertEqual(self._search(limit=2),
+                         ['20150318190000000000', '20150317190000000000'])
+        self.assertEqual(self._search(limit=2, offset=2),
+                         ['20150316190000000000'])
+
+    def test_format(self):
+        '''
+        Jobs are formatted as the returners format them
+        '''
+        summary = job_index.search(self.opts, fun='state.sls')[0]
+        self.assertEqual(job_index.format_job(summary),
+                         {'Function': 'state.sls',
+                          'Arguments': ['nginx'],
+                          'Target': 'web*',
+                          'Target-type': [],
+                          'User': 'sudo_alice',
+                          'Metadata': {'foo': 'bar'},
+                          'Minion-count': 2,
+                          'StartTime': '2015, Mar 17 19:00:00.000000'})
+
+    def test_clean(self):
+        '''
+        Old index files are removed, other files are kept
+        '''
+        job_index.clean(self.opts, 24)
+        self.assertEqual(len(self._search()), 3)
+        dirname = job_index.index_dir(self.opts)
+        marker = os.path.join(dirname, '.indexed')
+        open(marker, 'w').close()
+        for name in os.listdir(dirname):
+            path = os.path.join(dirname, name)
+            mtime = os.path.getmtime(path) - 25 * 3600
+            os.utime(path, (mtime, mtime))
+        job_index.clean(self.opts, 24)
+        self.assertEqual(self._search(), [])
+        self.assertTrue(os.path.isfile(marker))
+
+
+if __name__ == '__main__':
+    from integration import run_tests
+    run_tests(JobIndexTestCase, needs_daemon=False)
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+'''
+    tests.unit.utils.minion_index_test
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Test the minion data index against the minion data cache scan it replaces
+'''
+
+# Import python libs
+from __future__ import absolute_import
+import os
+import shutil
+import tempfile
+
+# Import Salt Testing libs
+from salttesting import TestCase
+from salttesting.helpers import ensure_in_syspath
+ensure_in_syspath('../../')
+
+# Import salt libs
+import integration
+import salt.payload
+import salt.utils
+import salt.utils.minions
+import salt.utils.minion_index
+
+MINIONS = {
+    'web1': {
+        'grains': {'os': 'Ubuntu',
+                   'roles': ['web', 'cache'],
+                   'ipv4': ['127.0.0.1', '10.0.0.1'],
+                   'disks': [{'name': 'sda', 'size': 100}],
+                   'locale_info': {'defaultencoding': 'UTF-8'}},
+        'pillar': {'role': 'web', 'ports': {'http': 80}}},
+    'web2': {
+        'grains': {'os': 'Ubuntu',
+                   'roles': ['web'],
+                   'ipv4': ['127.0.0.1', '10.0.0.2'],
+                   'locale_info': {'defaultencoding': 'ISO-8859-1'}},
+        'pillar': {'role': 'web:canary', 'ports': {'http': 8080}}},
+    'db1': {
+        'grains': {'os': 'CentOS',
+                   'roles': ['db'],
+                   'ipv4': ['127.0.0.1', '10.0.1.1'],
+                   'disks': [{'name': 'sdb', 'size': 2000}]},
+        'pillar': {'role': 'db'}},
+    'nodata': None,
+}
+
+TARGETS = (
+    ('grain', 'os:Ubuntu'),
+    ('grain', 'os:ubu*'),
+    ('grain', 'roles:web'),
+    ('grain', 'roles:1'),
+    ('grain', 'roles:0:db'),
+    ('grain', 'disks:name:sd?'),
+    ('grain', 'disks:*:size:2000'),
+    ('grain', 'locale_info:*'),
+    ('grain', 'locale_info:defaultencoding:utf-8'),
+    ('grain', 'missing:*'),
+    ('grain_pcre', 'os:(ubuntu|centos)'),
+    ('grain_pcre', 'roles:c.*'),
+    ('pillar', 'role:web*'),
+    ('pillar', 'role:web:canary'),
+    ('pillar', 'ports:http:80'),
+    ('pillar_pcre', 'ports:http:80.*'),
+    ('pillar_exact', 'role:web'),
+    ('ipcidr', '10.0.0.0/24'),
+    ('ipcidr', '10.0.1.1'),
+    ('compound', 'G@os:Ubuntu and not I@role:web'),
+    ('compound', 'G@roles:db or P@os:ubun.*'),
+)
+
+
+class MinionDataIndexTestCase(TestCase):
+
+    def setUp(self):
+        super(MinionDataIndexTestCase, self).setUp()
+        self.tmpdir = tempfile.mkdtemp(dir=integration.SYS_TMP_DIR)
+        self.opts = {'cachedir': os.path.join(self.tmpdir, 'cache'),
+                     'pki_dir': os.path.join(self.tmpdir, 'pki'),
+                     'minion_data_cache': True,
+                     'minion_data_cache_index': False}
+        serial = salt.payload.Serial(self.opts)
+        os.makedirs(os.path.join(self.opts['pki_dir'], 'minions'))
+        for minion_id, data in MINIONS.items():
+            salt.utils.fopen(
+                os.path.join(self.opts['pki_dir'], 'minions', minion_id),
+                'w'
+            ).close()
+            cdir = os.path.join(self.opts['cachedir'], 'minions', minion_id)
+            os.makedirs(cdir)
+            if data is not None:
+                with salt.utils.fopen(os.path.join(cdir, 'data.p'), 'w+b') as fp_:
+                    fp_.write(serial.dumps(data))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+        super(MinionDataIndexTestCase, self).tearDown()
+
+    def _check(self, expr_form, expr, greedy):
+        scan = salt.utils.minions.CkMinions(self.opts)
+        opts = dict(self.opts, minion_data_cache_index=True)
+        indexed = salt.utils.minions.CkMinions(opts)
+        self.assertIsNotNone(indexed.index)
+        self.assertEqual(
+            sorted(scan.check_minions(expr, expr_form, greedy=greedy)),
+            sorted(indexed.check_minions(expr, expr_form, greedy=greedy)),
+            '{0} target {1!r} (greedy={2})'.format(expr_form, expr, greedy)
+        )
+
+    def test_matches_cache_scan(self):
+        '''
+        The index must resolve targets exactly like the full cache scan
+        '''
+        for greedy in (True, False):
+            for expr_form, expr in TARGETS:
+                self._check(expr_form, expr, greedy)
+
+    def test_update(self):
+        '''
+        Updates written by one process are seen by another
+        '''
+        opts = dict(self.opts, minion_data_cache_index=True)
+        reader = salt.utils.minion_index.MinionDataIndex(opts)
+        reader.refresh(set(MINIONS))
+        self.assertEqual(reader.match('grains', 'os:centos'), set(['db1']))
+
+        writer = salt.utils.minion_index.MinionDataIndex(opts)
+        writer.update('db1', {'os': 'Ubuntu'}, {})
+        writer.update('nodata', {'os': 'CentOS'}, {})
+        reader.refresh()
+        self.assertEqual(reader.match('grains', 'os:centos'), set(['nodata']))
+        self.assertEqual(reader.match('grains', 'os:ubuntu'),
+                         set(['web1', 'web2', 'db1']))
+
+        writer.remove('nodata')
+        reader.refresh()
+        self.assertEqual(reader.match('grains', 'os:centos'), set())
+        self.assertNotIn('nodata', reader.indexed())
+
+    def test_compaction(self):
+        '''
+        Readers pick up the new generation once the journal is compacted
+        '''
+        opts = dict(self.opts, minion_data_cache_index=True)
+        reader = salt.utils.minion_index.MinionDataIndex(opts)
+        reader.refresh(set(MINIONS))
+        writer = salt.utils.minion_index.MinionDataIndex(opts)
+        gen = reader.gen
+        orig = salt.utils.minion_index.MIN_COMPACT_SIZE
+        salt.utils.minion_index.MIN_COMPACT_SIZE = 0
+        try:
+            writer.update('web2', {'os': 'Debian'}, {})
+        finally:
+            salt.utils.minion_index.MIN_COMPACT_SIZE = orig
+        self.assertEqual(writer.gen, gen + 1)
+        reader.refresh()
+        self.assertEqual(reader.gen, gen + 1)
+        self.assertEqual(reader.match('grains', 'os:debian'), set(['web2']))
+        self.assertEqual(reader.match('grains', 'os:ubuntu'), set(['web1']))
+
+
+if __name__ == '__main__':
+    from integration import run_tests
+    run_tests(MinionDataIndexTestCase, needs_daemon=False)
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+'''
+    tests.unit.utils.pillar_cache_test
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Test the master compiled pillar cache
+'''
+
+# Import python libs
+from __future__ import absolute_import
+import os
+import time
+import shutil
+import tempfile
+
+# Import Salt Testing libs
+from salttesting import TestCase
+from salttesting.helpers import ensure_in_syspath
+ensure_in_syspath('../../')
+
+# Import salt libs
+import integration
+import salt.utils
+import salt.utils.pillar_cache
+
+GRAINS = {'id': 'web1', 'os': 'Ubuntu', 'roles': ['web']}
+PILLAR = {'role': 'web', 'ports': {'http': 80}}
+
+
+class PillarCacheTestCase(TestCase):
+
+    def setUp(self):
+        super(PillarCacheTestCase, self).setUp()
+        self.tmpdir = tempfile.mkdtemp(dir=integration.SYS_TMP_DIR)
+        self.root = os.path.join(self.tmpdir, 'pillar')
+        os.makedirs(os.path.join(self.root, 'web'))
+        self.sls = os.path.join(self.root, 'web', 'init.sls')
+        with salt.utils.fopen(self.sls, 'w') as fp_:
+            fp_.write('role: web\n')
+        self.opts = {'cachedir': os.path.join(self.tmpdir, 'cache'),
+                     'pillar_roots': {'base': [self.root]},
+                     'pillar_cache_ttl': 3600}
+        self.cache = salt.utils.pillar_cache.PillarCache(self.opts)
+        self.cache.store('web1', None, GRAINS, PILLAR, [self.sls], ['mongo'])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+        super(PillarCacheTestCase, self).tearDown()
+
+    def test_hit(self):
+        '''
+        A cached pillar is shared with other processes
+        '''
+        cache = salt.utils.pillar_cache.PillarCache(self.opts)
+        self.assertEqual(cache.get('web1', None, dict(GRAINS)), PILLAR)
+        self.assertIsNone(cache.get('web2', None, dict(GRAINS)))
+        self.assertEqual(cache.stats['hits'], 1)
+        self.assertEqual(cache.stats['misses'], 1)
+
+    def test_key(self):
+        '''
+        A cached pillar is only used for the saltenv and grains it was
+        compiled for
+        '''
+        self.assertIsNone(self.cache.get('web1', 'dev', GRAINS))
+        self.assertIsNone(
+            self.cache.get('web1', None, dict(GRAINS, os='CentOS')))
+
+    def test_sources(self):
+        '''
+        Changing, adding or removing a pillar file invalidates the entry
+        '''
+        mtime = os.path.getmtime(self.sls)
+        os.utime(self.sls, (mtime + 10, mtime + 10))
+        self.assertIsNone(self.cache.get('web1', None, GRAINS))
+        self.assertEqual(self.cache.stats['stale'], 1)
+
+        self.cache.store('web1', None, GRAINS, PILLAR, [self.sls], [])
+        self.assertEqual(self.cache.get('web1', None, GRAINS), PILLAR)
+        new = os.path.join(self.root, 'db.sls')
+        with salt.utils.fopen(new, 'w') as fp_:
+            fp_.write('role: db\n')
+        # Make sure the directory mtime changes
+        mtime = os.path.getmtime(self.root)
+        os.utime(self.root, (mtime + 10, mtime + 10))
+        self.assertIsNone(self.cache.get('web1', None, GRAINS))
+
+    def test_errors(self):
+        '''
+        Pillar compiled with errors is not cached
+        '''
+        self.cache.store('web2', None, GRAINS, {'_errors': ['failed']},
+                         [self.sls], [])
+        self.assertIsNone(self.cache.get('web2', None, GRAINS))
+
+    def test_ttl(self):
+        '''
+        Entries expire after pillar_cache_ttl
+        '''
+        cache = salt.utils.pillar_cache.PillarCache(
+            dict(self.opts, pillar_cache_ttl=0))
+        time.sleep(0.01)
+        self.assertIsNone(cache.get('web1', None, GRAINS))
+        self.assertEqual(cache.stats['expired'], 1)
+
+    def test_clear(self):
+        '''
+        Entries can be cleared by minion or by the ext_pillar used
+        '''
+        self.cache.store('db1', None, GRAINS, PILLAR, [self.sls], [])
+        self.assertEqual(self.cache.clear(ext_pillar='git'), [])
+        self.assertEqual(self.cache.clear(ext_pillar='mongo'), ['web1'])
+        self.assertIsNone(self.cache.get('web1', None, GRAINS))
+        self.assertEqual(self.cache.clear(['db1']), ['db1'])
+        self.assertEqual(self.cache.get_stats()['entries'], 0)
+
+    def test_stats(self):
+        '''
+        Statistics are summed across processes
+        '''
+        self.cache.get('web1', None, GRAINS)
+        stats = self.cache.get_stats()
+        self.assertEqual(stats['stored'], 1)
+        self.assertEqual(stats['entries'], 1)
+
+    def test_stale_stats(self):
+        '''
+        The statistics of dead processes and old statistics are removed
+        '''
+        dead = os.path.join(self.cache.stats_dir, '99999999.p')
+        self.cache._write(dead, {'hits': 100})
+        self.assertEqual(self.cache.get_stats()['hits'], 0)
+        self.assertFalse(os.path.exists(dead))
+        own = os.path.join(self.cache.stats_dir, '{0}.p'.format(os.getpid()))
+        mtime = time.time() - 7200
+        os.utime(own, (mtime, mtime))
+        self.assertEqual(self.cache.get_stats()['stored'], 0)
+        self.assertFalse(os.path.exists(own))
+
+
+if __name__ == '__main__':
+    from integration import run_tests
+    run_tests(PillarCacheTestCase, needs_daemon=False)
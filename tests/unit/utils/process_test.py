@@ -124,9 +124,42 @@ class TestThreadPool(TestCase):
         self.assertEqual(pool._job_queue.qsize(), 1)
 
 
+class TestProcessPool(TestCase):
+
+    def test_basic(self):
+        '''
+        Make sure the workers call the target
+        '''
+        results = multiprocessing.Queue()
+
+        def target(value):
+            results.put((os.getpid(), value))
+
+        pool = salt.utils.process.ProcessPool(target, 1)
+        try:
+            time.sleep(2)  # Sleep to let the worker start
+            self.assertTrue(pool.fire_async(1))
+            pid, value = results.get(timeout=5)
+            self.assertNotEqual(pid, os.getpid())
+            self.assertEqual(value, 1)
+        finally:
+            pool.stop()
+
+    def test_no_workers(self):
+        '''
+        Make sure that calls are refused when no worker is idle
+        '''
+        pool = salt.utils.process.ProcessPool(lambda value: None, 0)
+        self.assertFalse(pool.fire_async(1))
+        pool = salt.utils.process.ProcessPool(lambda value: None, 0,
+                                              queue_size=1)
+        self.assertTrue(pool.fire_async(1))
+        self.assertFalse(pool.fire_async(2))
+
+
 if __name__ == '__main__':
     from integration import run_tests
     run_tests(
-        [TestProcessManager, TestThreadPool],
+        [TestProcessManager, TestThreadPool, TestProcessPool],
         needs_daemon=False
     )
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+'''
+    tests.unit.utils.reactor_test
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Test the reactor tag matcher, reaction pool and wrapper
+'''
+
+# Import python libs
+from __future__ import absolute_import
+import time
+import threading
+
+# Import Salt Testing libs
+from salttesting import TestCase, skipIf
+from salttesting.helpers import ensure_in_syspath
+from salttesting.mock import NO_MOCK, NO_MOCK_REASON, MagicMock, patch
+ensure_in_syspath('../../')
+
+# Import salt libs
+from salt.utils.reactor import TagMatcher, ReactionPool, ReactWrap
+
+
+class TagMatcherTestCase(TestCase):
+
+    def setUp(self):
+        self.matcher = TagMatcher([
+            ('salt/minion/*/start', 'start'),
+            ('salt/auth', 'auth'),
+            ('salt/*', 'salt'),
+            ('*', 'all'),
+            ('salt/job/[0-9]*/ret/web?', 'web'),
+            ('salt/auth', 'auth2'),
+        ])
+
+    def test_match(self):
+        '''
+        Tags match every pattern fnmatch would, in the order of the map
+        '''
+        self.assertEqual(self.matcher.match('salt/minion/web1/start'),
+                         ['start', 'salt', 'all'])
+        self.assertEqual(self.matcher.match('salt/auth'),
+                         ['auth', 'salt', 'all', 'auth2'])
+        self.assertEqual(self.matcher.match('salt/job/2015/ret/web1'),
+                         ['salt', 'all', 'web'])
+        self.assertEqual(self.matcher.match('salt/job/x/ret/web1'),
+                         ['salt', 'all'])
+        self.assertEqual(self.matcher.match('other'), ['all'])
+        self.assertEqual(self.matcher.match(''), ['all'])
+
+    def test_empty(self):
+        '''
+        An empty map matches nothing
+        '''
+        self.assertEqual(TagMatcher([]).match('salt/auth'), [])
+
+
+class ReactionPoolTestCase(TestCase):
+
+    def setUp(self):
+        self.release = threading.Event()
+        self.lock = threading.Lock()
+        self.running = {}
+        self.max_running = {}
+
+    def react(self, tag, data):
+        with self.lock:
+            self.running[tag] = self.running.get(tag, 0) + 1
+            self.max_running[tag] = max(self.max_running.get(tag, 0),
+                                        self.running[tag])
+        self.release.wait(5)
+        with self.lock:
+            self.running[tag] -= 1
+
+    def wait_for(self, pool, key, value):
+        for _ in range(500):
+            if pool.get_stats()[key] == value:
+                return
+            time.sleep(0.01)
+        self.fail('{0} did not reach {1}'.format(key, value))
+
+    def test_tag_concurrency(self):
+        '''
+        Reactions to a tag are limited without holding up other tags
+        '''
+        pool = ReactionPool(self.react, 4, tag_concurrency=1)
+        for _ in range(3):
+            self.assertTrue(pool.submit('slow', ({},)))
+        self.assertTrue(pool.submit('fast', ({},)))
+        self.wait_for(pool, 'running', 2)
+        self.assertEqual(pool.get_stats()['depth'], 2)
+        self.release.set()
+        self.wait_for(pool, 'done', 4)
+        self.assertEqual(self.max_running, {'slow': 1, 'fast': 1})
+        stats = pool.get_stats()
+        self.assertEqual(stats['depth'], 0)
+        self.assertEqual(stats['latency']['slow']['count'], 3)
+
+    def test_dropped(self):
+        '''
+        Events are dropped when the queue stays full
+        '''
+        pool = ReactionPool(self.react, 1, queue_size=1, timeout=0)
+        self.assertTrue(pool.submit('foo', ({},)))
+        self.wait_for(pool, 'running', 1)
+        self.assertTrue(pool.submit('foo', ({},)))
+        self.assertFalse(pool.submit('foo', ({},)))
+        self.release.set()
+        self.wait_for(pool, 'done', 2)
+        self.assertEqual(pool.get_stats()['dropped'], 1)
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class ReactWrapTestCase(TestCase):
+
+    def setUp(self):
+        self.client_cache = ReactWrap.client_cache
+        self.runner = MagicMock()
+        ReactWrap.client_cache = {'runner': self.runner}
+
+    def tearDown(self):
+        ReactWrap.client_cache = self.client_cache
+
+    def test_inline(self):
+        '''
+        Runners run in the thread of the reaction when the reactions run in
+        a ReactionPool
+        '''
+        wrap = ReactWrap({'reactor_refresh_interval': 60}, inline=True)
+        self.assertIsNone(wrap.pool)
+        thread = []
+        self.runner.low.side_effect = \
+            lambda fun, kwargs: thread.append(threading.current_thread())
+        wrap.runner('manage.up', foo='bar')
+        self.runner.low.assert_called_once_with('manage.up', {'foo': 'bar'})
+        self.assertEqual(thread, [threading.current_thread()])
+
+    def test_local_per_thread(self):
+        '''
+        Each reaction thread gets a LocalClient of its own
+        '''
+        wrap = ReactWrap({'reactor_refresh_interval': 60,
+                          'conf_file': '/etc/salt/master'},
+                         inline=True)
+        clients = []
+        done = threading.Event()
+
+        def react():
+            wrap.local('*', 'test.ping')
+            clients.append(wrap._client('local', MagicMock()))
+            # Keep the thread alive so that its ident is not reused
+            done.wait(5)
+
+        with patch('salt.client.LocalClient',
+                   MagicMock(side_effect=lambda conf: MagicMock())):
+            threads = [threading.Thread(target=react) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            while len(clients) < 2 and all(t.is_alive() for t in threads):
+                time.sleep(0.01)
+            done.set()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(len(clients), 2)
+        self.assertIsNot(clients[0], clients[1])
+        for client in clients:
+            client.cmd_async.assert_called_once_with('*', 'test.ping')
+
+
+if __name__ == '__main__':
+    from integration import run_tests
+    run_tests([TagMatcherTestCase, ReactionPoolTestCase, ReactWrapTestCase],
+              needs_daemon=False)